@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+"""Запуск набора замеров: python -m benchmarks run | compare.
+"""
+import sys
+
+from benchmarks.suite import main
+
+sys.exit(main())
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""Замер холодного старта с дисковым кэшем и без него.
+
+Холодный старт здесь - это подготовка всей библиотеки скриптов
+к исполнению в только что запущенном процессе.
+
+Запуск:
+    python -m benchmarks.bench_cold_start [количество скриптов]
+"""
+import sys
+import tempfile
+import time
+from typing import List
+
+from exceltranslator.cache import DiskCache
+from exceltranslator.program import parse
+
+TEMPLATE = 'x{i} = (ABS(-{i}.5) + y ** 2) * 3 / 4 - {i}; ' \
+           'ЕСЛИ (x{i} >= 10 И y != 0) {{z = "текст {i}";}};\n' \
+           'СУММ(x{i}, y, {i}) * 2'
+DEFAULT_AMOUNT = 10_000
+
+
+def make_library(amount: int) -> List[str]:
+    """Собрать библиотеку различающихся скриптов.
+    """
+    return [TEMPLATE.format(i=i) for i in range(amount)]
+
+
+def main():
+    """Точка входа.
+    """
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_AMOUNT
+    library = make_library(amount)
+
+    start = time.perf_counter()
+    for source in library:
+        parse(source)
+    without_cache = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        disk = DiskCache(directory)
+        start = time.perf_counter()
+        for source in library:
+            disk.put(source, parse(source))
+        populate = time.perf_counter() - start
+
+        disk = DiskCache(directory)
+        start = time.perf_counter()
+        for source in library:
+            disk.get(source)
+        with_cache = time.perf_counter() - start
+        assert disk.hits == amount
+
+    print(f'скриптов:            {amount}')
+    print(f'разбор, сек.:        {without_cache:.3f}')
+    print(f'заполнение кэша:     {populate:.3f}')
+    print(f'чтение кэша, сек.:   {with_cache:.3f}')
+    print(f'ускорение, раз:      {without_cache / with_cache:.1f}')
+
+
+if __name__ == '__main__':
+    main()
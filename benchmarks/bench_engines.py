@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+"""Замер исполнения одной программы разными способами.
+
+Разбор выполняется один раз, замеряется только исполнение.
+
+Запуск:
+    python -m benchmarks.bench_engines [количество исполнений]
+"""
+import sys
+import time
+
+from exceltranslator.helpers.namespace_wrapper import Namespace
+from exceltranslator.program import ENGINES, compile
+
+SOURCE = 'x = (ABS(-2.5) + y ** 2) * 3 / 4 - 1; ' \
+         'ЕСЛИ (x >= 10 И y != 0) {z = "текст";} ИНАЧЕ {z = "нет";}; ' \
+         'СУММ(x, y, 3) * 2 + ОКРУГЛ(x / 7, 2)'
+DEFAULT_AMOUNT = 5_000
+
+
+def measure(engine: str, amount: int) -> float:
+    """Среднее время одного исполнения в микросекундах.
+    """
+    program = compile(SOURCE, cache=None, engine=engine)
+    assert program.engine == engine
+
+    start = time.perf_counter()
+    for i in range(amount):
+        program.run(Namespace({'y': i % 7}))
+    return (time.perf_counter() - start) / amount * 1_000_000
+
+
+def main():
+    """Точка входа.
+    """
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_AMOUNT
+    reference = None
+
+    print(f'исполнений: {amount}')
+    for engine in ENGINES:
+        elapsed = measure(engine, amount)
+        if reference is None:
+            reference = elapsed
+        print(f'{engine:<12} {elapsed:8.1f} мкс  '
+              f'ускорение: {reference / elapsed:.1f}')
+
+
+if __name__ == '__main__':
+    main()
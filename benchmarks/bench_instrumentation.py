@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""Замер стоимости оповещений при исполнении обходом дерева.
+
+Сравнивается исполнение без наблюдателя, с наблюдателем, который
+ни на что не подписан, с наблюдателем, который получает всё,
+и с записью всех событий в журналы (JSON Lines и двоичный).
+
+Запуск:
+    python -m benchmarks.bench_instrumentation [количество исполнений]
+"""
+import os
+import sys
+import tempfile
+import time
+from typing import Optional
+
+from exceltranslator.helpers.namespace_wrapper import Namespace
+from exceltranslator.helpers.sinks import BinarySink, JsonLinesSink
+from exceltranslator.helpers.stack_wrapper import StackWrapper
+from exceltranslator.helpers.watcher import Watcher
+from exceltranslator.program import parse
+
+SOURCE = 'x = (ABS(-2.5) + y ** 2) * 3 / 4 - 1; ' \
+         'ЕСЛИ (x >= 10 И y != 0) {z = "текст";} ИНАЧЕ {z = "нет";}; ' \
+         'СУММ(x, y, 3) * 2 + ОКРУГЛ(x / 7, 2)'
+DEFAULT_AMOUNT = 3_000
+
+
+def measure(amount: int, make_watcher) -> float:
+    """Среднее время одного исполнения в микросекундах.
+    """
+    root = parse(SOURCE)
+    total = 0.0
+
+    for i in range(amount):
+        watcher: Optional[Watcher] = make_watcher()
+        root.watcher = watcher
+        namespace = Namespace({'y': i % 7}, watcher=watcher)
+        stack = StackWrapper(watcher=watcher)
+
+        start = time.perf_counter()
+        root.evaluate(namespace, stack)
+        total += time.perf_counter() - start
+
+    return total / amount * 1_000_000
+
+
+def main():
+    """Точка входа.
+    """
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_AMOUNT
+
+    with tempfile.TemporaryDirectory() as directory, \
+            JsonLinesSink(os.path.join(directory, 'trace.jsonl')) as jsonl, \
+            BinarySink(os.path.join(directory, 'trace.bin')) as binary:
+        variants = {
+            'без наблюдателя': lambda: None,
+            'без подписки': lambda: Watcher(events=()),
+            'все события': Watcher,
+            'JSON Lines': lambda: Watcher(history_size=0, sinks=(jsonl,)),
+            'двоичный': lambda: Watcher(history_size=0, sinks=(binary,)),
+        }
+
+        reference = None
+        print(f'исполнений: {amount}')
+        for name, make_watcher in variants.items():
+            elapsed = measure(amount, make_watcher)
+            if reference is None:
+                reference = elapsed
+            print(f'{name:<16} {elapsed:8.1f} мкс  '
+                  f'относительно: {elapsed / reference:.2f}')
+
+        for sink in (jsonl, binary):
+            sink.close()
+            print(f'{os.path.basename(sink.file.name):<16} '
+                  f'{os.path.getsize(sink.file.name) / amount:8.0f} байт '
+                  f'на исполнение')
+
+if __name__ == '__main__':
+    main()
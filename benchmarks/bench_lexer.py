@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""Замер масштабирования лексического анализатора.
+
+Запуск:
+    python -m benchmarks.bench_lexer
+"""
+import time
+from typing import Callable, List
+
+from exceltranslator import settings
+from exceltranslator.lexer.base_tokens import BaseToken
+from exceltranslator.lexer.lexer import Lexer
+
+STATEMENT = 'x1 = (ABS(-2.5) + y ** 2) * 3 / 4 - 1; ' \
+            'ЕСЛИ (x1 >= 10 И y != 0) {z = "текст";}\n'
+FRACTIONS = (0.125, 0.25, 0.5, 1, 2, 4)
+LEGACY_LIMIT = 25_000
+
+
+def make_script(size: int) -> str:
+    """Собрать скрипт примерно заданной длины.
+    """
+    repeats = size // len(STATEMENT) + 1
+    return (STATEMENT * repeats)[:size].rsplit(';', 1)[0] + ';'
+
+
+def legacy_tokenize(lexer: Lexer, input_text: str) -> List[BaseToken]:
+    """Прежний алгоритм: перебор токенов по срезам оставшегося текста.
+    """
+    output = []
+    position = 0
+    while position < len(input_text):
+        while position < len(input_text) \
+                and input_text[position] in ('\n', '\t', ' ', '\r'):
+            position += 1
+
+        if position >= len(input_text):
+            break
+
+        for token_type in lexer.tokens:
+            token, end = token_type.try_making(input_text[position:])
+            if token is not None:
+                position += end
+                output.append(token)
+                break
+        else:
+            raise ValueError(input_text[position])
+
+    return output
+
+
+def measure(func: Callable, *args, repeat: int = 3) -> float:
+    """Лучшее время из нескольких запусков.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Точка входа.
+    """
+    lexer = Lexer()
+    print(f'{"символов":>10} {"токенов":>8} {"сек.":>9} '
+          f'{"мкс/символ":>11} {"старый, сек.":>13}')
+
+    for fraction in FRACTIONS:
+        size = int(settings.MAX_LETTERS * fraction)
+        text = make_script(size)
+        total = len(lexer.tokenize(text))
+        elapsed = measure(lexer.tokenize, text)
+
+        if size <= LEGACY_LIMIT:
+            legacy = f'{measure(legacy_tokenize, lexer, text, repeat=1):13.4f}'
+        else:
+            legacy = f'{"-":>13}'
+
+        print(f'{len(text):>10} {total:>8} {elapsed:9.4f} '
+              f'{elapsed / len(text) * 1e6:11.3f} {legacy}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+"""Замер масштабирования синтаксического анализатора.
+
+Запуск:
+    python -m benchmarks.bench_parser
+"""
+import time
+
+from exceltranslator.lexer.lexer import Lexer
+from exceltranslator.parser.parser import Parser
+
+STATEMENT = 'x = (ABS(-2.5) + y ** 2) * 3 / 4 - 1; ' \
+            'ЕСЛИ (x >= 10 И y != 0) {z = "текст";};\n'
+REPEATS = (50, 100, 200, 400, 800)
+
+
+def main():
+    """Точка входа.
+    """
+    lexer = Lexer()
+    parser = Parser(lexer)
+    print(f'{"токенов":>8} {"сек.":>9} {"мкс/токен":>10} {"токенов/с":>11}')
+
+    for repeats in REPEATS:
+        text = STATEMENT * repeats
+        best = float('inf')
+        total = 0
+
+        for _ in range(3):
+            lexer.analyze(text)
+            total = len(lexer.stream)
+            start = time.perf_counter()
+            parser.parse()
+            best = min(best, time.perf_counter() - start)
+
+        print(f'{total:>8} {best:9.4f} {best / total * 1e6:10.3f} '
+              f'{total / best:11.0f}')
+
+
+if __name__ == '__main__':
+    main()
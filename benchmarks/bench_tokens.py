@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""Замер памяти, занимаемой токенами.
+
+Сравнивает список готовых объектов токенов с компактным хранилищем.
+
+Запуск:
+    python -m benchmarks.bench_tokens
+"""
+import tracemalloc
+from typing import Callable, Tuple
+
+from exceltranslator import settings
+from exceltranslator.lexer.lexer import Lexer
+from benchmarks.bench_lexer import make_script, FRACTIONS
+
+
+def measure(func: Callable, *args) -> Tuple[int, object]:
+    """Сколько байт остаётся занято результатом функции.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func(*args)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def main():
+    """Точка входа.
+    """
+    lexer = Lexer()
+    print(f'{"символов":>10} {"токенов":>8} {"список, КБ":>11} '
+          f'{"хранилище, КБ":>14} {"байт/токен":>11} {"раз":>6}')
+
+    for fraction in FRACTIONS:
+        text = make_script(int(settings.MAX_LETTERS * fraction))
+        listed, tokens = measure(lexer.tokenize, text)
+        stored, store = measure(lexer.store, text)
+        total = len(tokens)
+        print(f'{len(text):>10} {total:>8} {listed / 1024:11.1f} '
+              f'{stored / 1024:14.1f} {stored / total:11.1f} '
+              f'{listed / stored:6.1f}')
+        del tokens, store
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""Замер перевода дерева в байткод: через текст и напрямую через ast.
+
+Разбор скрипта выполняется один раз, замеряется только перевод
+готового дерева в объект кода:
+
+    serialize_to_python - текст из serialize_to_python и compile(str);
+    unparse - тот же код, что и у движка bytecode, через ast.unparse
+        и compile(str);
+    ast - build и compile(ast.Module), как в движке bytecode.
+
+serialize_to_python выдаёт обычный python без вспомогательных функций
+runtime, поэтому его код короче, чем у движка bytecode, и замер
+показывает нижнюю границу текстового пути, а не ту же работу.
+
+Запуск:
+    python -m benchmarks.bench_translation [количество строк скрипта]
+"""
+import gc
+import sys
+import time
+
+from exceltranslator.compiler.bytecode import translate
+from exceltranslator.compiler.python_ast import build
+from exceltranslator.parser.serialization import serialize_to_python
+from exceltranslator.program import parse
+
+TEMPLATE = 'x{i} = (ABS(-{i}.5) + y ** 2) * 3 / 4 - {i}; ' \
+           'ЕСЛИ (x{i} >= 10 И y != 0) {{z = "текст {i}";}};\n'
+DEFAULT_AMOUNT = 1_000
+REPEATS = 5
+
+
+def best_of(function) -> float:
+    """Лучшее время из нескольких запусков, в секундах.
+    """
+    timings = []
+    for _ in range(REPEATS):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """Точка входа.
+    """
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_AMOUNT
+    source = ''.join(TEMPLATE.format(i=i) for i in range(amount))
+    root = parse(source)
+
+    through_serialize = best_of(lambda: compile(
+        serialize_to_python(root), '<exceltranslator>', 'exec'))
+    through_unparse = best_of(lambda: compile(
+        translate(root), '<exceltranslator>', 'exec'))
+    through_ast = best_of(lambda: compile(
+        build(root, source), '<exceltranslator>', 'exec'))
+
+    print(f'строк скрипта:                {amount}')
+    print(f'serialize_to_python, сек:     {through_serialize:.3f}')
+    print(f'unparse, сек:                 {through_unparse:.3f}')
+    print(f'ast, сек:                     {through_ast:.3f}')
+    print(f'ast быстрее unparse, раз:     '
+          f'{through_unparse / through_ast:.2f}')
+    print(f'ast быстрее serialize, раз:   '
+          f'{through_serialize / through_ast:.2f}')
+
+    if through_ast > through_serialize:
+        print('Построение ast медленнее текста из serialize_to_python: '
+              'узлы ast создаются в python, а текст разбирает compile на C.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+
+"""Набор замеров всех этапов работы транслятора.
+
+Замеряются лексический анализ, разбор, исполнение обходом дерева
+(в том числе оптимизированного) и замыканиями, перевод в текст
+и в python, распечатка дерева и verbose_eval на синтетических скриптах
+разной формы, в том числе из ScriptGenerator. Для каждого замера
+записываются пропускная способность (токены, узлы или исполнения
+в секунду) и пиковая память по tracemalloc.
+
+Запуск:
+    python -m benchmarks run [-o results.json] [--quick]
+    python -m benchmarks compare baseline.json results.json [--threshold 0.1]
+
+compare завершается с кодом 1, если хоть один замер стал хуже порога.
+"""
+import argparse
+import datetime
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from exceltranslator.compiler.closures import compile_closures
+from exceltranslator.generator import ScriptGenerator
+from exceltranslator.helpers.namespace_wrapper import Namespace
+from exceltranslator.helpers.node_tree_printer import NodeTreePrinter
+from exceltranslator.lexer.lexer import Lexer
+from exceltranslator.parser.base_nodes import BaseNode
+from exceltranslator.parser.optimizer import optimize
+from exceltranslator.parser.parser import Parser
+from exceltranslator.parser.serialization import (
+    serialize_to_python,
+    serialize_to_text,
+)
+from exceltranslator.tools import verbose_eval
+
+# минимальное время одного повтора, секунд
+MIN_TIME = 0.1
+REPEATS = 5
+DEFAULT_THRESHOLD = 0.1
+# входные данные скриптов
+INPUT = {'y': 3}
+
+
+# Скрипты -------------------------
+#
+# Каждая форма по размеру выдаёт текст скрипта и входные данные для него.
+
+Script = Tuple[str, dict]
+
+
+def flat(size: int) -> Script:
+    """Длинный список присваиваний.
+    """
+    return ''.join(f'x{i} = {i} + y * 2 - {i} / 4;\n'
+                   for i in range(size)), INPUT
+
+
+def elif_chain(size: int) -> Script:
+    """Длинная цепочка ИНАЧЕ_ЕСЛИ, срабатывает последняя ветка.
+    """
+    branches = ' '.join(f'ИНАЧЕ_ЕСЛИ (y == {i + 100}) {{z = {i};}}'
+                        for i in range(size))
+    return f'ЕСЛИ (y == 0) {{z = -1;}} {branches} ИНАЧЕ {{z = y;}};\nz', \
+        INPUT
+
+
+def deep(size: int) -> Script:
+    """Глубоко вложенные скобки и условия.
+    """
+    expression = '(' * size + 'y + 1' + ')' * size
+    conditions = 'ЕСЛИ (y > 0) {' * (size // 4) + f'z = {expression};' \
+                 + '}' * (size // 4) + ';'
+    return f'{conditions}\nz', INPUT
+
+
+def calls(size: int) -> Script:
+    """Много вызовов стандартных функций.
+    """
+    return ''.join(f'x{i} = СУММ(ABS(-{i}), ОКРУГЛ(y / 3, 2), '
+                   f'МАКС(y, {i}, МИН({i}, 7)));\n'
+                   for i in range(size)), INPUT
+
+
+def strings(size: int) -> Script:
+    """Много строк и строковых функций.
+    """
+    return ''.join(f's{i} = СЦЕПИТЬ("строка номер {i}", '
+                   f'ПРОПИСН("текст"), ТЕКСТ(y));\n'
+                   for i in range(size)), INPUT
+
+
+def names(size: int) -> Script:
+    """Много чтений и записей переменных.
+    """
+    return 'a = y; b = y; x = 0;\n' + ''.join(
+        f'x = a + b * y - x;\na = x; b = МАКС(a, b, y);\n'
+        for _ in range(size)) + 'x + a', INPUT
+
+
+def literals(size: int) -> Script:
+    """Много числовых и строковых литералов в выражениях.
+    """
+    return ''.join(f'x{i} = 1.25 * {i} + 3.5 / 7 - 0.125 + y;\n'
+                   f's{i} = "строка " + "номер";\n'
+                   for i in range(size)), INPUT
+
+
+def generated(size: int) -> Script:
+    """Смесь всего из ScriptGenerator, size - количество токенов.
+    """
+    generator = ScriptGenerator(seed=0, tokens=size)
+    return generator.script(), generator.namespace()
+
+
+# форма -> (функция, размер, размер для --quick)
+SHAPES: Dict[str, tuple] = {
+    'flat': (flat, 200, 20),
+    'elif_chain': (elif_chain, 100, 10),
+    'deep': (deep, 100, 10),
+    'calls': (calls, 100, 10),
+    'strings': (strings, 100, 10),
+    'literals': (literals, 100, 10),
+    'names': (names, 100, 10),
+    'generated': (generated, 3_000, 300),
+}
+
+
+# Замеры -------------------------
+
+
+def measure(action: Callable, prepare: Optional[Callable] = None) -> float:
+    """Лучшее время одного вызова action, в секундах.
+
+    prepare вызывается перед каждым action, но не замеряется.
+    Количество вызовов в повторе подбирается так, чтобы повтор
+    длился не меньше MIN_TIME. Сборщик мусора на время замера
+    выключается, как в timeit.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _measure(action, prepare)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _measure(action: Callable, prepare: Optional[Callable]) -> float:
+    """Сам замер для measure.
+    """
+    number = 1
+    while True:
+        timings = []
+        for _ in range(REPEATS):
+            total = 0.0
+            for _ in range(number):
+                if prepare is not None:
+                    prepare()
+                start = time.perf_counter()
+                action()
+                total += time.perf_counter() - start
+            timings.append(total)
+
+            if total < MIN_TIME:
+                break
+
+        if min(timings) >= MIN_TIME or number >= 1_000_000:
+            return min(timings) / number
+
+        number *= 10 if min(timings) * 10 < MIN_TIME else 2
+
+
+def peak_memory(action: Callable, prepare: Optional[Callable] = None) -> int:
+    """Пиковая память одного вызова action, в байтах.
+    """
+    if prepare is not None:
+        prepare()
+
+    tracemalloc.start()
+    try:
+        action()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def count_nodes(root: BaseNode) -> int:
+    """Количество узлов дерева.
+    """
+    return sum(1 for _ in root.iter_recursively())
+
+
+def cases(text: str, inputs: dict) -> Dict[str, tuple]:
+    """Замеры для одного скрипта.
+
+    Замер -> (действие, подготовка, количество единиц, единица).
+    """
+    lexer = Lexer()
+    lexer.analyze(text)
+    tokens = len(lexer.stream)
+    root = Parser(lexer).parse()
+    nodes = count_nodes(root)
+    lexer.analyze(text)
+    optimized = optimize(Parser(lexer).parse())
+    closures = compile_closures(root)
+    printer = NodeTreePrinter(colored=False)
+
+    return {
+        'lexer': (lambda: lexer.analyze(text), None, tokens, 'tokens/s'),
+        'parser': (lambda: Parser(lexer).parse(),
+                   lambda: lexer.analyze(text), nodes, 'nodes/s'),
+        'evaluate': (lambda: root.evaluate(Namespace(dict(inputs))),
+                     None, 1, 'evals/s'),
+        'evaluate_optimized': (lambda: optimized.evaluate(
+            Namespace(dict(inputs))), None, 1, 'evals/s'),
+        'evaluate_closures': (lambda: closures(Namespace(dict(inputs))),
+                              None, 1, 'evals/s'),
+        'serialize_to_text': (lambda: serialize_to_text(root),
+                              None, nodes, 'nodes/s'),
+        'serialize_to_python': (lambda: serialize_to_python(root),
+                                None, nodes, 'nodes/s'),
+        'describe': (lambda: printer.describe(root), None, nodes, 'nodes/s'),
+        'verbose_eval': (lambda: verbose_eval(text, colored=False,
+                                              namespace=Namespace(
+                                                  dict(inputs))),
+                         None, 1, 'evals/s'),
+    }
+
+
+def run(quick: bool = False, log: Callable = print) -> dict:
+    """Выполнить все замеры.
+    """
+    results = {}
+
+    for shape, (make_script, size, quick_size) in SHAPES.items():
+        size = quick_size if quick else size
+        text, inputs = make_script(size)
+
+        for case, (action, prepare, units, unit) in cases(text,
+                                                          inputs).items():
+            seconds = measure(action, prepare)
+            name = f'{case}/{shape}'
+            results[name] = {
+                'size': size,
+                'seconds': seconds,
+                'throughput': units / seconds,
+                'unit': unit,
+                'peak_memory': peak_memory(action, prepare),
+            }
+            log(_format_result(name, results[name]))
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict,
+            threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """Сравнить результаты с эталоном.
+
+    Замер считается ухудшением, если пропускная способность упала
+    или пиковая память выросла больше, чем на threshold (доля).
+    """
+    rows = []
+
+    for name, new in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None or old['size'] != new['size']:
+            continue
+
+        speed = new['throughput'] / old['throughput']
+        memory = new['peak_memory'] / max(old['peak_memory'], 1)
+        rows.append({
+            'name': name,
+            'speed': speed,
+            'memory': memory,
+            'regression': speed < 1 - threshold or memory > 1 + threshold,
+        })
+
+    return rows
+
+
+def _format_result(name: str, result: dict) -> str:
+    """Строка с результатом одного замера.
+    """
+    return f'{name:<32} {result["throughput"]:14.1f} {result["unit"]:<9}' \
+           f'{result["peak_memory"] / 1024:10.1f} КиБ'
+
+
+# Точка входа -------------------------
+
+
+def main(arguments: List[str] = None) -> int:
+    """Точка входа.
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_command = commands.add_parser('run', help='выполнить замеры')
+    run_command.add_argument('-o', '--output', default='benchmarks.json',
+                             help='куда записать результаты')
+    run_command.add_argument('--quick', action='store_true',
+                             help='маленькие скрипты, для проверки')
+
+    compare_command = commands.add_parser('compare',
+                                          help='сравнить с эталоном')
+    compare_command.add_argument('baseline')
+    compare_command.add_argument('current')
+    compare_command.add_argument('--threshold', type=float,
+                                 default=DEFAULT_THRESHOLD,
+                                 help='допустимое ухудшение, доля')
+
+    arguments = parser.parse_args(arguments)
+
+    if arguments.command == 'run':
+        results = run(arguments.quick)
+        with open(arguments.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=4)
+        print(f'результаты записаны в {arguments.output}')
+        return 0
+
+    with open(arguments.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    with open(arguments.current, encoding='utf-8') as file:
+        current = json.load(file)
+
+    rows = compare(baseline, current, arguments.threshold)
+    print(f'{"замер":<32} {"скорость":>9} {"память":>9}')
+    for row in rows:
+        mark = '  ХУЖЕ' if row['regression'] else ''
+        print(f'{row["name"]:<32} {row["speed"]:9.2f} '
+              f'{row["memory"]:9.2f}{mark}')
+
+    regressions = sum(row['regression'] for row in rows)
+    print(f'ухудшений: {regressions} из {len(rows)}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+
+"""Кэш разобранных программ в памяти и на диске.
+
+Ключом служит хэш исходного текста вместе с настройками языка,
+поэтому одинаковые скрипты разбираются только один раз.
+"""
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional, Dict, Union, Iterable
+
+from exceltranslator import settings
+
+__all__ = [
+    'ProgramCache',
+    'DiskCache',
+    'make_key',
+    'make_fingerprint',
+    'estimate_size',
+    'default_cache',
+]
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# модули, от которых зависит устройство сохранённых деревьев
+GRAMMAR_MODULES = (
+    'helpers/informer.py',
+    'lexer/base_tokens.py',
+    'lexer/tokens.py',
+    'parser/base_nodes.py',
+    'parser/nodes.py',
+    'parser/optimizer.py',
+    'parser/parser.py',
+)
+DISK_SUFFIX = '.pickle'
+
+
+def make_key(source: str, variant: str = '') -> str:
+    """Вычислить ключ кэша для исходного текста.
+
+    Вариант позволяет хранить разные формы одной и той же программы.
+    """
+    digest = hashlib.sha256()
+    digest.update(
+        f'{settings.DEFAULT_PRECISION}|{settings.EPSILON}|{variant}|'
+        .encode('utf-8')
+    )
+    digest.update(source.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def make_fingerprint(modules: Iterable[str] = GRAMMAR_MODULES) -> str:
+    """Вычислить отпечаток грамматики.
+
+    Меняется при любом изменении модулей с токенами и узлами,
+    а также при смене версии Python.
+    """
+    root = Path(__file__).parent
+    digest = hashlib.sha256()
+    digest.update(f'{sys.version_info[:2]}|{pickle.HIGHEST_PROTOCOL}'
+                  .encode('utf-8'))
+    for module in modules:
+        digest.update(module.encode('utf-8'))
+        digest.update((root / module).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def estimate_size(program: Any) -> int:
+    """Приблизительно оценить занимаемую программой память в байтах.
+
+    Учитываются сами узлы, их атрибуты и исходный текст токенов.
+    """
+    program = getattr(program, 'root', program)
+    if not hasattr(program, 'iter_recursively'):
+        return sys.getsizeof(program)
+
+    total = 0
+    for node, _ in program.iter_recursively():
+        total += sys.getsizeof(node)
+        attributes = getattr(node, '__dict__', {})
+        total += sys.getsizeof(attributes)
+        for value in attributes.values():
+            source_code = getattr(value, 'source_code', None)
+            if source_code is not None:
+                total += sys.getsizeof(value) + sys.getsizeof(source_code)
+    return total
+
+
+class ProgramCache:
+    """Кэш разобранных программ с вытеснением давно не используемых.
+
+    Ограничен как числом записей, так и примерным объёмом памяти.
+    Безопасен для использования из нескольких потоков.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 disk: Optional['DiskCache'] = None) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        # ключ записи -> ключ текста без варианта, и сколько вариантов
+        # каждого текста сохранено
+        self._sources: Dict[str, str] = {}
+        self._variants: Counter = Counter()
+        self._lock = threading.RLock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """Количество записей.
+        """
+        return len(self._entries)
+
+    def __contains__(self, source: str) -> bool:
+        """Есть ли программа для этого текста в любом варианте.
+        """
+        return self._variants[make_key(source)] > 0
+
+    def contains(self, source: str, variant: str = '') -> bool:
+        """Есть ли программа для этого текста и варианта.
+        """
+        return make_key(source, variant) in self._entries
+
+    def __repr__(self) -> str:
+        """Вернуть текстовое представление.
+        """
+        return type(self).__name__ + f'({len(self)} записей, ' \
+                                     f'{self.bytes} байт)'
+
+    def get(self, source: str, variant: str = '') -> Optional[Any]:
+        """Получить программу из кэша.
+        """
+        key = make_key(source, variant)
+        with self._lock:
+            program = self._entries.get(key)
+            if program is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return program
+
+    def put(self, source: str, program: Any, variant: str = '') -> None:
+        """Сохранить программу в кэш.
+        """
+        key = make_key(source, variant)
+        size = estimate_size(program)
+
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = program
+            self._sizes[key] = size
+            self._sources[key] = make_key(source)
+            self._variants[self._sources[key]] += 1
+            self.bytes += size
+
+            while len(self._entries) > self.max_entries \
+                    or self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def get_or_compile(self, source: str, factory: Callable[[str], Any],
+                       variant: str = '') -> Any:
+        """Получить программу из кэша или собрать и сохранить её.
+
+        При промахе сначала проверяется дисковый кэш, если он задан.
+        """
+        program = self.get(source, variant)
+        if program is not None:
+            return program
+
+        if self.disk is not None:
+            program = self.disk.get_or_compile(source, factory, variant)
+        else:
+            program = factory(source)
+
+        self.put(source, program, variant)
+        return program
+
+    def clear(self) -> None:
+        """Удалить все записи, счётчики не сбрасываются.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._sources.clear()
+            self._variants.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Сводка по использованию кэша.
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _discard(self, key: str) -> None:
+        """Удалить запись по ключу.
+        """
+        del self._entries[key]
+        self.bytes -= self._sizes.pop(key)
+        source_key = self._sources.pop(key)
+        self._variants[source_key] -= 1
+        if not self._variants[source_key]:
+            del self._variants[source_key]
+
+
+class DiskCache:
+    """Дисковый кэш разобранных программ.
+
+    Каждая программа хранится в отдельном файле внутри каталога,
+    названного по отпечатку грамматики. После изменения токенов
+    или узлов старые файлы просто перестают находиться.
+    """
+
+    def __init__(self, directory: Union[str, Path],
+                 fingerprint: Optional[str] = None) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.root = Path(directory)
+        self.fingerprint = fingerprint or make_fingerprint()
+        self.directory = self.root / self.fingerprint
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def __repr__(self) -> str:
+        """Вернуть текстовое представление.
+        """
+        return type(self).__name__ + f'({str(self.directory)!r})'
+
+    def path(self, source: str, variant: str = '') -> Path:
+        """Путь к файлу с программой для этого текста.
+        """
+        return self.directory / (make_key(source, variant) + DISK_SUFFIX)
+
+    def get(self, source: str, variant: str = '') -> Optional[Any]:
+        """Прочитать программу с диска.
+
+        Повреждённые файлы удаляются и считаются промахом.
+        """
+        path = self.path(source, variant)
+        try:
+            with open(path, 'rb') as file:
+                program = pickle.load(file)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError,
+                ImportError, IndexError, TypeError, ValueError):
+            self.errors += 1
+            self.misses += 1
+            path.unlink(missing_ok=True)
+            return None
+
+        self.hits += 1
+        return program
+
+    def put(self, source: str, program: Any, variant: str = '') -> bool:
+        """Записать программу на диск.
+
+        Запись атомарна: файл сначала пишется во временный,
+        а затем переименовывается. Вернёт False, если программу
+        не удалось сохранить.
+        """
+        try:
+            data = pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, RecursionError,
+                AttributeError, TypeError):
+            self.errors += 1
+            return False
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=self.directory,
+                                             suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                file.write(data)
+            os.replace(temporary, self.path(source, variant))
+        except OSError:
+            self.errors += 1
+            Path(temporary).unlink(missing_ok=True)
+            return False
+
+        return True
+
+    def get_or_compile(self, source: str, factory: Callable[[str], Any],
+                       variant: str = '') -> Any:
+        """Прочитать программу с диска или собрать и записать её.
+        """
+        program = self.get(source, variant)
+        if program is None:
+            program = factory(source)
+            self.put(source, program, variant)
+        return program
+
+    def prune(self) -> int:
+        """Удалить каталоги, оставшиеся от прежних версий грамматики.
+        """
+        if not self.root.exists():
+            return 0
+
+        removed = 0
+        for child in self.root.iterdir():
+            if child.is_dir() and child.name != self.fingerprint:
+                shutil.rmtree(child, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Удалить все файлы текущей версии грамматики.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+default_cache = ProgramCache()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""Компиляция синтаксического дерева в байткод python.
+
+Дерево переводится в функцию на python (через python_ast, без текста),
+которая один раз компилируется встроенным compile, после чего программа
+исполняется интерпретатором python без обхода узлов. Текст той же
+функции можно получить через translate, например для отладки.
+
+Переменные скрипта хранятся в словаре пространства имён, а не
+в локальных переменных, поэтому любые имена скрипта допустимы.
+Функции ищутся в пространстве имён при вызове, поэтому стандартные
+функции можно подменить. Только ленивые стандартные функции, пока
+они не подменены, вызываются напрямую из окружения runtime.
+
+События узлов не отправляются, наблюдатель пространства имён
+по-прежнему получает события чтения и записи.
+"""
+import ast
+from typing import Any, Callable
+
+from exceltranslator.compiler.closures import ObservedNamespace
+from exceltranslator.compiler.python_ast import FUNCTION_NAME, build
+from exceltranslator.compiler.runtime import make_globals
+from exceltranslator.exceptions import CustomCompilationError
+from exceltranslator.helpers.namespace_wrapper import NamespaceWrapper
+from exceltranslator.parser.base_nodes import BaseNode
+
+__all__ = [
+    'compile_bytecode',
+    'translate',
+]
+
+
+def translate(root: BaseNode) -> str:
+    """Перевести дерево в текст функции на python.
+
+    Функция принимает словарь имён и возвращает последнее
+    вычисленное значение (или None).
+    """
+    return ast.unparse(build(root))
+
+
+def compile_bytecode(root: BaseNode, source: str = '') \
+        -> Callable[[NamespaceWrapper], Any]:
+    """Скомпилировать дерево в функцию от пространства имён.
+
+    По исходному тексту код получает номера строк скрипта.
+    Выбросит CustomCompilationError, если дерево нельзя перевести
+    в python (например, присваивание на месте операнда
+    или слишком глубокая вложенность).
+    """
+    try:
+        code = compile(build(root, source), '<exceltranslator>', 'exec')
+    except (RecursionError, MemoryError, SyntaxError) as exc:
+        raise CustomCompilationError(
+            f'Дерево не удалось скомпилировать в байткод: {exc!r}'
+        ) from None
+
+    scope = make_globals()
+    exec(code, scope)
+    body = scope[FUNCTION_NAME]
+
+    def run(namespace: NamespaceWrapper) -> Any:
+        """Исполнить программу.
+        """
+        if namespace.watched:
+            return body(ObservedNamespace(namespace))
+        return body(namespace.contents)
+
+    return run
@@ -0,0 +1,483 @@
+# -*- coding: utf-8 -*-
+
+"""Компиляция синтаксического дерева во вложенные замыкания.
+
+Каждый узел один раз превращается в функцию, которая сразу возвращает
+значение. Литералы раскодируются, а операторы выбираются ещё во время
+компиляции, поэтому при исполнении остаётся только сама работа.
+
+Каждому имени скрипта при компиляции назначается номер ячейки,
+и замыкания работают со списком значений (кадром), а не со словарём.
+Пространство имён читается в кадр перед исполнением, а переменные,
+присваивание которым действительно выполнилось, записываются обратно
+после него, в том числе при ошибке.
+
+События узлов (operator_use, call и т.п.) не отправляются. Если у
+пространства имён есть наблюдатель, кадр обращается к нему напрямую,
+и события чтения и записи отправляются как обычно.
+"""
+from functools import singledispatch
+from typing import Any, Callable, Dict, List
+
+from exceltranslator.defined_names import LAZY_FUNCTIONS
+from exceltranslator.exceptions import (
+    CustomSemanticError,
+    CustomSyntaxError,
+    CustomCompilationError,
+)
+from exceltranslator.helpers.namespace_wrapper import NamespaceWrapper
+from exceltranslator.parser.base_nodes import *
+from exceltranslator.parser.nodes import *
+from exceltranslator.settings import DEFAULT_PRECISION
+from exceltranslator.utils import math_round
+
+__all__ = [
+    'compile_closures',
+    'NOTHING',
+]
+
+# инструкция выполнена, но значения не оставила
+NOTHING = object()
+
+# функция, вычисляющая значение по кадру
+Closure = Callable[[Any], Any]
+
+
+class Slots:
+    """Номера ячеек кадра для имён скрипта.
+
+    Кадр - значения всех имён по номерам ячеек, а после них флаги
+    записи для имён, которым скрипт присваивает значения. Флаги
+    адресуются отрицательными номерами от конца кадра, потому что
+    количество имён становится известно только в конце компиляции.
+    """
+
+    def __init__(self) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.names: List[str] = []
+        self.indexes: Dict[str, int] = {}
+        self.flags: Dict[int, int] = {}  # номер ячейки -> номер флага
+
+    def index(self, name: str) -> int:
+        """Номер ячейки для имени, новое имя получает следующий номер.
+        """
+        index = self.indexes.get(name)
+        if index is None:
+            index = self.indexes[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def flag(self, index: int) -> int:
+        """Номер флага записи для ячейки, отрицательный.
+        """
+        flag = self.flags.get(index)
+        if flag is None:
+            flag = self.flags[index] = -len(self.flags) - 1
+        return flag
+
+
+class ObservedNamespace:
+    """Доступ к пространству имён через его методы, с оповещениями.
+
+    Ведёт себя как словарь ровно настолько, насколько это нужно
+    байткоду.
+    """
+
+    def __init__(self, namespace: NamespaceWrapper) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.namespace = namespace
+
+    def get(self, key: str) -> Any:
+        """Получить значение по ключу.
+        """
+        return self.namespace.get(None, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """Внести значение по ключу.
+        """
+        self.namespace.set(None, key, value)
+
+
+class ObservedFrame:
+    """Кадр, который обращается к пространству имён через его методы.
+
+    Ведёт себя как список ровно настолько, насколько это нужно замыканиям.
+    """
+
+    def __init__(self, namespace: NamespaceWrapper, names: List[str]) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.namespace = namespace
+        self.names = names
+
+    def __getitem__(self, index: int) -> Any:
+        """Получить значение по номеру ячейки.
+        """
+        return self.namespace.get(None, self.names[index])
+
+    def __setitem__(self, index: int, value: Any) -> None:
+        """Внести значение по номеру ячейки.
+
+        Флаги записи не нужны: значение сразу попадает в пространство имён.
+        """
+        if index >= 0:
+            self.namespace.set(None, self.names[index], value)
+
+
+def compile_closures(root: BaseNode, source: str = '') \
+        -> Callable[[NamespaceWrapper], Any]:
+    """Скомпилировать дерево в функцию от пространства имён.
+
+    Исходный текст не используется.
+
+    Выбросит CustomCompilationError, если в дереве есть конструкции,
+    результат которых зависит от содержимого стека интерпретатора
+    (например, присваивание на месте операнда).
+    """
+    slots = Slots()
+    try:
+        body = _statement(root, slots)
+    except RecursionError:
+        raise CustomCompilationError(
+            'Дерево слишком глубокое для компиляции в замыкания.'
+        ) from None
+
+    names = slots.names
+    written = [(index, flag, names[index])
+               for index, flag in sorted(slots.flags.items())]
+    unset = [False] * len(written)
+
+    def run(namespace: NamespaceWrapper) -> Any:
+        """Исполнить программу.
+        """
+        if namespace.watched:
+            result = body(ObservedFrame(namespace, names))
+        else:
+            contents = namespace.contents
+            frame = [contents.get(name) for name in names] + unset
+            try:
+                result = body(frame)
+            finally:
+                for index, flag, name in written:
+                    if frame[flag]:
+                        contents[name] = frame[index]
+
+        if result is NOTHING:
+            return None
+        return result
+
+    return run
+
+
+def _unsupported(node: BaseNode) -> CustomCompilationError:
+    """Сформировать ошибку для неподдерживаемого узла.
+    """
+    return CustomCompilationError(
+        f'Узел {node!r} не может быть скомпилирован в замыкание.'
+    )
+
+
+# Инструкции -------------------------
+
+
+@singledispatch
+def _statement(node: BaseNode, slots: Slots) -> Closure:
+    """Инструкция: возвращает последнее оставленное значение или NOTHING.
+
+    По умолчанию узел считается выражением.
+    """
+    return _value(node, slots)
+
+
+def _sequence(node: BaseNode, slots: Slots) -> Closure:
+    """Последовательность инструкций.
+    """
+    statements: List[Closure] = [_statement(x, slots)
+                                 for x in node.sub_nodes]
+
+    if len(statements) == 1:
+        return statements[0]
+
+    def run(frame):
+        last = NOTHING
+        for statement in statements:
+            value = statement(frame)
+            if value is not NOTHING:
+                last = value
+        return last
+
+    return run
+
+
+_statement.register(InstructionNode, _sequence)
+_statement.register(ScopeNode, _sequence)
+_statement.register(ParNode, _sequence)
+_statement.register(UnaryMinusNode, _sequence)
+
+
+@_statement.register
+def _statement_stop(node: StopNode, slots: Slots) -> Closure:
+    """Остановка ничего не делает.
+    """
+    return lambda frame: NOTHING
+
+
+@_statement.register
+def _statement_assignment(node: AssigmentNode, slots: Slots) -> Closure:
+    """Присваивание.
+    """
+    if not isinstance(node.left_operand, VarNode):
+        raise _unsupported(node)
+
+    name = node.left_operand.value.source_code
+    index = slots.index(name)
+    flag = slots.flag(index)
+    value_of = _value(node.right_operand, slots)
+    bad_name = bool(name) and name[0].isdigit()
+
+    def run(frame):
+        value = value_of(frame)
+        existing = frame[index]
+
+        if existing is not None \
+                and not (isinstance(value, (int, float))
+                         and isinstance(existing, (int, float))) \
+                and not isinstance(value, type(existing)):
+            raise CustomSemanticError(
+                f'Попытка изменения типа при присвоении значения, '
+                f'переменная "{name}" была '
+                f'<{type(existing).__name__}> '
+                f'а присваивается <{type(value).__name__}>.'
+            )
+
+        if bad_name:
+            raise CustomSyntaxError(
+                f'Для переменных допускатся только имена, '
+                f'начинающиеся не с цифры. {name} не подойдёт.'
+            )
+
+        frame[index] = value
+        frame[flag] = True
+        return NOTHING
+
+    return run
+
+
+@_statement.register
+def _statement_condition(node: ConditionNode, slots: Slots) -> Closure:
+    """Условие с ветками.
+    """
+    branches = []
+    for child in node.sub_nodes:
+        if isinstance(child, ElseNode):
+            predicate = None
+        else:
+            predicate = _value(child.predicate, slots)
+        branches.append((predicate, _statement(child.sub_scope, slots)))
+
+    def run(frame):
+        for predicate, scope in branches:
+            if predicate is None or predicate(frame):
+                return scope(frame)
+        return NOTHING
+
+    return run
+
+
+# Выражения -------------------------
+
+
+@singledispatch
+def _value(node: BaseNode, slots: Slots) -> Closure:
+    """Выражение: всегда возвращает ровно одно значение.
+    """
+    raise _unsupported(node)
+
+
+@_value.register
+def _value_assignment(node: AssigmentNode, slots: Slots) -> Closure:
+    """Присваивание не оставляет значения.
+    """
+    raise _unsupported(node)
+
+
+@_value.register
+def _value_variable(node: VarNode, slots: Slots) -> Closure:
+    """Литерал, раскодированный при создании узла.
+    """
+    constant = node.decoded
+    if constant is UNDECODED:
+        raise _unsupported(node)
+
+    return lambda frame: constant
+
+
+@_value.register
+def _value_constant(node: ConstantNode, slots: Slots) -> Closure:
+    """Значение, вычисленное заранее.
+    """
+    constant = node.constant
+    return lambda frame: constant
+
+
+@_value.register
+def _value_name(node: NameNode, slots: Slots) -> Closure:
+    """Ссылка на имя.
+    """
+    name = node.value.source_code
+    index = slots.index(name)
+
+    def run(frame):
+        variable = frame[index]
+
+        if variable is None:
+            raise CustomSemanticError(
+                f'Переменная с именем "{name}" не найдена.')
+
+        if isinstance(variable, float):
+            return math_round(variable, DEFAULT_PRECISION)
+        return variable
+
+    return run
+
+
+def _single_child(node: BaseNode, slots: Slots) -> Closure:
+    """Узел, значение которого - значение единственного потомка.
+    """
+    if len(node.sub_nodes) != 1:
+        raise _unsupported(node)
+    return _value(node.sub_nodes[0], slots)
+
+
+_value.register(ParNode, _single_child)
+_value.register(UnaryMinusNode, _single_child)
+
+
+@_value.register
+def _value_not(node: UnaryNotNode, slots: Slots) -> Closure:
+    """Логическое отрицание.
+    """
+    operand = _single_child(node, slots)
+    return lambda frame: int(not operand(frame))
+
+
+@_value.register
+def _value_binary(node: BinaryNode, slots: Slots) -> Closure:
+    """Бинарный оператор.
+    """
+    left_of = _value(node.left_operand, slots)
+    right_of = _value(node.right_operand, slots)
+    operator = node.function
+    figure = node.operator.figure
+    is_division = node.divides
+
+    def run(frame):
+        left = left_of(frame)
+        right = right_of(frame)
+
+        if is_division and right == 0:
+            return float('inf')
+
+        if (isinstance(left, (int, float))
+                and isinstance(right, (int, float))) \
+                or (type(left) == str and type(right) == str):
+            result = operator(left, right)
+        else:
+            raise CustomSemanticError(
+                f'Нельзя осуществлять операцию {left!r} '
+                f'{figure} {right!r}'
+            )
+
+        if isinstance(result, float):
+            return math_round(result, DEFAULT_PRECISION)
+        return result
+
+    return run
+
+
+@_value.register
+def _value_logical(node: LogicalNode, slots: Slots) -> Closure:
+    """Логический оператор, возвращает 0 или 1.
+    """
+    left_of = _value(node.left_operand, slots)
+    right_of = _value(node.right_operand, slots)
+    operator = node.function
+
+    if node.stop_on is False:
+        def run(frame):
+            return int(bool(left_of(frame)) and bool(right_of(frame)))
+    elif node.stop_on is True:
+        def run(frame):
+            return int(bool(left_of(frame)) or bool(right_of(frame)))
+    else:
+        def run(frame):
+            left = left_of(frame)
+            right = right_of(frame)
+            return int(operator(left, right))
+
+    return run
+
+
+@_value.register
+def _value_call(node: CallNode, slots: Slots) -> Closure:
+    """Вызов функции.
+    """
+    name = node.name.value.source_code
+    index = slots.index(name)
+    arguments = [_value(x, slots) for x in node.sub_nodes[1:]]
+
+    if name in LAZY_FUNCTIONS:
+        return _lazy_call(name, index, arguments)
+
+    def run(frame):
+        operands = [argument(frame) for argument in arguments]
+        function = frame[index]
+
+        if function is None:
+            raise CustomSemanticError(
+                f'Функция с названием "{name}" не найдена.')
+
+        if not callable(function):
+            raise CustomSemanticError(
+                f'Объект с названием "{name}" не является вызываемым.')
+
+        return function(*operands)
+
+    return run
+
+
+def _lazy_call(name: str, index: int, arguments: List[Closure]) -> Closure:
+    """Вызов функции, которая может быть ленивой (см. LAZY_FUNCTIONS).
+
+    Функция ищется до вычисления аргументов. Если она помечена как
+    ленивая, аргументы вычисляются, пока результат не станет известен,
+    иначе вызов обычный.
+    """
+    def run(frame):
+        function = frame[index]
+        lazy = getattr(function, 'lazy', None)
+
+        if lazy is None:
+            operands = [argument(frame) for argument in arguments]
+        else:
+            stop_on, stop_result = lazy
+            operands = []
+            for argument in arguments:
+                value = argument(frame)
+                if bool(value) is stop_on:
+                    return stop_result
+                operands.append(value)
+
+        if function is None:
+            raise CustomSemanticError(
+                f'Функция с названием "{name}" не найдена.')
+
+        if not callable(function):
+            raise CustomSemanticError(
+                f'Объект с названием "{name}" не является вызываемым.')
+
+        return function(*operands)
+
+    return run
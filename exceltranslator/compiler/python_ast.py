@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+
+"""Построение синтаксического дерева python (модуль ast) без текста.
+
+Дерево скрипта сразу переводится в узлы ast, которые компилируются
+встроенным compile без повторного разбора текста. Узлы получают
+номера строк и столбцов исходного скрипта, поэтому в трассировке
+ошибок видно, какая строка скрипта выполнялась.
+
+Текст получившегося кода для отладки выдаёт bytecode.translate.
+"""
+import ast
+from bisect import bisect_right
+from functools import singledispatch
+from operator import add, ge, gt, le, lt, mul, sub, truediv
+from typing import Any, Dict, List, Optional
+
+from exceltranslator.defined_names import LAZY_FUNCTIONS
+from exceltranslator.exceptions import CustomCompilationError
+from exceltranslator.lexer.base_tokens import BaseToken
+from exceltranslator.lexer.positions import LineIndex
+from exceltranslator.lexer.tokens import good_eq, good_ne
+from exceltranslator.parser.base_nodes import *
+from exceltranslator.parser.nodes import *
+from exceltranslator.parser.serialization import NAME_REPLACEMENTS
+
+__all__ = [
+    'build',
+    'Locator',
+]
+
+# имя функции внутри сгенерированного кода
+FUNCTION_NAME = 'program'
+
+# Операторы выбираются по функции, которую узел получил при создании
+# (BinaryNode.function), и по LogicalNode.stop_on.
+
+# бинарные операторы -> вспомогательные функции из runtime
+ARITHMETIC = {
+    pow: 'power',
+    mul: 'multiply',
+    truediv: 'divide',
+    add: 'plus',
+    sub: 'minus',
+}
+
+# логические операторы, которые нельзя записать напрямую
+LOGICAL = {
+    good_eq: 'equal',
+    good_ne: 'not_equal',
+}
+
+# И и ИЛИ: значение левого операнда, на котором правый
+# не вычисляется -> оператор python
+SHORT_CIRCUIT = {
+    False: ast.And,
+    True: ast.Or,
+}
+
+# сравнения, одинаковые в python и в скриптах
+COMPARISONS = {
+    lt: ast.Lt,
+    gt: ast.Gt,
+    le: ast.LtE,
+    ge: ast.GtE,
+}
+
+
+# положение узла ast: lineno, col_offset, end_lineno, end_col_offset
+Position = Dict[str, int]
+
+# общие для всех узлов контексты
+LOAD = ast.Load()
+STORE = ast.Store()
+
+
+class Locator(LineIndex):
+    """Перевод номера символа в положение узла ast.
+
+    Заодно выдаёт листья (имена и константы) для построения: одинаковые
+    листья в пределах строки скрипта - это один и тот же узел ast,
+    compile это допускает, а построение заметно ускоряется.
+    """
+
+    def __init__(self, source: str = '') -> None:
+        """Инициализировать экземпляр.
+        """
+        super().__init__(source)
+        self.leaves: Dict[tuple, ast.expr] = {}
+
+    def position(self, token: Optional[BaseToken],
+                 default: Position) -> Position:
+        """Положение токена в исходном тексте.
+
+        Если положение токена неизвестно, возвращается default.
+        """
+        if token is None or token.span is None:
+            return default
+
+        start, end = token.span
+        starts = self.starts
+        lineno = bisect_right(starts, start)
+        col_offset = start - starts[lineno - 1]
+
+        if lineno < len(starts) and end > starts[lineno]:
+            end_lineno, end_col_offset = self(end)
+        else:
+            end_lineno, end_col_offset = lineno, col_offset + end - start
+
+        return {'lineno': lineno, 'col_offset': col_offset,
+                'end_lineno': end_lineno, 'end_col_offset': end_col_offset}
+
+    def load(self, name: str, where: Position) -> ast.expr:
+        """Ссылка на имя, в том числе с точкой (math.ceil).
+        """
+        key = (name, where['lineno'])
+        output = self.leaves.get(key)
+
+        if output is None:
+            if '.' in name:
+                head, *tail = name.split('.')
+                output = ast.Name(head, LOAD, **where)
+                for attribute in tail:
+                    output = ast.Attribute(output, attribute, LOAD, **where)
+            else:
+                output = ast.Name(name, LOAD, **where)
+            self.leaves[key] = output
+
+        return output
+
+    def constant(self, value: Any, where: Position) -> ast.expr:
+        """Константа.
+
+        Числа сравниваются по записи, чтобы -0.0 не совпал с 0.0.
+        """
+        key = (type(value), repr(value) if isinstance(value, float)
+               else value, where['lineno'])
+        output = self.leaves.get(key)
+
+        if output is None:
+            output = ast.Constant(value, **where)
+            self.leaves[key] = output
+
+        return output
+
+
+# положение кода, которого нет в скрипте
+START: Position = {'lineno': 1, 'col_offset': 0,
+                   'end_lineno': 1, 'end_col_offset': 0}
+
+
+def build(root: BaseNode, source: str = '') -> ast.Module:
+    """Построить модуль с функцией от словаря имён.
+
+    Функция возвращает последнее вычисленное значение (или None).
+    Если исходный текст не передан, все узлы будут на первой строке.
+
+    Положение проставляется каждому узлу при создании, потому что
+    ast.fix_missing_locations обходит всё дерево заново и занимает
+    больше времени, чем само построение.
+    """
+    locate = Locator(source)
+    body = [_assign_result(ast.Constant(None, **START), START)]
+    _statement(root, body, locate)
+    body.append(ast.Return(locate.load('result', START), **START))
+
+    function = ast.FunctionDef(
+        name=FUNCTION_NAME,
+        args=ast.arguments(
+            posonlyargs=[], args=[ast.arg('names', **START)], kwonlyargs=[],
+            kw_defaults=[], defaults=[],
+        ),
+        body=body,
+        decorator_list=[],
+        returns=None,
+        **START,
+    )
+    return ast.Module(body=[function], type_ignores=[])
+
+
+def _unsupported(node: BaseNode) -> CustomCompilationError:
+    """Сформировать ошибку для неподдерживаемого узла.
+    """
+    return CustomCompilationError(
+        f'Узел {node!r} не может быть скомпилирован в байткод.'
+    )
+
+
+def _first_token(node: BaseNode) -> Optional[BaseToken]:
+    """Самый левый токен узла.
+    """
+    while not isinstance(node, VarNode):
+        if not node.sub_nodes:
+            return None
+        node = node.sub_nodes[0]
+    return node.value
+
+
+def _call(locate: Locator, function: str, where: Position,
+          *arguments: ast.expr) -> ast.Call:
+    """Вызов функции по имени.
+    """
+    return ast.Call(locate.load(function, where), list(arguments), [],
+                    **where)
+
+
+def _assign_result(value: ast.expr, where: Position) -> ast.Assign:
+    """Запомнить значение как результат.
+    """
+    return ast.Assign([ast.Name('result', STORE, **where)], value, **where)
+
+
+# Инструкции -------------------------
+
+
+@singledispatch
+def _statement(node: BaseNode, body: List[ast.stmt], locate: Locator) -> None:
+    """Инструкция: дописывает узлы ast в тело.
+
+    По умолчанию узел считается выражением, его значение
+    запоминается как результат.
+    """
+    where = locate.position(_first_token(node), START)
+    body.append(_assign_result(_value(node, locate, where), where))
+
+
+def _sequence(node: BaseNode, body: List[ast.stmt], locate: Locator) -> None:
+    """Последовательность инструкций.
+    """
+    for child in node.sub_nodes:
+        _statement(child, body, locate)
+
+
+_statement.register(InstructionNode, _sequence)
+_statement.register(ScopeNode, _sequence)
+_statement.register(ParNode, _sequence)
+_statement.register(UnaryMinusNode, _sequence)
+
+
+@_statement.register
+def _statement_stop(node: StopNode, body: List[ast.stmt],
+                    locate: Locator) -> None:
+    """Остановка ничего не делает.
+    """
+
+
+@_statement.register
+def _statement_assignment(node: AssigmentNode, body: List[ast.stmt],
+                          locate: Locator) -> None:
+    """Присваивание.
+    """
+    if not isinstance(node.left_operand, VarNode):
+        raise _unsupported(node)
+
+    name = node.left_operand.value.source_code
+    where = locate.position(node.left_operand.value, START)
+    value = _value(node.right_operand, locate, where)
+    statement = _call(locate, 'assign', where,
+                      locate.load('names', where),
+                      locate.constant(name, where), value)
+    body.append(ast.Expr(statement, **where))
+
+
+@_statement.register
+def _statement_condition(node: ConditionNode, body: List[ast.stmt],
+                         locate: Locator) -> None:
+    """Условие с ветками, ИНАЧЕ_ЕСЛИ становятся вложенными if.
+    """
+    orelse: List[ast.stmt] = []
+
+    for child in reversed(node.sub_nodes):
+        where = locate.position(_first_token(child), START)
+        branch: List[ast.stmt] = []
+        _statement(child.sub_scope, branch, locate)
+        branch = branch or [ast.Pass(**where)]
+
+        if isinstance(child, ElseNode):
+            orelse = branch
+        else:
+            test = _value(child.predicate, locate, where)
+            orelse = [ast.If(test, branch, orelse, **where)]
+
+    body.extend(orelse)
+
+
+# Выражения -------------------------
+
+
+@singledispatch
+def _value(node: BaseNode, locate: Locator, where: Position) -> ast.expr:
+    """Выражение: узел ast, вычисляющий ровно одно значение.
+
+    where - положение, если у самого узла нет токена.
+    """
+    raise _unsupported(node)
+
+
+@_value.register
+def _value_assignment(node: AssigmentNode, locate: Locator,
+                      where: Position) -> ast.expr:
+    """Присваивание не оставляет значения.
+    """
+    raise _unsupported(node)
+
+
+@_value.register
+def _value_variable(node: VarNode, locate: Locator,
+                    where: Position) -> ast.expr:
+    """Литерал, раскодированный при создании узла.
+
+    Константа не выбрасывает ошибок, поэтому её положение не ищется,
+    а берётся положение родителя.
+    """
+    if node.decoded is UNDECODED:
+        raise _unsupported(node)
+
+    return locate.constant(node.decoded, where)
+
+
+@_value.register
+def _value_constant(node: ConstantNode, locate: Locator,
+                    where: Position) -> ast.expr:
+    """Значение, вычисленное заранее.
+    """
+    return locate.constant(node.constant, where)
+
+
+@_value.register
+def _value_name(node: NameNode, locate: Locator,
+                where: Position) -> ast.expr:
+    """Ссылка на имя.
+    """
+    where = locate.position(node.value, where)
+    return _call(locate, 'read', where, locate.load('names', where),
+                 locate.constant(node.value.source_code, where))
+
+
+def _single_child(node: BaseNode, locate: Locator,
+                  where: Position) -> ast.expr:
+    """Узел, значение которого - значение единственного потомка.
+    """
+    if len(node.sub_nodes) != 1:
+        raise _unsupported(node)
+    return _value(node.sub_nodes[0], locate, where)
+
+
+_value.register(ParNode, _single_child)
+_value.register(UnaryMinusNode, _single_child)
+
+
+@_value.register
+def _value_not(node: UnaryNotNode, locate: Locator,
+               where: Position) -> ast.expr:
+    """Логическое отрицание.
+    """
+    operand = _single_child(node, locate, where)
+    return _call(locate, 'int', where,
+                 ast.UnaryOp(ast.Not(), operand, **where))
+
+
+@_value.register
+def _value_binary(node: BinaryNode, locate: Locator,
+                  where: Position) -> ast.expr:
+    """Бинарный оператор.
+    """
+    helper = ARITHMETIC.get(node.function)
+    if helper is None:
+        raise _unsupported(node)
+
+    where = locate.position(node.operator, where)
+    left = _value(node.left_operand, locate, where)
+    right = _value(node.right_operand, locate, where)
+    return _call(locate, helper, where, left, right)
+
+
+@_value.register
+def _value_logical(node: LogicalNode, locate: Locator,
+                   where: Position) -> ast.expr:
+    """Логический оператор, возвращает 0 или 1.
+    """
+    where = locate.position(node.operator, where)
+    left = _value(node.left_operand, locate, where)
+    right = _value(node.right_operand, locate, where)
+
+    if node.stop_on is not None:
+        # int(bool(left and right)) == int(bool(left) and bool(right))
+        operation = ast.BoolOp(SHORT_CIRCUIT[node.stop_on](),
+                               [left, right], **where)
+        return _call(locate, 'int', where,
+                     _call(locate, 'bool', where, operation))
+
+    if node.function in LOGICAL:
+        return _call(locate, LOGICAL[node.function], where, left, right)
+
+    if node.function in COMPARISONS:
+        comparison = ast.Compare(left, [COMPARISONS[node.function]()],
+                                 [right], **where)
+        return _call(locate, 'int', where, comparison)
+
+    raise _unsupported(node)
+
+
+@_value.register
+def _value_call(node: CallNode, locate: Locator,
+                where: Position) -> ast.expr:
+    """Вызов функции.
+
+    Функция ищется в пространстве имён при вызове, так что стандартные
+    функции можно подменить. Ленивые стандартные функции, если они
+    не подменены, вызываются напрямую из окружения с and/or вместо
+    аргументов.
+    """
+    name = node.name.value.source_code
+    where = locate.position(node.name.value, where)
+    operands = [_value(x, locate, where) for x in node.sub_nodes[1:]]
+    names = locate.load('names', where)
+    function = locate.constant(name, where)
+    call = _call(locate, 'call', where, names, function, *operands)
+
+    if name in LAZY_FUNCTIONS and name in NAME_REPLACEMENTS \
+            and len(operands) > 1:
+        # результат зависит только от истинности аргументов, поэтому
+        # функции достаточно значения, на котором and/or остановился
+        stop_on, _ = LAZY_FUNCTIONS[name]
+        operation = ast.Or() if stop_on else ast.And()
+        lazy = _call(locate, NAME_REPLACEMENTS[name], where,
+                     ast.BoolOp(operation, operands, **where))
+        return ast.IfExp(_call(locate, 'is_standard', where, names, function),
+                         lazy, call, **where)
+
+    return call
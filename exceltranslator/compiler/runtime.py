@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+"""Окружение, в котором исполняется код, сгенерированный на python.
+
+Здесь есть все имена из NAME_REPLACEMENTS, поэтому результат
+serialize_to_python можно исполнять в этом окружении как есть,
+а также вспомогательные функции, которые повторяют правила
+интерпретатора (проверки типов, округление, деление на ноль).
+"""
+import math
+import random
+from operator import add, mul, pow, sub, truediv
+from typing import Any, Callable
+
+from exceltranslator.defined_names import (
+    DEFAULT_FUNCTIONS,
+    get_default_functions,
+)
+from exceltranslator.exceptions import CustomSemanticError, CustomSyntaxError
+from exceltranslator.lexer.tokens import good_eq, good_ne
+from exceltranslator.parser.serialization import NAME_REPLACEMENTS
+from exceltranslator.settings import DEFAULT_PRECISION
+from exceltranslator.utils import math_round
+
+__all__ = [
+    'HELPERS',
+    'STANDARD_NAMES',
+    'make_globals',
+]
+
+
+def _stub(*_) -> int:
+    """Заглушка, реальный код в другом пакете.
+    """
+    return 0
+
+
+def _collect_standard_names() -> dict:
+    """Собрать объекты для всех имён из NAME_REPLACEMENTS.
+
+    Имена с точкой (math.ceil) доступны через свои модули.
+    """
+    output = {'math': math, 'random': random, 'str': str}
+
+    for script_name, python_name in NAME_REPLACEMENTS.items():
+        if '.' not in python_name:
+            output[python_name] = DEFAULT_FUNCTIONS.get(script_name, _stub)
+
+    return output
+
+
+# python-имя -> объект, для всех стандартных функций
+STANDARD_NAMES = _collect_standard_names()
+
+
+def read(names, name: str) -> Any:
+    """Прочитать переменную.
+    """
+    variable = names.get(name)
+
+    if variable is None:
+        raise CustomSemanticError(
+            f'Переменная с именем "{name}" не найдена.')
+
+    if isinstance(variable, float):
+        return math_round(variable, DEFAULT_PRECISION)
+    return variable
+
+
+def assign(names, name: str, value: Any) -> None:
+    """Записать переменную, не меняя её тип.
+    """
+    existing = names.get(name)
+
+    if existing is not None \
+            and not (isinstance(value, (int, float))
+                     and isinstance(existing, (int, float))) \
+            and not isinstance(value, type(existing)):
+        raise CustomSemanticError(
+            f'Попытка изменения типа при присвоении значения, '
+            f'переменная "{name}" была '
+            f'<{type(existing).__name__}> '
+            f'а присваивается <{type(value).__name__}>.'
+        )
+
+    if name and name[0].isdigit():
+        raise CustomSyntaxError(
+            f'Для переменных допускатся только имена, '
+            f'начинающиеся не с цифры. {name} не подойдёт.'
+        )
+
+    names[name] = value
+
+
+def call(names, name: str, *operands) -> Any:
+    """Вызвать функцию, найденную в пространстве имён.
+    """
+    function = names.get(name)
+
+    if function is None:
+        raise CustomSemanticError(
+            f'Функция с названием "{name}" не найдена.')
+
+    if not callable(function):
+        raise CustomSemanticError(
+            f'Объект с названием "{name}" не является вызываемым.')
+
+    return function(*operands)
+
+
+def is_standard(names, name: str) -> bool:
+    """Лежит ли в пространстве имён стандартная функция с этим именем.
+    """
+    return names.get(name) is get_default_functions().get(name)
+
+
+def _arithmetic(operator: Callable, figure: str) -> Callable:
+    """Сделать арифметический оператор с проверкой типов и округлением.
+    """
+
+    def run(left, right):
+        if (isinstance(left, (int, float))
+                and isinstance(right, (int, float))) \
+                or (type(left) == str and type(right) == str):
+            result = operator(left, right)
+        else:
+            raise CustomSemanticError(
+                f'Нельзя осуществлять операцию {left!r} '
+                f'{figure} {right!r}'
+            )
+
+        if isinstance(result, float):
+            return math_round(result, DEFAULT_PRECISION)
+        return result
+
+    return run
+
+
+plus = _arithmetic(add, '+')
+minus = _arithmetic(sub, '-')
+multiply = _arithmetic(mul, '*')
+power = _arithmetic(pow, '**')
+_divide = _arithmetic(truediv, '/')
+
+
+def divide(left, right) -> Any:
+    """Деление, на ноль получается бесконечность.
+    """
+    if right == 0:
+        return float('inf')
+    return _divide(left, right)
+
+
+def equal(left, right) -> int:
+    """Равенство с допуском для float.
+    """
+    return int(good_eq(left, right))
+
+
+def not_equal(left, right) -> int:
+    """Неравенство с допуском для float.
+    """
+    return int(good_ne(left, right))
+
+
+# вспомогательные функции для сгенерированного кода
+HELPERS = {
+    'read': read,
+    'assign': assign,
+    'call': call,
+    'is_standard': is_standard,
+    'plus': plus,
+    'minus': minus,
+    'multiply': multiply,
+    'power': power,
+    'divide': divide,
+    'equal': equal,
+    'not_equal': not_equal,
+    'int': int,
+    'bool': bool,
+    'float': float,
+}
+
+
+def make_globals() -> dict:
+    """Собрать глобальное пространство для исполнения кода.
+
+    Встроенные имена python недоступны, только стандартные функции
+    и вспомогательные функции.
+    """
+    return {'__builtins__': {}, **STANDARD_NAMES, **HELPERS}
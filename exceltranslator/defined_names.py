@@ -6,9 +6,10 @@ import math
 import random
 from functools import lru_cache
 from operator import mod
-from typing import Callable
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional, Tuple
 
-from exceltranslator.utils import math_round
+from exceltranslator.utils import LayeredDict, math_round
 
 
 def custom_sum(*args):
@@ -113,6 +114,30 @@ DEFAULT_FUNCTIONS = {
     'ЗАГР': lambda *_: 0,  # заглушка, реальный код в другом пакете
 }
 
+# стандартные функции, результат которых зависит не только от аргументов,
+# или у которых есть побочные эффекты: их нельзя вычислять заранее
+IMPURE_FUNCTIONS = frozenset({
+    'СЛЧИС',
+    'СЛУЧМЕЖДУ',
+    'ТОЧКА',
+    'СЕЙЧАС',
+    'СЕГОДНЯ',
+    'MQTT',
+    'ОТЧЁТ',
+    'СОХР',
+    'ЗАГР',
+})
+
+# ленивые функции: аргументы вычисляются слева направо, пока результат
+# не станет известен. Имя -> (истинность аргумента, на которой вычисление
+# останавливается, результат в этом случае). Результат таких функций
+# зависит только от истинности аргументов
+LAZY_FUNCTIONS = {
+    'ВСЕ_ИЗ': (False, False),
+    'ОДИН_ИЗ': (True, True),
+    'НИ_ОДИН_ИЗ': (True, False),
+}
+
 DEFAULT_NAMES = {
     'ЛОЖЬ': 0,
     'ИСТИНА': 1,
@@ -123,11 +148,15 @@ class FuncWrapper:
     """Обёртка для функций, чтобы не было видно, что они стандартные.
     """
 
-    def __init__(self, func: Callable, repr_: str):
+    def __init__(self, func: Callable, repr_: str,
+                 lazy: Optional[Tuple[bool, Any]] = None):
         """Инициализировать экземпляр.
+
+        lazy - правило остановки для ленивых функций, см. LAZY_FUNCTIONS.
         """
         self.func = func
         self.repr = repr_
+        self.lazy = lazy
 
     def __call__(self, *args, **kwargs):
         """Вызвать настоящую функцию.
@@ -155,19 +184,41 @@ def get_default_functions() -> dict:
     """
     output = {}
     for name, contents in DEFAULT_FUNCTIONS.items():
-        output[name] = FuncWrapper(contents, f'<функция {name}>')
+        output[name] = FuncWrapper(contents, f'<функция {name}>',
+                                   LAZY_FUNCTIONS.get(name))
     return output
 
 
 def get_default_names() -> dict:
     """Получить все готовые имена.
     """
-    return {**get_default_functions(), **DEFAULT_NAMES}
+    return dict(get_default_layer())
+
+
+@lru_cache
+def get_default_layer() -> Mapping[str, Any]:
+    """Получить все готовые имена одним общим неизменяемым словарём.
+
+    Используется как нижний слой пространства имён (см. LayeredDict).
+    """
+    return MappingProxyType({**get_default_functions(), **DEFAULT_NAMES})
 
 
 def non_standard(resulting_dict: dict) -> dict:
     """Выделить из словаря нестандартные имена.
+
+    У LayeredDict перебираются только свои значения, а нижний слой
+    стандартных имён не перебирается.
     """
+    if isinstance(resulting_dict, LayeredDict):
+        base = resulting_dict.base
+        if base is get_default_layer():
+            output = non_standard(DEFAULT_NAMES)
+        else:
+            output = non_standard(base)
+        output.update(non_standard(resulting_dict.own()))
+        return output
+
     return {
         key: value
         for key, value in resulting_dict.items()
@@ -17,3 +17,8 @@ class CustomSyntaxError(CustomException):
 class CustomSemanticError(CustomException):
     """Ошибка семантики внутри компилируемого кода.
     """
+
+
+class CustomCompilationError(CustomException):
+    """Дерево нельзя перевести в выбранный способ исполнения.
+    """
@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+
+"""Генератор синтетических скриптов для замеров и нагрузочных тестов.
+
+Скрипты строятся по настоящей грамматике: присваивания, все операторы,
+вызовы всех функций из DEFAULT_FUNCTIONS, вложенные
+ЕСЛИ/ИНАЧЕ_ЕСЛИ/ИНАЧЕ. Размер задаётся количеством токенов,
+глубиной вложенности условий, количеством переменных и веток.
+
+Скрипт исполняется без ошибок при любых входных данных из namespace:
+у каждой переменной постоянный тип, читаются только уже заданные
+переменные, делитель всегда не меньше единицы, а числа, которые могут
+стать слишком большими, ограничиваются через ОСТАТ. Случайные функции
+вызываются так, чтобы результат от случая не зависел.
+
+    >>> generator = ScriptGenerator(seed=1, tokens=200)
+    >>> source = generator.script()
+    >>> compile(source).run(generator.namespace())
+"""
+import random
+from itertools import cycle
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from exceltranslator.defined_names import (
+    DEFAULT_FUNCTIONS,
+    SCRIPT_NAME_TO_PYTHON_NAME,
+)
+from exceltranslator.settings import DEFAULT_INDENT
+
+__all__ = [
+    'ScriptGenerator',
+    'generate',
+]
+
+# операторы в записи скриптов
+ARITHMETIC = ('+', '-', '*', '/', '**')
+COMPARISONS = ('<', '>', '<=', '>=', '==', '!=')
+LOGICAL = ('И', 'ИЛИ')
+
+# функции, которые в этом пакете заглушки, а в настоящем окружении
+# работают с внешним миром: вызываются только отдельной инструкцией
+EXTERNAL = ('ТОЧКА', 'СЕЙЧАС', 'СЕГОДНЯ', 'MQTT', 'ОТЧЁТ', 'СОХР', 'ЗАГР')
+
+# больше этого по модулю числа ограничиваются через ОСТАТ
+NUMBER_LIMIT = 1e6
+# больше этой длины строки не склеиваются
+STRING_LIMIT = 200
+# модуль для ОСТАТ
+MODULO = 1000
+# границы входных чисел
+INPUT_LIMIT = 100
+
+WORDS = ('альфа', 'бета', 'гамма', 'дельта', 'текст', 'строка',
+         'значение', 'data', 'value', 'item')
+
+# выражение: текст и оценка сверху (модуль числа или длина строки)
+Expression = Tuple[str, float]
+
+NUMBER = 'number'
+STRING = 'string'
+
+
+class ScriptGenerator:
+    """Генератор синтетических скриптов.
+
+    Параметры:
+        seed - зерно, одинаковые параметры дают одинаковые скрипты;
+        tokens - сколько примерно токенов должно быть в скрипте;
+        depth - наибольшая вложенность условий;
+        variables - сколько переменных скрипт присваивает;
+        branches - сколько веток ЕСЛИ/ИНАЧЕ_ЕСЛИ в условии;
+        inputs - сколько переменных берётся из namespace;
+        expression_depth - наибольшая вложенность выражений;
+        external - вызывать ли функции внешнего мира (ТОЧКА, ЗАГР...).
+    """
+
+    def __init__(self, seed: int = 0, tokens: int = 500, depth: int = 2,
+                 variables: int = 10, branches: int = 3, inputs: int = 4,
+                 expression_depth: int = 3, external: bool = True) -> None:
+        """Инициализировать экземпляр.
+        """
+        if variables < 1 or branches < 1 or inputs < 1:
+            raise ValueError('variables, branches и inputs '
+                             'должны быть не меньше 1')
+
+        self.seed = seed
+        self.tokens = tokens
+        self.depth = depth
+        self.variables = variables
+        self.branches = branches
+        self.inputs = inputs
+        self.expression_depth = expression_depth
+        self.external = external
+
+        # входные переменные: каждая третья строковая
+        self.input_names = {
+            (f't{i}' if i % 3 == 2 else f'a{i}'):
+                (STRING if i % 3 == 2 else NUMBER)
+            for i in range(inputs)
+        }
+
+        self.random = random.Random()
+        self.count = 0
+        self.assigned = 0
+        self.bounds: Dict[str, float] = {}
+
+    # Вспомогательное -------------------------
+
+    def _cycle(self, items) -> Iterator:
+        """Бесконечный перебор в случайном порядке.
+
+        Так за достаточно длинный скрипт каждый вариант
+        встречается хотя бы раз.
+        """
+        items = list(items)
+        self.random.shuffle(items)
+        return cycle(items)
+
+    def _literal(self, kind: str) -> Expression:
+        """Литерал.
+        """
+        self.count += 1
+
+        if kind == STRING:
+            text = ' '.join(self.random.choice(WORDS)
+                            for _ in range(self.random.randint(1, 3)))
+            return f'"{text}"', len(text)
+
+        if self.random.random() < 0.5:
+            value = self.random.randint(-INPUT_LIMIT, INPUT_LIMIT)
+            return str(value), abs(value)
+
+        value = round(self.random.uniform(-INPUT_LIMIT, INPUT_LIMIT), 2)
+        return str(value), abs(value)
+
+    def _call(self, name: str, *arguments: str) -> str:
+        """Вызов функции.
+        """
+        self.count += 2 + max(len(arguments) - 1, 0) + 1
+        return f'{name}({", ".join(arguments)})'
+
+    def _binary(self, left: str, operator: str, right: str) -> str:
+        """Бинарный оператор в скобках.
+        """
+        self.count += 3
+        return f'({left} {operator} {right})'
+
+    def _limit(self, expression: Expression) -> Expression:
+        """Ограничить слишком большое число.
+        """
+        text, bound = expression
+        if bound <= NUMBER_LIMIT:
+            return expression
+
+        self.count += 1
+        return self._call('ОСТАТ', text, str(MODULO)), MODULO
+
+    # Выражения -------------------------
+
+    def expression(self, kind: str, scope: Dict[str, str],
+                   depth: int) -> Expression:
+        """Выражение заданного типа из доступных в scope переменных.
+        """
+        names = [name for name, name_kind in scope.items()
+                 if name_kind == kind]
+
+        if depth <= 0 or self.random.random() < 0.3:
+            if names and self.random.random() < 0.6:
+                name = self.random.choice(names)
+                self.count += 1
+                return name, self.bounds[name]
+            if kind == NUMBER and self.random.random() < 0.1:
+                self.count += 1
+                return self.random.choice(('ИСТИНА', 'ЛОЖЬ')), 1
+            return self._literal(kind)
+
+        if kind == STRING:
+            return self._string(scope, depth)
+        return self._limit(next(self.number_forms)(scope, depth))
+
+    def _string(self, scope: Dict[str, str], depth: int) -> Expression:
+        """Строковое выражение.
+        """
+        name = next(self.string_functions)
+
+        if name == '+':
+            left, left_bound = self.expression(STRING, scope, depth - 1)
+            right, right_bound = self.expression(STRING, scope, depth - 1)
+            output = self._binary(left, '+', right), left_bound + right_bound
+
+        elif name == 'ТЕКСТ':
+            number, _ = self.expression(NUMBER, scope, depth - 1)
+            output = self._call(name, number), 30
+
+        elif name in ('СТРОЧН', 'ПРОПИСН'):
+            text, bound = self.expression(STRING, scope, depth - 1)
+            output = self._call(name, text), bound
+
+        else:  # СЦЕПИТЬ, ОБЪЕДИНИТЬ
+            arguments = []
+            total = 0
+            for _ in range(self.random.randint(2, 3)):
+                kind = self.random.choice((STRING, STRING, NUMBER))
+                text, bound = self.expression(kind, scope, depth - 1)
+                arguments.append(text)
+                total += bound if kind == STRING else 30
+            if name == 'ОБЪЕДИНИТЬ':
+                total *= 2
+            output = self._call(name, *arguments), total
+
+        if output[1] > STRING_LIMIT:
+            return self._literal(STRING)
+        return output
+
+    def _arithmetic(self, scope: Dict[str, str], depth: int) -> Expression:
+        """Арифметический оператор.
+        """
+        operator = next(self.arithmetic)
+        left, left_bound = self.expression(NUMBER, scope, depth - 1)
+
+        if operator == '**':
+            exponent = self.random.choice(('2', '3', '0.5'))
+            self.count += 1
+            base = self._call('ABS', left)
+            return self._binary(base, '**', exponent), \
+                max(left_bound, 1) ** float(exponent)
+
+        right, right_bound = self.expression(NUMBER, scope, depth - 1)
+
+        if operator == '/':
+            self.count += 1
+            divisor = self._binary(self._call('ABS', right), '+', '1')
+            return self._binary(left, '/', divisor), left_bound
+        if operator == '*':
+            return self._binary(left, '*', right), left_bound * right_bound
+        return self._binary(left, operator, right), left_bound + right_bound
+
+    def _comparison(self, scope: Dict[str, str], depth: int) -> Expression:
+        """Сравнение двух чисел или двух строк.
+        """
+        kind = NUMBER if self.random.random() < 0.8 else STRING
+        left, _ = self.expression(kind, scope, depth - 1)
+        right, _ = self.expression(kind, scope, depth - 1)
+        return self._binary(left, next(self.comparisons), right), 1
+
+    def _logical(self, scope: Dict[str, str], depth: int) -> Expression:
+        """И, ИЛИ, НЕ.
+        """
+        operator = next(self.logical)
+        operand, _ = self.expression(NUMBER, scope, depth - 1)
+
+        if operator == 'НЕ':
+            self.count += 3
+            return f'(НЕ {operand})', 1
+
+        right, _ = self.expression(NUMBER, scope, depth - 1)
+        return self._binary(operand, operator, right), 1
+
+    def _function(self, scope: Dict[str, str], depth: int) -> Expression:
+        """Вызов числовой функции.
+        """
+        name = next(self.number_functions)
+
+        def numbers(minimum: int, maximum: int) -> List[Expression]:
+            """Несколько числовых аргументов.
+            """
+            return [self.expression(NUMBER, scope, depth - 1)
+                    for _ in range(self.random.randint(minimum, maximum))]
+
+        if name == 'СЛЧИС':
+            return self._call('ЦЕЛОЕ', self._call(name)), 0
+
+        if name == 'СЛУЧМЕЖДУ':
+            # числовые литералы - float, а randint нужны целые
+            text, bound = self._literal(NUMBER)
+            value = self._call('ЦЕЛОЕ', text)
+            self.count += 4  # второй раз ЦЕЛОЕ(...)
+            return self._call(name, value, value), bound
+
+        if name in ('МИН', 'МАКС', 'СУММ', 'СРЗНАЧ',
+                    'ВСЕ_ИЗ', 'ОДИН_ИЗ', 'НИ_ОДИН_ИЗ'):
+            arguments = numbers(2 if name in ('МИН', 'МАКС') else 1, 3)
+            texts = [text for text, _ in arguments]
+            bounds = [bound for _, bound in arguments]
+
+            if name == 'СУММ':
+                bound = sum(bounds)
+            elif name in ('ВСЕ_ИЗ', 'ОДИН_ИЗ', 'НИ_ОДИН_ИЗ'):
+                bound = 1
+            else:
+                bound = max(bounds)
+            return self._call(name, *texts), bound
+
+        if name == 'ЗНАЧЕН':
+            # + 0 превращает логическое True в 1, иначе ТЕКСТ даст "True"
+            text, bound = self.expression(NUMBER, scope, depth - 1)
+            self.count += 1
+            text = self._binary(text, '+', '0')
+            return self._call(name, self._call('ТЕКСТ', text)), bound
+
+        (text, bound), = numbers(1, 1)
+
+        if name == 'ОКРУГЛ':
+            self.count += 1
+            return self._call(name, text,
+                              str(self.random.randint(0, 3))), bound + 1
+        if name == 'ОСТАТ':
+            self.count += 1
+            divisor = self.random.randint(2, 50)
+            return self._call(name, text, str(divisor)), divisor
+        if name == 'КОРЕНЬ':
+            return self._call(name, self._call('ABS', text)), \
+                max(bound, 1) ** 0.5
+
+        # ABS, ОКРВВЕРХ, ОКРВНИЗ, ЦЕЛОЕ, ОТБР
+        return self._call(name, text), bound + 1
+
+    # Инструкции -------------------------
+
+    def _assignment(self, scope: Dict[str, str], depth: int,
+                    indent: str) -> List[str]:
+        """Присваивание новой или уже заданной переменной.
+
+        Когда новые переменные кончились, а своих в области видимости
+        нет, перезаписывается входная.
+        """
+        own = [name for name in scope if name not in self.input_names]
+
+        if self.assigned < self.variables \
+                and (not own or self.random.random() < 0.5):
+            kind = STRING if self.random.random() < 0.25 else NUMBER
+            name = f'{"s" if kind == STRING else "x"}{self.assigned}'
+            self.assigned += 1
+        else:
+            name = self.random.choice(own or list(scope))
+            kind = scope[name]
+
+        value, bound = self.expression(kind, scope, self.expression_depth)
+        self.count += 3
+
+        self.bounds[name] = max(self.bounds.get(name, 0), bound)
+        scope[name] = kind
+        return [f'{indent}{name} = {value};']
+
+    def _condition(self, scope: Dict[str, str], depth: int,
+                   indent: str) -> List[str]:
+        """Условие с ветками, переменные из веток снаружи не видны.
+        """
+        lines = []
+        amount = self.random.randint(1, self.branches)
+
+        for i in range(amount + self.random.randint(0, 1)):
+            if i < amount:
+                predicate, _ = self.expression(NUMBER, scope,
+                                               self.expression_depth - 1)
+                if i == 0:
+                    head = f'ЕСЛИ ({predicate}) {{'
+                    self.count += 4
+                else:
+                    head = f'}} ИНАЧЕ_ЕСЛИ ({predicate}) {{'
+                    self.count += 5
+            else:
+                head = '} ИНАЧЕ {'
+                self.count += 3
+
+            lines.append(indent + head)
+            lines.extend(self._block(dict(scope), depth + 1,
+                                     indent + DEFAULT_INDENT))
+
+        lines.append(f'{indent}}};')
+        self.count += 2
+        return lines
+
+    def _external(self, indent: str) -> List[str]:
+        """Вызов функции внешнего мира отдельной инструкцией.
+
+        ТОЧКА получает объект и свойство, СЕЙЧАС и СЕГОДНЯ - известные
+        им названия, остальные - одну строку.
+        """
+        name = next(self.external_functions)
+
+        if name in ('СЕЙЧАС', 'СЕГОДНЯ'):
+            self.count += 1
+            property_name = self.random.choice(
+                list(SCRIPT_NAME_TO_PYTHON_NAME))
+            arguments = [f'"{property_name}"']
+        else:
+            arguments = [self._literal(STRING)[0]]
+            if name == 'ТОЧКА':
+                arguments.append(self._literal(STRING)[0])
+
+        self.count += 1
+        return [f'{indent}{self._call(name, *arguments)};']
+
+    def _statement(self, scope: Dict[str, str], depth: int,
+                   indent: str) -> List[str]:
+        """Одна инструкция.
+        """
+        chance = self.random.random()
+
+        if depth < self.depth and chance < 0.2:
+            return self._condition(scope, depth, indent)
+        if self.external and chance > 0.9:
+            return self._external(indent)
+        return self._assignment(scope, depth, indent)
+
+    def _block(self, scope: Dict[str, str], depth: int,
+               indent: str) -> List[str]:
+        """Тело ветки условия.
+        """
+        lines = []
+        for _ in range(self.random.randint(1, 3)):
+            lines.extend(self._statement(scope, depth, indent))
+        return lines
+
+    # Результат -------------------------
+
+    def script(self) -> str:
+        """Сгенерировать скрипт.
+
+        Последняя инструкция - числовое выражение, это результат скрипта.
+        """
+        self.random.seed(self.seed)
+        self.count = 0
+        self.assigned = 0
+        self.bounds = {name: (STRING_LIMIT // 10 if kind == STRING
+                              else INPUT_LIMIT)
+                       for name, kind in self.input_names.items()}
+
+        functions = [x for x in DEFAULT_FUNCTIONS if x not in EXTERNAL]
+        strings = ('ТЕКСТ', 'СТРОЧН', 'ПРОПИСН', 'СЦЕПИТЬ', 'ОБЪЕДИНИТЬ')
+        self.number_functions = self._cycle(
+            x for x in functions if x not in strings)
+        self.string_functions = self._cycle(strings + ('+',))
+        self.external_functions = self._cycle(EXTERNAL)
+        self.arithmetic = self._cycle(ARITHMETIC)
+        self.comparisons = self._cycle(COMPARISONS)
+        self.logical = self._cycle(LOGICAL + ('НЕ',))
+        self.number_forms: Iterator[Callable] = self._cycle((
+            self._arithmetic, self._arithmetic, self._comparison,
+            self._logical, self._function, self._function,
+        ))
+
+        scope = dict(self.input_names)
+        lines = []
+        while self.count < self.tokens:
+            lines.extend(self._statement(scope, 0, ''))
+
+        result, _ = self.expression(NUMBER, scope, self.expression_depth)
+        lines.append(f'{result};')
+        return '\n'.join(lines)
+
+    def namespace(self, seed: Optional[int] = None) -> dict:
+        """Входные данные для скрипта.
+
+        Разные seed дают разные значения, по умолчанию берётся
+        seed генератора.
+        """
+        generator = random.Random(self.seed if seed is None else seed)
+        output = {}
+
+        for name, kind in self.input_names.items():
+            if kind == STRING:
+                output[name] = generator.choice(WORDS)
+            elif generator.random() < 0.5:
+                output[name] = generator.randint(-INPUT_LIMIT, INPUT_LIMIT)
+            else:
+                output[name] = round(
+                    generator.uniform(-INPUT_LIMIT, INPUT_LIMIT), 2)
+
+        return output
+
+
+def generate(seed: int = 0, **options) -> Tuple[str, dict]:
+    """Скрипт и подходящие для него входные данные.
+
+    Параметры те же, что у ScriptGenerator.
+    """
+    generator = ScriptGenerator(seed, **options)
+    return generator.script(), generator.namespace()
@@ -2,24 +2,150 @@
 
 """Класс, оповещающий о своих изменениях.
 """
+from itertools import count
+from typing import Optional
+
 from exceltranslator.helpers.watcher import Watcher
 
+# номера эпох, next(count) не теряет значения при работе из потоков
+_epochs = count(1)
+
 
 class Informer:
     """Класс, оповещающий о своих изменениях.
+
+    Событие уходит ближайшему наблюдателю: своему или одного из предков.
+    Найденный наблюдатель запоминается, поэтому на событие тратится
+    одна проверка, а не проход по всем родителям. Замена наблюдателя
+    или родителя у объекта, который уже запомнил наблюдателя, начинает
+    новую эпоху, и запомненное перепроверяется при следующем событии.
+
+    Запомненное потомком всегда запомнено и у всех объектов по пути
+    к найденному наблюдателю. Поэтому если у объекта в текущей эпохе
+    ничего не запомнено, замена его родителя или наблюдателя ничьих
+    запомненных значений не портит и эпоху не меняет. Так построение
+    новых деревьев (разбор, оптимизация) не сбрасывает наблюдателей
+    уже исполняемых программ.
     """
+    epoch: int = 0  # общая для всех, меняется при замене watcher/parent
 
     def __init__(self, parent: 'Informer' = None, watcher: Watcher = None):
         """Инициализировать экземпляр.
+
+        Новый объект ещё ничей не предок, поэтому эпоха не меняется.
+        """
+        self._watcher = watcher
+        self._parent = parent
+        self._resolved: Optional[Watcher] = None
+        self._resolved_epoch = -1
+
+    def __getstate__(self) -> dict:
+        """Не сохранять найденного наблюдателя, номер эпохи не переносим.
+        """
+        state = self.__dict__.copy()
+        state['_resolved'] = None
+        state['_resolved_epoch'] = -1
+        return state
+
+    @staticmethod
+    def new_epoch() -> None:
+        """Сбросить всех запомненных наблюдателей.
+        """
+        Informer.epoch = next(_epochs)
+
+    @property
+    def watcher(self) -> Optional[Watcher]:
+        """Собственный наблюдатель.
+        """
+        return self._watcher
+
+    @watcher.setter
+    def watcher(self, new_watcher: Optional[Watcher]) -> None:
+        """Установить собственного наблюдателя.
+        """
+        self._watcher = new_watcher
+        self._forget()
+
+    @property
+    def parent(self) -> Optional['Informer']:
+        """Родитель, к наблюдателю которого уходят события.
+        """
+        return self._parent
+
+    @parent.setter
+    def parent(self, new_parent: Optional['Informer']) -> None:
+        """Установить родителя.
+        """
+        self._parent = new_parent
+        self._forget()
+
+    def _forget(self) -> None:
+        """Начать новую эпоху, если этот объект запомнил наблюдателя.
+        """
+        if self._resolved_epoch == Informer.epoch:
+            self.new_epoch()
+
+    def resolve(self) -> Optional[Watcher]:
+        """Найти ближайшего наблюдателя.
+
+        Результат запоминается у всех пройденных объектов,
+        так что каждая цепочка родителей проходится один раз за эпоху.
+        """
+        epoch = Informer.epoch
+        if self._resolved_epoch == epoch:
+            return self._resolved
+
+        chain = []
+        found = None
+        informer = self
+        while informer is not None:
+            if informer._resolved_epoch == epoch:
+                found = informer._resolved
+                break
+
+            chain.append(informer)
+            if informer._watcher is not None:
+                found = informer._watcher
+                break
+
+            informer = informer._parent
+
+        for informer in chain:
+            informer._resolved = found
+            informer._resolved_epoch = epoch
+
+        return found
+
+    @property
+    def watched(self) -> bool:
+        """Есть ли наблюдатель у этого объекта или его предков.
         """
-        self.watcher = watcher
-        self.parent = parent
+        return self.resolve() is not None
+
+    def listener(self, header: str) -> Optional[Watcher]:
+        """Наблюдатель, которому нужно событие такого типа, или None.
+
+        Данные события стоит собирать только если наблюдатель нашёлся:
+
+            watcher = self.listener('stack_pop')
+            if watcher is not None:
+                watcher.inform('stack_pop', caller=str(caller))
+        """
+        if self._resolved_epoch == Informer.epoch:
+            watcher = self._resolved
+        else:
+            watcher = self.resolve()
+
+        if watcher is None or not watcher.wants(header):
+            return None
+        return watcher
 
     def propagate(self, header: str, **kwargs):
         """Сообщить наблюдателю о событии.
-        """
-        if self.watcher:
-            self.watcher.inform(header, **kwargs)
 
-        elif self.parent:
-            self.parent.propagate(header, **kwargs)
+        Данные события уже собраны, поэтому в часто исполняемом коде
+        лучше сначала проверить listener.
+        """
+        watcher = self.listener(header)
+        if watcher is not None:
+            watcher.inform(header, **kwargs)
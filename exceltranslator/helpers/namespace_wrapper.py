@@ -1,13 +1,98 @@
 # -*- coding: utf-8 -*-
 
 """Обёртка над словарём. Оповещает о событиях.
+
+Для прогона одного скрипта на множестве вариантов одних данных
+пространство имён можно заморозить (snapshot) и делать от снимка
+ответвления (Snapshot.fork). Ответвление хранит только свои изменения,
+поэтому N вариантов занимают память снимка плюс сумму изменений:
+
+    base = Namespace(inputs).snapshot()
+    results = program.run_many(base.fork(x) for x in overrides)
 """
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
 
-from exceltranslator.defined_names import get_default_names
+from exceltranslator.defined_names import get_default_layer
 from exceltranslator.exceptions import CustomSyntaxError
 from exceltranslator.helpers.informer import Informer
 from exceltranslator.helpers.watcher import Watcher
+from exceltranslator.utils import LayeredDict
+
+
+class DefaultNames(LayeredDict):
+    """Словарь поверх стандартных функций и имён.
+    """
+    __slots__ = ()
+
+    base = get_default_layer()
+
+
+class ForkedDict(LayeredDict):
+    """Словарь поверх своего нижнего слоя, обычно снимка (см. Snapshot).
+    """
+    __slots__ = ('base',)
+
+    def __init__(self, base: Mapping, contents: Optional[dict] = None):
+        """Инициализировать экземпляр.
+        """
+        super().__init__(contents or ())
+        self.base = base
+
+    def copy(self) -> 'ForkedDict':
+        """Копия своих значений поверх того же нижнего слоя.
+        """
+        return type(self)(self.base, self.own())
+
+    def __reduce__(self) -> tuple:
+        """Сохранять свои значения и нижний слой.
+
+        Стандартные имена не сохраняются, а берутся при загрузке
+        из get_default_layer.
+        """
+        base = self.base
+        if base is get_default_layer():
+            base = None
+        elif isinstance(base, MappingProxyType):
+            base = dict(base)
+        return _restore_forked, (type(self), base, self.own())
+
+
+def _restore_forked(cls: type, base: Optional[Mapping],
+                    contents: dict) -> ForkedDict:
+    """Собрать ForkedDict или наследника при загрузке из pickle.
+    """
+    return cls(get_default_layer() if base is None else base, contents)
+
+
+class Snapshot(ForkedDict):
+    """Неизменяемый снимок пространства имён.
+
+    Хранит копию собственных значений пространства имён, а его нижний
+    слой (стандартные имена или снимок, от которого оно ответвлено)
+    использует общий, без копирования.
+    """
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs) -> None:
+        """Запретить изменение.
+        """
+        raise TypeError(f'{type(self).__name__} нельзя изменять')
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def fork(self, changes: Optional[dict] = None,
+             parent: 'Informer' = None,
+             watcher: Watcher = None) -> 'NamespaceWrapper':
+        """Новое пространство имён поверх снимка.
+
+        changes - начальные изменения. Запись в ответвление не меняет
+        снимок, а изменения можно получить через changes().
+        """
+        namespace = NamespaceWrapper(parent=parent, watcher=watcher)
+        namespace._dict = ForkedDict(self, changes)
+        return namespace
 
 
 class NamespaceWrapper(Informer):
@@ -47,13 +132,17 @@ class NamespaceWrapper(Informer):
         """Получить значение по ключу и сообщить об этом куда надо.
         """
         output = self._dict.get(key, default)
-        self.propagate(
-            'namespace_get',
-            value=output,
-            key=key,
-            default=default,
-            caller_id=id(caller)
-        )
+
+        watcher = self.listener('namespace_get')
+        if watcher is not None:
+            watcher.inform(
+                'namespace_get',
+                value=output,
+                key=key,
+                default=default,
+                caller_id=id(caller)
+            )
+
         return output
 
     def set(self, caller: Any, key, value):
@@ -62,20 +151,24 @@ class NamespaceWrapper(Informer):
         existing = self._dict.get(key)
 
         if existing is None:
-            self.propagate(
-                'namespace_assign',
-                value=value,
-                key=key,
-                caller_id=id(caller)
-            )
+            watcher = self.listener('namespace_assign')
+            if watcher is not None:
+                watcher.inform(
+                    'namespace_assign',
+                    value=value,
+                    key=key,
+                    caller_id=id(caller)
+                )
         else:
-            self.propagate(
-                'namespace_overwrite',
-                previous_value=existing,
-                value=value,
-                key=key,
-                caller_id=id(caller)
-            )
+            watcher = self.listener('namespace_overwrite')
+            if watcher is not None:
+                watcher.inform(
+                    'namespace_overwrite',
+                    previous_value=existing,
+                    value=value,
+                    key=key,
+                    caller_id=id(caller)
+                )
 
         if str(key) and str(key)[0].isdigit():
             raise CustomSyntaxError(
@@ -85,14 +178,55 @@ class NamespaceWrapper(Informer):
 
         self._dict[key] = value
 
-    def dict(self):
-        """Содержимое.
+    @property
+    def contents(self) -> dict:
+        """Сам внутренний словарь, без копирования и оповещений.
+        """
+        return self._dict
+
+    def dict(self) -> dict:
+        """Копия содержимого.
+
+        Копируются только свои значения, нижний слой общий.
         """
         return self._dict.copy()
 
+    def snapshot(self) -> Snapshot:
+        """Неизменяемый снимок текущего содержимого.
+
+        Копируются только собственные значения, нижние слои общие.
+        """
+        contents = self._dict
+        if isinstance(contents, LayeredDict):
+            return Snapshot(contents.base, contents.own())
+        return Snapshot(MappingProxyType({}), contents)
+
+    def fork(self, changes: Optional[dict] = None) -> 'NamespaceWrapper':
+        """Ответвление поверх снимка текущего содержимого.
+
+        Наблюдатель и родитель переходят к ответвлению. Для многих
+        ответвлений от одного состояния дешевле один раз сделать
+        snapshot и ответвлять уже от него.
+        """
+        return self.snapshot().fork(changes, self.parent, self.watcher)
+
+    def changes(self) -> dict:
+        """Собственные значения поверх нижнего слоя.
+
+        Для ответвления - всё, что записано в него после создания,
+        для Namespace - всё, кроме нетронутых стандартных имён.
+        """
+        contents = self._dict
+        if isinstance(contents, LayeredDict):
+            return contents.own()
+        return dict(contents)
+
 
 class Namespace(NamespaceWrapper):
     """Обёртка с уже подготовленными функциями внутри.
+
+    Стандартные имена не копируются: они лежат в общем неизменяемом
+    слое под словарём экземпляра (см. DefaultNames).
     """
 
     def __init__(self, contents: dict = None, parent: 'Informer' = None,
@@ -100,7 +234,4 @@ class Namespace(NamespaceWrapper):
         """Инициализировать экземпляр.
         """
         super().__init__(contents, parent, watcher)
-        if contents is None:
-            contents = {}
-
-        self._dict = {**get_default_names(), **contents}
+        self._dict = DefaultNames(contents or ())
@@ -15,26 +15,8 @@ DEFAULT_PALETTE = {
     ('in', 'tier_8'): Fore.GREEN,
     ('out', 'tier_8'): Fore.GREEN,
 
-    ('in', 'tier_7'): Fore.GREEN,
-    ('out', 'tier_7'): Fore.GREEN,
-
-    ('in', 'tier_6'): Fore.CYAN,
-    ('out', 'tier_6'): Fore.CYAN,
-
-    ('in', 'tier_5'): Fore.CYAN,
-    ('out', 'tier_5'): Fore.CYAN,
-
-    ('in', 'tier_4'): Fore.CYAN,
-    ('out', 'tier_4'): Fore.CYAN,
-
-    ('in', 'tier_3'): Fore.CYAN,
-    ('out', 'tier_3'): Fore.CYAN,
-
-    ('in', 'tier_2'): Fore.CYAN,
-    ('out', 'tier_2'): Fore.CYAN,
-
-    ('in', 'tier_1'): Fore.CYAN,
-    ('out', 'tier_1'): Fore.CYAN,
+    ('in', 'tier_expression'): Fore.CYAN,
+    ('out', 'tier_expression'): Fore.CYAN,
 
     ('in', 'tier_0'): Fore.YELLOW,
     ('out', 'tier_0'): Fore.YELLOW,
@@ -94,11 +76,12 @@ class NodeCreationPrinter:
     def make_in_line(self, name: str, depth: int) -> str:
         """Погружение в стек.
         """
-        tokens_left = self.parser.lexer.tokens_left
+        stream = self.parser.lexer.stream
+        tokens_left = [str(x) for x in stream.upcoming(self.max_tokens)]
 
-        total = len(tokens_left)
+        total = len(stream)
         if total > self.max_tokens:
-            tokens = ' '.join(tokens_left[:self.max_tokens]) + ' ...'
+            tokens = ' '.join(tokens_left) + ' ...'
         else:
             tokens = ' '.join(tokens_left)
 
@@ -132,12 +115,12 @@ class NodeCreationPrinter:
         """Обернуть один метод ведомого объекта.
         """
 
-        def wrapper(depth: int):
+        def wrapper(depth: int, **kwargs):
             """Обёртка над родным методом.
             """
             self.call_stack.append(self.make_in_line(func.__name__,
                                                      depth))
-            node = func(depth)
+            node = yield func(depth, **kwargs)
             self.call_stack.append(self.make_out_line(func.__name__,
                                                       depth, node))
             return node
@@ -147,7 +130,7 @@ class NodeCreationPrinter:
     def parse(self):
         """Собрать синтаксическое дерево из кода.
         """
-        return self.parser.tier_8(depth=0)
+        return self.parser.parse()
 
     def format_call_stack(self) -> str:
         """Выдать стек вызовов в виде строки.
@@ -29,6 +29,7 @@ DEFAULT_PALETTE = {
     NameNode: Fore.LIGHTGREEN_EX,
     AssigmentNode: Fore.LIGHTMAGENTA_EX,
     VarNode: Fore.CYAN,
+    ConstantNode: Fore.CYAN,
 
     BinaryNode: Fore.RED,
     LogicalNode: Fore.LIGHTRED_EX,
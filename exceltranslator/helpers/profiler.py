@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+
+"""Профилировщик исполнения обходом дерева.
+
+Для каждого узла считаются вызовы, полное время (вместе с потомками)
+и собственное время (без потомков), для стандартных функций из
+DEFAULT_FUNCTIONS - вызовы и время внутри функции.
+
+Результат выводится таблицей самых горячих узлов (top), в формате
+speedscope (to_speedscope) или в свёрнутых стеках для flamegraph.pl
+(to_collapsed).
+"""
+import json
+import time
+from types import GeneratorType
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from exceltranslator.defined_names import (
+    DEFAULT_FUNCTIONS,
+    FuncWrapper,
+    get_default_functions,
+)
+from exceltranslator.helpers.namespace_wrapper import (
+    NamespaceWrapper,
+    Namespace,
+)
+from exceltranslator.helpers.node_tree_printer import NodeTreePrinter
+from exceltranslator.helpers.stack_wrapper import StackWrapper
+from exceltranslator.lexer.base_tokens import BaseToken
+from exceltranslator.lexer.positions import LineIndex
+from exceltranslator.parser.base_nodes import BaseNode
+from exceltranslator.parser.nodes import VarNode
+from exceltranslator.utils import LayeredDict
+
+__all__ = [
+    'Timing',
+    'Profiler',
+]
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+
+class Timing:
+    """Счётчики одного узла или одной функции, время в секундах.
+    """
+    __slots__ = ('calls', 'inclusive', 'exclusive')
+
+    def __init__(self) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+    def __repr__(self):
+        """Вернуть текстовое представление.
+        """
+        return f'{type(self).__name__}(calls={self.calls}, ' \
+               f'inclusive={self.inclusive:.6f}, ' \
+               f'exclusive={self.exclusive:.6f})'
+
+
+class Profiler:
+    """Профилировщик исполнения обходом дерева.
+
+    Замеры ставятся на узлы только на время профилируемого исполнения
+    и снимаются после него, так что в остальное время дерево (в том числе
+    из кэша) работает как обычно. Пока идёт профилируемое исполнение,
+    это же дерево не стоит исполнять из других потоков.
+
+    При sample_every > 1 замеряется только каждое N-е исполнение,
+    остальные идут без всяких накладных расходов. Вызовы в отчёте
+    считаются только по замеренным исполнениям.
+
+    Время узла включает накладные расходы самого профилировщика,
+    поэтому сравнивать имеет смысл узлы между собой.
+    """
+
+    def __init__(self, root: BaseNode, source: str = '',
+                 sample_every: int = 1) -> None:
+        """Инициализировать экземпляр.
+
+        Исходный текст нужен только для номеров строк в отчётах.
+        """
+        if sample_every < 1:
+            raise ValueError('sample_every должен быть не меньше 1')
+
+        self.root = root
+        self.locate = LineIndex(source) if source else None
+        self.sample_every = sample_every
+        self.runs = 0
+        self.samples = 0
+
+        self.nodes: Dict[BaseNode, Timing] = {}
+        self.functions: Dict[str, Timing] = {}
+        # время функций по месту вызова, для стеков в flamegraph
+        self.calls: Dict[Tuple[BaseNode, str], Timing] = {}
+
+        # исполняемые сейчас узлы: [узел, время его потомков]
+        self._frames: List[list] = []
+        self._walks = {node: self._timed_walk(node)
+                       for node, _ in root.iter_recursively()}
+        self._wrappers = self._timed_functions()
+
+    # Замеры -------------------------
+
+    def _finish(self, node: BaseNode, start: float) -> None:
+        """Записать время завершившегося узла.
+        """
+        elapsed = time.perf_counter() - start
+        _, children = self._frames.pop()
+
+        timing = self.nodes[node]
+        timing.calls += 1
+        timing.inclusive += elapsed
+        timing.exclusive += elapsed - children
+
+        if self._frames:
+            self._frames[-1][1] += elapsed
+
+    def _follow(self, node: BaseNode, start: float,
+                steps: GeneratorType) -> Any:
+        """Пройти шаги узла, завершение узла - конец генератора.
+        """
+        try:
+            return (yield from steps)
+        finally:
+            self._finish(node, start)
+
+    def _timed_walk(self, node: BaseNode):
+        """Замеряющая замена node.walk.
+        """
+        walk = node.walk
+        self.nodes[node] = Timing()
+
+        def timed_walk(namespace: NamespaceWrapper, stack: StackWrapper,
+                       depth: int = 0) -> Any:
+            """Исполнить узел с замером.
+            """
+            self._frames.append([node, 0.0])
+            start = time.perf_counter()
+
+            try:
+                step = walk(namespace, stack, depth)
+            except BaseException:
+                self._finish(node, start)
+                raise
+
+            if isinstance(step, GeneratorType):
+                return self._follow(node, start, step)
+
+            self._finish(node, start)
+            return step
+
+        return timed_walk
+
+    def _timed_functions(self) -> Dict[FuncWrapper, FuncWrapper]:
+        """Замеряющие замены стандартных функций.
+        """
+        output = {}
+
+        for name, wrapper in get_default_functions().items():
+            timing = self.functions[name] = Timing()
+
+            def timed(*args, _name=name, _func=wrapper.func,
+                      _timing=timing):
+                """Вызвать функцию с замером.
+                """
+                start = time.perf_counter()
+                try:
+                    return _func(*args)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    _timing.calls += 1
+                    _timing.inclusive += elapsed
+                    _timing.exclusive += elapsed
+
+                    if self._frames:
+                        frame = self._frames[-1]
+                        frame[1] += elapsed
+                        call = self.calls.get((frame[0], _name))
+                        if call is None:
+                            call = self.calls[frame[0], _name] = Timing()
+                        call.calls += 1
+                        call.inclusive += elapsed
+                        call.exclusive += elapsed
+
+            output[wrapper] = FuncWrapper(timed, wrapper.repr, wrapper.lazy)
+
+        return output
+
+    # Исполнение -------------------------
+
+    def evaluate(self, namespace: NamespaceWrapper = None,
+                 stack: StackWrapper = None) -> Any:
+        """Исполнить дерево, как BaseNode.evaluate, и замерить.
+
+        Без namespace исполняется со стандартными функциями.
+        """
+        namespace = namespace if namespace is not None else Namespace()
+
+        self.runs += 1
+        if (self.runs - 1) % self.sample_every:
+            return self.root.evaluate(namespace, stack)
+
+        self.samples += 1
+        contents = namespace.contents
+        # стандартные функции из нижнего слоя после замера удаляются
+        # из своих значений, а не записываются в них
+        own = contents.own() if isinstance(contents, LayeredDict) \
+            else contents
+        replaced = {name: value for name, value in contents.items()
+                    if name in DEFAULT_FUNCTIONS
+                    and isinstance(value, FuncWrapper)
+                    and value in self._wrappers}
+
+        for node, timed_walk in self._walks.items():
+            node.__dict__['walk'] = timed_walk
+        contents.update({name: self._wrappers[value]
+                         for name, value in replaced.items()})
+
+        try:
+            return self.root.evaluate(namespace, stack)
+        finally:
+            for node in self._walks:
+                node.__dict__.pop('walk', None)
+            for name, value in replaced.items():
+                if contents.get(name) is self._wrappers[value]:
+                    if name in own:
+                        contents[name] = value
+                    else:
+                        del contents[name]
+            self._frames.clear()
+
+    # Отчёты -------------------------
+
+    def label(self, node: BaseNode) -> str:
+        """Подпись узла: как в NodeTreePrinter и место в исходном тексте.
+        """
+        text = NodeTreePrinter(colored=False).wrap_in_color(node)
+        token = _token(node)
+
+        if token is None or token.span is None:
+            return text
+        if self.locate is None:
+            return f'{text} @{token.span[0]}'
+
+        line, column = self.locate(token.span[0])
+        return f'{text} @{line}:{column + 1}'
+
+    def hot_nodes(self, amount: int = 10) -> List[Tuple[BaseNode, Timing]]:
+        """Узлы с наибольшим собственным временем.
+        """
+        measured = [(node, timing) for node, timing in self.nodes.items()
+                    if timing.calls]
+        measured.sort(key=lambda x: x[1].exclusive, reverse=True)
+        return measured[:amount]
+
+    def top(self, amount: int = 10) -> str:
+        """Таблица самых горячих узлов и стандартных функций.
+
+        Время в микросекундах, суммарное по замеренным исполнениям.
+        """
+        lines = [f'исполнений: {self.runs}, замерено: {self.samples}',
+                 f'{"собств., мкс":>13} {"полное, мкс":>13} '
+                 f'{"вызовы":>8}  узел']
+
+        for node, timing in self.hot_nodes(amount):
+            lines.append(_row(timing, self.label(node)))
+
+        functions = sorted(
+            ((name, timing) for name, timing in self.functions.items()
+             if timing.calls),
+            key=lambda x: x[1].exclusive, reverse=True,
+        )
+        if functions:
+            lines.append(f'{"":>36}  функция')
+            for name, timing in functions[:amount]:
+                lines.append(_row(timing, name))
+
+        return '\n'.join(lines)
+
+    def stacks(self) -> Iterator[Tuple[List[str], float]]:
+        """Стеки от корня с собственным временем в секундах.
+        """
+        paths: Dict[BaseNode, List[str]] = {}
+
+        for node, _ in self.root.iter_recursively():
+            parent_path = paths.get(node.parent, [])
+            paths[node] = parent_path + [self.label(node)]
+
+            timing = self.nodes.get(node)
+            if timing is not None and timing.calls:
+                yield paths[node], timing.exclusive
+
+        for (node, name), timing in self.calls.items():
+            yield paths[node] + [name], timing.exclusive
+
+    def to_collapsed(self) -> str:
+        """Свёрнутые стеки для flamegraph.pl, вес - микросекунды.
+        """
+        return '\n'.join(
+            ';'.join(x.replace(';', ',') for x in path)
+            + f' {round(elapsed * 1_000_000)}'
+            for path, elapsed in self.stacks()
+        )
+
+    def to_speedscope(self, name: str = 'exceltranslator') -> dict:
+        """Профиль в формате speedscope (тип sampled, вес - микросекунды).
+        """
+        frames: Dict[str, int] = {}
+        samples = []
+        weights = []
+
+        for path, elapsed in self.stacks():
+            samples.append([frames.setdefault(x, len(frames)) for x in path])
+            weights.append(round(elapsed * 1_000_000, 3))
+
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'shared': {'frames': [{'name': x} for x in frames]},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'microseconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights,
+            }],
+            'name': name,
+            'exporter': 'exceltranslator',
+        }
+
+    def save_speedscope(self, path: str,
+                        name: str = 'exceltranslator') -> None:
+        """Записать профиль speedscope в файл.
+        """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_speedscope(name), file, ensure_ascii=False)
+
+
+def _token(node: BaseNode) -> Optional[BaseToken]:
+    """Токен, по которому узел находится в тексте.
+
+    Оператор для бинарных узлов, иначе самый левый литерал или имя.
+    """
+    operator = getattr(node, 'operator', None)
+    if operator is not None:
+        return operator
+
+    while not isinstance(node, VarNode):
+        if not node.sub_nodes:
+            return None
+        node = node.sub_nodes[0]
+    return node.value
+
+
+def _row(timing: Timing, label: str) -> str:
+    """Строка таблицы top.
+    """
+    return f'{timing.exclusive * 1_000_000:>13.1f} ' \
+           f'{timing.inclusive * 1_000_000:>13.1f} ' \
+           f'{timing.calls:>8}  {label}'
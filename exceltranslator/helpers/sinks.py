@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+
+"""Приёмники событий наблюдателя.
+
+Приёмник получает каждое событие, на которое подписан наблюдатель:
+
+    MemorySink - сводка в памяти, из неё строится отчёт;
+    JsonLinesSink - текстовый журнал, одно событие в строке;
+    BinarySink - компактный двоичный журнал, читается read_binary.
+
+Файловые приёмники копят записи в буфере и пишут их в файл крупными
+кусками, поэтому трассировка почти не добавляет случайного ввода-вывода.
+"""
+import json
+import struct
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Tuple
+
+__all__ = [
+    'Sink',
+    'MemorySink',
+    'JsonLinesSink',
+    'BinarySink',
+    'read_binary',
+    'binary_report',
+]
+
+# событие в журнале: заголовок и данные
+Event = Tuple[str, Dict[str, Any]]
+
+
+class Sink(ABC):
+    """Приёмник событий.
+    """
+
+    @abstractmethod
+    def write(self, header: str, payload: Dict[str, Any]) -> None:
+        """Принять событие.
+        """
+
+    def flush(self) -> None:
+        """Сбросить накопленное.
+        """
+
+    def close(self) -> None:
+        """Завершить работу.
+        """
+        self.flush()
+
+    def __enter__(self) -> 'Sink':
+        """Войти в контекст.
+        """
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Выйти из контекста.
+        """
+        self.close()
+
+
+class MemorySink(Sink):
+    """Сводка событий в памяти.
+
+    Хранит только счётчики и множества имён, поэтому занимает
+    одинаково мало места при любой длине исполнения.
+    """
+
+    def __init__(self) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.total = 0
+        self.counters = Counter()
+        self.max_stack_size = 0
+        self.names_get = set()
+        self.names_overwrite = set()
+        self.names_assign = set()
+
+    def write(self, header: str, payload: Dict[str, Any]) -> None:
+        """Учесть событие в сводке.
+        """
+        self.total += 1
+        self.counters[header] += 1
+
+        if header == 'stack_append' or header == 'stack_pop':
+            if payload['size'] > self.max_stack_size:
+                self.max_stack_size = payload['size']
+
+        elif header == 'namespace_get':
+            self.names_get.add(payload['key'])
+
+        elif header == 'namespace_overwrite':
+            self.names_overwrite.add(payload['key'])
+
+        elif header == 'namespace_assign':
+            self.names_assign.add(payload['key'])
+
+    def make_report(self) -> dict:
+        """Сформировать отчёт о событиях.
+        """
+        return {
+            'stack': {
+                'append': self.counters['stack_append'],
+                'pop': self.counters['stack_pop'],
+                'max_size': self.max_stack_size,
+            },
+            'namespace': {
+                'get': self.counters['namespace_get'],
+                'assign': self.counters['namespace_assign'],
+                'overwrite': self.counters['namespace_overwrite'],
+                'names': sorted({
+                    *self.names_get,
+                    *self.names_overwrite,
+                    *self.names_assign,
+                }),
+                'names_get': set(self.names_get),
+                'names_overwrite': set(self.names_overwrite),
+                'names_assign': set(self.names_assign),
+            },
+        }
+
+
+class JsonLinesSink(Sink):
+    """Журнал в формате JSON Lines.
+
+    Строки копятся в буфере и записываются, когда их набралось
+    buffer_size или с прошлой записи прошло flush_interval секунд.
+    Значения, которые нельзя записать в JSON, записываются строкой.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1_000,
+                 flush_interval: float = 1.0) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.file = open(path, 'w', encoding='utf-8')
+        self.buffer: List[str] = []
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.flushed_at = time.monotonic()
+
+    def write(self, header: str, payload: Dict[str, Any]) -> None:
+        """Добавить событие в буфер.
+        """
+        self.buffer.append(json.dumps({'event': header, 'data': payload},
+                                      ensure_ascii=False, default=str))
+
+        if len(self.buffer) >= self.buffer_size \
+                or time.monotonic() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Записать буфер в файл.
+        """
+        if self.buffer:
+            self.file.write('\n'.join(self.buffer) + '\n')
+            self.buffer.clear()
+        self.file.flush()
+        self.flushed_at = time.monotonic()
+
+    def close(self) -> None:
+        """Записать остаток и закрыть файл.
+        """
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+# Двоичный журнал -------------------------
+#
+# Файл начинается с MAGIC, дальше идут записи двух видов:
+#
+#     S <длина: uint32> <utf-8>  - строка таблицы, номера идут по порядку;
+#     E <заголовок: uint32> <количество полей: uint16>
+#       (<ключ: uint32> <значение>)*  - событие.
+#
+# Заголовки и ключи данных записываются в таблицу строк один раз,
+# в событиях остаются только их номера. Значение - байт типа и данные:
+#
+#     N - None, T/F - истина/ложь, i - int64, d - double,
+#     s - <длина: uint32> <utf-8>, r - <номер строки в таблице: uint32>,
+#     l - <количество: uint32> <значение>*.
+#
+# Короткие строковые значения (имена, места вызова) тоже попадают
+# в таблицу, пока она не слишком велика. Остальные значения
+# записываются строкой.
+
+MAGIC = b'ETRC\x01'
+
+# строки длиннее не попадают в таблицу, а пишутся в событие целиком
+INTERN_LENGTH = 64
+# после стольких строк таблица перестаёт пополняться значениями
+INTERN_LIMIT = 1 << 16
+
+_STRING = struct.Struct('<cI')
+_EVENT = struct.Struct('<cIH')
+_INDEX = struct.Struct('<I')
+_INTEGER = struct.Struct('<q')
+_DOUBLE = struct.Struct('<d')
+
+_INT64 = range(-2 ** 63, 2 ** 63)
+
+
+class BinarySink(Sink):
+    """Двоичный журнал событий.
+
+    Записи копятся в буфере и пишутся в файл, когда буфер
+    вырос до buffer_size байт.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.file = open(path, 'wb')
+        self.buffer = bytearray(MAGIC)
+        self.buffer_size = buffer_size
+        self.strings: Dict[str, bytes] = {}  # строка -> упакованный номер
+
+    def _intern(self, string: str) -> bytes:
+        """Упакованный номер строки, новая строка сразу записывается.
+        """
+        index = self.strings.get(string)
+
+        if index is None:
+            index = self.strings[string] = _INDEX.pack(len(self.strings))
+            encoded = string.encode('utf-8')
+            self.buffer += _STRING.pack(b'S', len(encoded))
+            self.buffer += encoded
+
+        return index
+
+    def _pack_value(self, value: Any, record: bytearray) -> None:
+        """Дописать значение к записи события.
+        """
+        value_type = type(value)
+
+        if value_type is str:
+            index = self.strings.get(value)
+            if index is None and len(value) <= INTERN_LENGTH \
+                    and len(self.strings) < INTERN_LIMIT:
+                index = self._intern(value)
+
+            if index is not None:
+                record += b'r'
+                record += index
+            else:
+                encoded = value.encode('utf-8')
+                record += b's'
+                record += _INDEX.pack(len(encoded))
+                record += encoded
+
+        elif value is None:
+            record += b'N'
+        elif value_type is bool:
+            record += b'T' if value else b'F'
+        elif value_type is int and value in _INT64:
+            record += b'i'
+            record += _INTEGER.pack(value)
+        elif value_type is float:
+            record += b'd'
+            record += _DOUBLE.pack(value)
+        elif value_type is list or value_type is tuple:
+            record += b'l'
+            record += _INDEX.pack(len(value))
+            for item in value:
+                self._pack_value(item, record)
+        else:
+            self._pack_value(str(value), record)
+
+    def write(self, header: str, payload: Dict[str, Any]) -> None:
+        """Добавить событие в буфер.
+
+        Событие собирается отдельно: новые строки таблицы попадают
+        в буфер раньше него, поэтому при чтении они уже известны.
+        """
+        strings = self.strings
+        record = bytearray(b'E')
+        record += strings.get(header) or self._intern(header)
+        record += len(payload).to_bytes(2, 'little')
+
+        for key, value in payload.items():
+            record += strings.get(key) or self._intern(key)
+
+            # самые частые значения - без вызова _pack_value
+            value_type = type(value)
+            if value_type is str and value in strings:
+                record += b'r'
+                record += strings[value]
+            elif value_type is float:
+                record += b'd'
+                record += _DOUBLE.pack(value)
+            else:
+                self._pack_value(value, record)
+
+        self.buffer += record
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Записать буфер в файл.
+        """
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+        self.file.flush()
+
+    def close(self) -> None:
+        """Записать остаток и закрыть файл.
+        """
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def _unpack_value(data: bytes, offset: int,
+                  strings: List[str]) -> Tuple[Any, int]:
+    """Прочитать значение, вернуть его и смещение после него.
+    """
+    kind = data[offset:offset + 1]
+    offset += 1
+
+    if kind == b'N':
+        return None, offset
+    if kind == b'T':
+        return True, offset
+    if kind == b'F':
+        return False, offset
+    if kind == b'i':
+        return _INTEGER.unpack_from(data, offset)[0], offset + _INTEGER.size
+    if kind == b'd':
+        return _DOUBLE.unpack_from(data, offset)[0], offset + _DOUBLE.size
+
+    length, = _INDEX.unpack_from(data, offset)
+    offset += _INDEX.size
+
+    if kind == b'r':
+        return strings[length], offset
+    if kind == b's':
+        end = offset + length
+        return data[offset:end].decode('utf-8'), end
+    if kind == b'l':
+        items = []
+        for _ in range(length):
+            item, offset = _unpack_value(data, offset, strings)
+            items.append(item)
+        return items, offset
+
+    raise ValueError(f'Неизвестный тип значения {kind!r} в журнале')
+
+
+def read_binary(path: str) -> Iterator[Event]:
+    """Прочитать события из двоичного журнала.
+
+    Кортежи и списки читаются как списки, прочие значения,
+    кроме чисел, строк, None и bool, - как строки.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    if not data.startswith(MAGIC):
+        raise ValueError(f'{path} не является журналом событий')
+
+    strings: List[str] = []
+    offset = len(MAGIC)
+
+    while offset < len(data):
+        kind = data[offset:offset + 1]
+
+        if kind == b'S':
+            _, length = _STRING.unpack_from(data, offset)
+            offset += _STRING.size
+            strings.append(data[offset:offset + length].decode('utf-8'))
+            offset += length
+
+        elif kind == b'E':
+            _, header, fields = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            payload = {}
+            for _ in range(fields):
+                key, = _INDEX.unpack_from(data, offset)
+                offset += _INDEX.size
+                payload[strings[key]], offset = _unpack_value(data, offset,
+                                                             strings)
+            yield strings[header], payload
+
+        else:
+            raise ValueError(f'Неизвестная запись {kind!r} в журнале')
+
+
+def binary_report(path: str) -> dict:
+    """Отчёт Watcher.make_report по двоичному журналу.
+    """
+    summary = MemorySink()
+    for header, payload in read_binary(path):
+        summary.write(header, payload)
+    return summary.make_report()
@@ -33,23 +33,30 @@ class StackWrapper(Informer):
         """Снять верхушку стека и сообщить об этом куда надо.
         """
         value = self._stack.pop()
-        self.propagate(
-            'stack_pop',
-            value=value,
-            caller=str(caller),
-            caller_id=id(caller),
-            size=len(self._stack),
-        )
+
+        watcher = self.listener('stack_pop')
+        if watcher is not None:
+            watcher.inform(
+                'stack_pop',
+                value=value,
+                caller=str(caller),
+                caller_id=id(caller),
+                size=len(self._stack),
+            )
+
         return value
 
     def append(self, caller: Any, value: Any) -> None:
         """Положить на верхушку стека и сообщить об этом куда надо.
         """
         self._stack.append(value)
-        self.propagate(
-            'stack_append',
-            value=value,
-            caller=str(caller),
-            caller_id=id(caller),
-            size=len(self._stack),
-        )
+
+        watcher = self.listener('stack_append')
+        if watcher is not None:
+            watcher.inform(
+                'stack_append',
+                value=value,
+                caller=str(caller),
+                caller_id=id(caller),
+                size=len(self._stack),
+            )
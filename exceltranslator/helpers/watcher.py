@@ -3,72 +3,71 @@
 """Специальный класс для отлеживания событий ноды.
 """
 from collections import deque
+from typing import Iterable, Optional
+
+from exceltranslator.helpers.sinks import MemorySink, Sink
 
 
 class Watcher:
     """Специальный класс для отлеживания событий ноды.
+
+    Если передан events, наблюдатель подписан только на эти события,
+    для остальных данные события даже не собираются.
+
+    Сводка для отчёта (MemorySink) обновляется на каждом событии,
+    поэтому отчёт не зависит от истории. Сама история может быть
+    ограничена (history_size, старые события вытесняются, 0 - не хранить
+    вовсе) и прорежена (sample_every, хранится каждое N-е событие).
+
+    Приёмники из sinks получают все события без прореживания,
+    например, для записи журнала в файл.
     """
 
-    def __init__(self):
+    def __init__(self, events: Optional[Iterable[str]] = None,
+                 history_size: Optional[int] = None,
+                 sample_every: int = 1,
+                 sinks: Iterable[Sink] = ()):
         """Инициализировать экземпляр.
         """
-        self.history = deque()
+        if sample_every < 1:
+            raise ValueError('sample_every должен быть не меньше 1')
+
+        self.history = deque(maxlen=history_size)
+        self.events = frozenset(events) if events is not None else None
+        self.sample_every = sample_every
+        self.summary = MemorySink()
+        self.sinks = tuple(sinks)
+
+    @property
+    def total(self) -> int:
+        """Количество полученных событий.
+        """
+        return self.summary.total
+
+    def wants(self, header: str) -> bool:
+        """Нужно ли наблюдателю событие такого типа.
+        """
+        return self.events is None or header in self.events
 
     def inform(self, header: str, **kwargs):
         """Записать событие.
         """
-        self.history.append((header, kwargs))
+        if self.summary.total % self.sample_every == 0:
+            self.history.append((header, kwargs))
+
+        self.summary.write(header, kwargs)
+        for sink in self.sinks:
+            sink.write(header, kwargs)
+
+    def close(self) -> None:
+        """Записать и закрыть все приёмники.
+        """
+        for sink in self.sinks:
+            sink.close()
 
     def make_report(self) -> dict:
         """Сформировать отчёт о событиях.
+
+        Собирается из готовой сводки, длина истории не важна.
         """
-        report = {
-            'stack': {
-                'append': 0,
-                'pop': 0,
-                'max_size': 0,
-            },
-            'namespace': {
-                'get': 0,
-                'assign': 0,
-                'overwrite': 0,
-                'names': [],
-                'names_get': set(),
-                'names_overwrite': set(),
-                'names_assign': set(),
-            },
-        }
-        for header, kwargs in self.history:
-            if header == 'stack_append':
-                report['stack']['append'] += 1
-                report['stack']['max_size'] = max(report['stack']['max_size'],
-                                                  kwargs['size'])
-
-            if header == 'stack_pop':
-                report['stack']['pop'] += 1
-                report['stack']['max_size'] = max(report['stack']['max_size'],
-                                                  kwargs['size'])
-
-            if header == 'namespace_get':
-                report['namespace']['get'] = report['namespace']['get'] + 1
-                report['namespace']['names_get'].add(kwargs['key'])
-
-            if header == 'namespace_overwrite':
-                report['namespace']['overwrite'] \
-                    = report['namespace']['overwrite'] + 1
-                report['namespace']['names_overwrite'].add(kwargs['key'])
-
-            if header == 'namespace_assign':
-                report['namespace']['assign'] \
-                    = report['namespace']['assign'] + 1
-                report['namespace']['names_assign'].add(kwargs['key'])
-
-            report['namespace']['names'] = sorted(
-                {
-                    *report['namespace']['names_get'],
-                    *report['namespace']['names_overwrite'],
-                    *report['namespace']['names_assign']
-                }
-            )
-
-        return report
+        return self.summary.make_report()
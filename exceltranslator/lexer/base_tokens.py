@@ -24,9 +24,12 @@ class BaseToken(AsIsMixin):
     """
     source_code: str = '' # как было
     base_pattern: str = ''  # как искать
+    raw_pattern: str = ''  # как искать внутри общего выражения
     figure: str = ''  # как показывать
     flags: int = re.IGNORECASE | re.DOTALL  # параметры компиляции
     pattern: Pattern
+    span: Optional[Tuple[int, int]] = None  # где находится в исходном тексте
+    binding_power: int = 0  # сила связывания оператора (0 - не оператор)
 
     def __init__(self, source_code: str) -> None:
         """Инициализировать экземпляр.
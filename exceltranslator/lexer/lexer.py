@@ -2,19 +2,56 @@
 
 """Лексический анализатор.
 """
+import re
 from collections import deque
-from typing import Type, Tuple, List, NoReturn, Deque, Optional
+from typing import (
+    Type, Tuple, List, NoReturn, Optional, Iterable, Dict, Generator, Pattern,
+)
 
 from exceltranslator import settings
 from exceltranslator.exceptions import CustomSyntaxError
 from exceltranslator.lexer.base_tokens import BaseToken
+from exceltranslator.lexer.token_store import TokenStore
+from exceltranslator.lexer.token_stream import TokenStream
 from exceltranslator.lexer.tokens import known_tokens
+from exceltranslator.lexer.validation import (
+    Validation, Problem, validate, build_validation_pattern,
+)
 
 __all__ = [
     'BaseLexer',
     'Lexer',
+    'build_master_pattern',
 ]
 
+# префикс имён групп в общем регулярном выражении
+GROUP_PREFIX = 't'
+# пробельные символы между токенами
+WHITESPACE = re.compile(r'[ \t\r\n]*')
+# соответствие флагов компиляции их встроенной записи
+INLINE_FLAGS = {
+    re.IGNORECASE: 'i',
+    re.MULTILINE: 'm',
+    re.DOTALL: 's',
+    re.VERBOSE: 'x',
+}
+
+
+def build_master_pattern(token_types: Iterable[Type[BaseToken]]) -> Pattern:
+    """Собрать общее регулярное выражение для всех типов токенов.
+
+    Каждый тип становится отдельной именованной группой. Альтернативы
+    проверяются слева направо в порядке регистрации, поэтому приоритеты
+    остаются прежними: ключевые слова раньше имён, ** раньше *, <= раньше <.
+    """
+    parts = []
+    for i, token_type in enumerate(token_types):
+        flags = ''.join(letter for flag, letter in INLINE_FLAGS.items()
+                        if token_type.flags & flag)
+        pattern = token_type.raw_pattern or token_type.base_pattern
+        parts.append(f'(?P<{GROUP_PREFIX}{i}>(?{flags}:{pattern}))')
+    return re.compile('|'.join(parts))
+
 
 class BaseLexer:
     """Лексический анализатор.
@@ -35,14 +72,20 @@ class BaseLexer:
         self.source_code = ''
         self.preprocessed_code = ''
         self.tokens: Tuple[BaseToken, ...] = ()
-        self._runtime_tokens: Deque[BaseToken] = deque()
+        self.pattern: Optional[Pattern] = None
+        self._group_types: Dict[str, Type[BaseToken]] = {}
+        self.stream = TokenStream()
+        # открывающая скобка -> закрывающая (позиции в тексте)
+        self.pairs: Dict[int, int] = {}
+        self._validation_pattern = build_validation_pattern(self.white_list)
 
     def clear(self) -> None:
         """Сбросить параметры до исходных, кроме известных токенов.
         """
         self.source_code = ''
         self.preprocessed_code = ''
-        self._runtime_tokens = deque(self.tokens)
+        self.stream = TokenStream()
+        self.pairs = {}
 
     def error(self, description: str) -> NoReturn:
         """Выдать синтаксическую ошибку.
@@ -53,6 +96,11 @@ class BaseLexer:
         """Зарегистрировать токены в лексере.
         """
         self.tokens = tuple(token_types)
+        self.pattern = build_master_pattern(self.tokens)
+        self._group_types = {
+            f'{GROUP_PREFIX}{i}': token_type
+            for i, token_type in enumerate(self.tokens)
+        }
 
     def check_quotes(self, input_text: str) -> None:
         """Убедиться, что кавычки в тексте расставлены правильно.
@@ -153,58 +201,76 @@ class BaseLexer:
                            + input_text[index + 1:right]) + suffix
         return source
 
+    def validate(self, input_text: str) -> Validation:
+        """Проверить текст за один проход и собрать все проблемы.
+        """
+        return validate(input_text, self._validation_pattern)
+
+    def describe(self, problems: List[Problem], input_text: str) -> str:
+        """Оформить описание найденных проблем.
+        """
+        lines = [
+            f'{problem.description} '
+            f'{self.problem_at(problem.index, input_text)}'
+            for problem in problems
+        ]
+        if len(lines) == 1:
+            return lines[0]
+        return f'найдено проблем: {len(lines)}\n' + '\n'.join(lines)
+
     def preprocess(self, input_text: str) -> str:
         """Предварительная обработка.
         """
-        if delta := set(input_text) - self.white_list:
-            self.error(
-                'в скрипте нельзя использовать символы {}'.format(
-                    ''.join(repr(x) for x in sorted(delta))
-                )
-            )
-
-        self.check_parenthesis(input_text)
-        self.check_quotes(input_text)
+        validation = self.validate(input_text)
+        if validation.problems:
+            self.error(self.describe(validation.problems, input_text))
 
+        self.pairs = validation.pairs
         return input_text
 
-    def tokenize(self, input_text: str) -> List[BaseToken]:
-        """Разложить текст на токены.
+    def scan(self, input_text: str) \
+            -> Generator[Tuple[Type[BaseToken], int, int], None, None]:
+        """Найти тип и границы каждого токена за один проход по тексту.
         """
-        # FIXME - очень неоптимальная реализация!
-        string = input_text
-        output: List[BaseToken] = []
-        position = 0
-
-        while position < len(string):
-            while string[position] in ('\n', '\t', ' ', '\r'):
-                position += 1
-                if position >= len(string):
-                    break
-
-            for token_type in self.tokens:
-                token, end = token_type.try_making(string[position:])
+        match_token = self.pattern.match
+        skip_spaces = WHITESPACE.match
+        group_types = self._group_types
+        size = len(input_text)
+        position = skip_spaces(input_text).end()
 
-                if token is not None:
-                    position += end
-                    output.append(token)
-                    break
+        while position < size:
+            match = match_token(input_text, position)
 
-                if position >= len(string):
-                    break
-
-            else:
+            if match is None:
                 raise ValueError(
-                    f'Не удалось распознать символ: {string[0]!r}'
+                    f'Не удалось распознать символ: {input_text[position]!r} '
+                    f'(№{position + 1})'
                 )
 
+            end = match.end()
+            yield group_types[match.lastgroup], position, end
+            position = skip_spaces(input_text, end).end()
+
+    def store(self, input_text: str) -> TokenStore:
+        """Разложить текст на токены в компактном виде.
+        """
+        output = TokenStore(input_text, self.tokens)
+        for token_type, start, end in self.scan(input_text):
+            output.append(token_type, start, end)
         return output
 
+    def tokenize(self, input_text: str) -> List[BaseToken]:
+        """Разложить текст на токены.
+        """
+        return list(self.store(input_text))
+
     @property
     def tokens_left(self) -> List[str]:
         """Отобразить, какие токены осталось обработать.
+
+        Собирает весь остаток потока, поэтому годится только для вывода.
         """
-        return [str(x) for x in self._runtime_tokens]
+        return [str(x) for x in self.stream.upcoming(len(self.stream))]
 
     def analyze(self, source_code: str) -> None:
         """Разложить исходный код на набор токенов.
@@ -215,15 +281,17 @@ class BaseLexer:
         self.clear()
         self.source_code = source_code
         self.preprocessed_code = self.preprocess(self.source_code)
-        self._runtime_tokens = deque(self.tokenize(self.preprocessed_code))
+        self.stream = TokenStream(self.store(self.preprocessed_code))
+
+    def has_more(self) -> bool:
+        """Остались ли необработанные токены.
+        """
+        return self.stream.has_more()
 
-    def cut_next(self):
+    def cut_next(self) -> Optional[BaseToken]:
         """Откусить следующий символ от последовательности.
         """
-        next_one = None
-        if self._runtime_tokens:
-            next_one = self._runtime_tokens.popleft()
-        return next_one
+        return self.stream.advance()
 
     def dispose_next(self, token_type: Type) -> None:
         """Удалить токен по причине ненужности.
@@ -234,20 +302,32 @@ class BaseLexer:
             self.error(
                 f'Предполагалось уничтожить токен типа {token_type.__name__},'
                 f' а уничтожается {type(next_one).__name__}.'
+                + self.locate(next_one)
             )
 
     def show_next(self) -> Optional[BaseToken]:
         """Показать следующий символ (не откусывая его).
         """
-        next_one = None
-        if self._runtime_tokens:
-            next_one = self._runtime_tokens[0]
-        return next_one
+        return self.stream.peek()
+
+    def next_type(self) -> Optional[Type[BaseToken]]:
+        """Тип следующего токена.
+        """
+        return self.stream.peek_type()
 
     def next_in(self, *args) -> bool:
         """Проверить, входит ли следующий символ в эти типы.
         """
-        return type(self.show_next()) in args
+        return self.stream.peek_type() in args
+
+    def locate(self, token: Optional[BaseToken]) -> str:
+        """Показать, где в исходном тексте находится токен.
+        """
+        if token is None or token.span is None:
+            return ''
+        start, _ = token.span
+        return f' Символ №{start + 1}: ' \
+               + self.problem_at(start, self.preprocessed_code)
 
 
 class Lexer(BaseLexer):
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+"""Перевод номера символа исходного текста в строку и столбец.
+"""
+import re
+from bisect import bisect_right
+from typing import Tuple
+
+__all__ = [
+    'LineIndex',
+]
+
+
+class LineIndex:
+    """Начала строк исходного текста для перевода номера символа
+    в строку и столбец.
+    """
+
+    def __init__(self, source: str = '') -> None:
+        """Инициализировать экземпляр.
+        """
+        self.starts = [0] + [x.end() for x in re.finditer('\n', source)]
+
+    def __call__(self, offset: int) -> Tuple[int, int]:
+        """Строка (с единицы) и столбец (с нуля) для символа.
+        """
+        line = bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1]
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""Компактное хранилище токенов.
+"""
+from array import array
+from typing import Sequence, Type, Tuple, Optional, Union, List
+
+from exceltranslator.lexer.base_tokens import BaseToken
+
+__all__ = [
+    'TokenStore',
+]
+
+# пробельные символы, которые не входят в границы токена
+TRAILING_SPACES = ' \t\r\n'
+
+
+class TokenStore(Sequence):
+    """Компактное хранилище токенов.
+
+    Для каждого токена хранит только номер типа и границы в исходном
+    тексте (три числа в массивах). Объекты BaseToken создаются по запросу
+    и получают точные границы в атрибуте span.
+    """
+
+    def __init__(self, source: str,
+                 token_types: Sequence[Type[BaseToken]]) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.source = source
+        self.token_types = tuple(token_types)
+        self._codes = {
+            token_type: code
+            for code, token_type in enumerate(self.token_types)
+        }
+        self.kinds = array('H')
+        self.starts = array('I')
+        self.ends = array('I')
+        # последний созданный токен, чтобы peek и advance
+        # одного и того же индекса не создавали его дважды
+        self._last: Tuple[int, Optional[BaseToken]] = (-1, None)
+
+    def __len__(self) -> int:
+        """Количество токенов.
+        """
+        return len(self.kinds)
+
+    def __repr__(self) -> str:
+        """Вернуть текстовое представление.
+        """
+        return type(self).__name__ + f'({len(self)} токенов)'
+
+    def __getitem__(self, index: Union[int, slice]) \
+            -> Union[BaseToken, List[BaseToken]]:
+        """Создать токен (или список токенов) по индексу.
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+
+        last_index, last_token = self._last
+        if index == last_index:
+            return last_token
+
+        start = self.starts[index]
+        end = self.ends[index]
+        token = self.token_types[self.kinds[index]](self.source[start:end])
+        token.span = (start, end)
+        self._last = (index, token)
+        return token
+
+    def append(self, token_type: Type[BaseToken],
+               start: int, end: int) -> None:
+        """Добавить токен, отбросив пробелы в конце его границ.
+        """
+        source = self.source
+        while end > start and source[end - 1] in TRAILING_SPACES:
+            end -= 1
+
+        self.kinds.append(self._codes[token_type])
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def kind(self, index: int) -> Type[BaseToken]:
+        """Тип токена по индексу (без создания самого токена).
+        """
+        return self.token_types[self.kinds[index]]
+
+    def span(self, index: int) -> Tuple[int, int]:
+        """Границы токена в исходном тексте.
+        """
+        return self.starts[index], self.ends[index]
+
+    def nbytes(self) -> int:
+        """Объём памяти, занятый массивами.
+        """
+        return sum(
+            len(x) * x.itemsize
+            for x in (self.kinds, self.starts, self.ends)
+        )
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""Поток токенов с курсором.
+"""
+from typing import Optional, Sequence, List, Type
+
+from exceltranslator.lexer.base_tokens import BaseToken
+
+__all__ = [
+    'TokenStream',
+]
+
+
+class TokenStream:
+    """Поток токенов с курсором.
+
+    Токены лежат в неизменяемом массиве, чтение лишь сдвигает индекс,
+    поэтому проверка остатка, заглядывание вперёд и откат стоят O(1).
+    """
+
+    def __init__(self, tokens: Sequence[BaseToken] = ()) -> None:
+        """Инициализировать экземпляр.
+        """
+        self._tokens = tokens
+        self._position = 0
+        # хранилище может сообщать тип токена, не создавая его
+        self._kind = getattr(tokens, 'kind', None)
+
+    def __len__(self) -> int:
+        """Количество ещё не прочитанных токенов.
+        """
+        return len(self._tokens) - self._position
+
+    def __repr__(self) -> str:
+        """Вернуть текстовое представление.
+        """
+        return type(self).__name__ \
+               + f'({self._position}/{len(self._tokens)})'
+
+    @property
+    def position(self) -> int:
+        """Индекс следующего токена.
+        """
+        return self._position
+
+    def has_more(self) -> bool:
+        """Остались ли непрочитанные токены.
+        """
+        return self._position < len(self._tokens)
+
+    def peek(self, k: int = 0) -> Optional[BaseToken]:
+        """Показать токен на k позиций впереди курсора (не сдвигая его).
+        """
+        index = self._position + k
+        if 0 <= index < len(self._tokens):
+            return self._tokens[index]
+        return None
+
+    def peek_type(self, k: int = 0) -> Optional[Type[BaseToken]]:
+        """Показать тип токена на k позиций впереди курсора.
+        """
+        index = self._position + k
+        if 0 <= index < len(self._tokens):
+            if self._kind is not None:
+                return self._kind(index)
+            return type(self._tokens[index])
+        return None
+
+    def advance(self) -> Optional[BaseToken]:
+        """Вернуть следующий токен и сдвинуть курсор.
+        """
+        if self._position < len(self._tokens):
+            token = self._tokens[self._position]
+            self._position += 1
+            return token
+        return None
+
+    def upcoming(self, amount: int) -> List[BaseToken]:
+        """Показать не более amount следующих токенов.
+        """
+        return list(self._tokens[self._position:self._position + amount])
+
+    def mark(self) -> int:
+        """Запомнить текущее положение курсора.
+        """
+        return self._position
+
+    def reset(self, mark: int) -> None:
+        """Вернуть курсор в запомненное положение.
+        """
+        if not 0 <= mark <= len(self._tokens):
+            raise IndexError(f'Позиция {mark} вне потока токенов.')
+        self._position = mark
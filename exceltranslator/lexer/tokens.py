@@ -52,8 +52,10 @@ known_tokens = []
 def register(token_type: Type[BaseToken]) -> Type[BaseToken]:
     """Положи этот токен в список known_tokens.
 
-    Добавляем игнорирование пробелов.
+    Добавляем игнорирование пробелов. Исходный шаблон сохраняется
+    отдельно, из него лексер собирает общее регулярное выражение.
     """
+    token_type.raw_pattern = token_type.base_pattern
     token_type.base_pattern = r'^\s*' + token_type.base_pattern
     token_type.pattern = re.compile(token_type.base_pattern,
                                     flags=token_type.flags)
@@ -105,14 +107,14 @@ class NullToken(BaseToken):
 class IntegerToken(NumberToken):
     """Целое число.
     """
-    base_pattern = r'\b(?<!\.)(\d+)(?!\.)\b'
+    base_pattern = r'(\d+)(?!\.)\b'
 
 
 @register
 class FloatToken(NumberToken):
     """Число с плавающей точкой.
     """
-    base_pattern = r'\b(?<!\.)(\d+\.\d+)(?!\.)\b'
+    base_pattern = r'(\d+\.\d+)(?!\.)\b'
 
 
 @register
@@ -122,6 +124,7 @@ class PowerToken(BinaryToken):
     base_pattern = r'(\*\*)'
     figure = '**'
     callable = pow
+    binding_power = 7
 
 
 @register
@@ -183,6 +186,7 @@ class Multiply(BinaryToken):
     base_pattern = r'(\*)(?!\*)'
     figure = '*'
     _callable = (mul,)
+    binding_power = 6
 
 
 @register
@@ -192,6 +196,7 @@ class Divide(BinaryToken):
     base_pattern = r'(\/)'
     figure = '/'
     _callable = (truediv,)
+    binding_power = 6
 
 
 @register
@@ -201,6 +206,7 @@ class Plus(BinaryToken):
     base_pattern = r'(\+)'
     figure = '+'
     _callable = (add,)
+    binding_power = 5
 
 
 @register
@@ -210,6 +216,7 @@ class Minus(BinaryToken):
     base_pattern = r'(\-)'
     figure = '-'
     _callable = (sub,)
+    binding_power = 5
 
 
 @register
@@ -219,6 +226,7 @@ class LT(BinaryToken):
     base_pattern = r'(<)(?!\=)'
     figure = '<'
     _callable = (lt,)
+    binding_power = 4
 
 
 @register
@@ -228,6 +236,7 @@ class GT(BinaryToken):
     base_pattern = r'(>)(?!\=)'
     figure = '>'
     _callable = (gt,)
+    binding_power = 4
 
 
 @register
@@ -237,6 +246,7 @@ class LE(BinaryToken):
     base_pattern = r'(<=)'
     figure = '<='
     _callable = (le,)
+    binding_power = 4
 
 
 @register
@@ -246,6 +256,7 @@ class GE(BinaryToken):
     base_pattern = r'(>=)'
     figure = '>='
     _callable = (ge,)
+    binding_power = 4
 
 
 @register
@@ -255,6 +266,7 @@ class EqualToken(BinaryToken):
     base_pattern = r'(==)'
     figure = '=='
     _callable = (good_eq,)
+    binding_power = 3
 
 
 @register
@@ -264,6 +276,7 @@ class NotEqualToken(BinaryToken):
     base_pattern = r'(!=)'
     figure = '!='
     _callable = (good_ne,)
+    binding_power = 3
 
 
 @register
@@ -273,6 +286,7 @@ class AndToken(BinaryToken):
     base_pattern = r'(И|AND)\s'
     _callable = (and_,)
     figure = 'and'
+    binding_power = 2
 
 
 @register
@@ -282,6 +296,7 @@ class OrToken(BinaryToken):
     base_pattern = r'(ИЛИ|OR)\s'
     _callable = (or_,)
     figure = 'or'
+    binding_power = 2
 
 
 @register
@@ -299,6 +314,7 @@ class Assignment(BaseToken):
     """
     base_pattern = r'(=)(?!=)'
     figure = '='
+    binding_power = 1
 
 
 @register
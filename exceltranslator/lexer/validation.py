@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""Проверка исходного текста за один проход.
+"""
+import re
+from typing import List, Dict, Iterable, Tuple, Pattern
+
+__all__ = [
+    'Problem',
+    'Validation',
+    'validate',
+    'build_validation_pattern',
+]
+
+# парные скобки: открывающая -> закрывающая
+BRACKETS = {
+    '(': ')',
+    '[': ']',
+    '{': '}',
+}
+CLOSING = {value: key for key, value in BRACKETS.items()}
+QUOTES = {
+    "'": 'одинарных',
+    '"': 'двойных',
+}
+
+
+class Problem:
+    """Найденная в тексте проблема.
+    """
+
+    def __init__(self, index: int, description: str) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.index = index
+        self.description = description
+
+    def __repr__(self) -> str:
+        """Вернуть текстовое представление.
+        """
+        return type(self).__name__ + f'({self.index}, {self.description!r})'
+
+
+class Validation:
+    """Результат проверки текста.
+
+    Содержит все найденные проблемы и соответствие позиций
+    открывающих скобок позициям закрывающих.
+    """
+
+    def __init__(self) -> None:
+        """Инициализировать экземпляр.
+        """
+        self.problems: List[Problem] = []
+        self.pairs: Dict[int, int] = {}
+
+    def __repr__(self) -> str:
+        """Вернуть текстовое представление.
+        """
+        return type(self).__name__ + f'(проблем: {len(self.problems)}, ' \
+                                     f'пар скобок: {len(self.pairs)})'
+
+    def __bool__(self) -> bool:
+        """Прошёл ли текст проверку.
+        """
+        return not self.problems
+
+
+def build_validation_pattern(white_list: Iterable[str]) -> Pattern:
+    """Собрать выражение, находящее только значимые для проверки символы.
+
+    Всё остальное регулярное выражение пропускает само, без участия Python.
+    """
+    significant = ''.join(BRACKETS) + ''.join(CLOSING) + ''.join(QUOTES)
+    allowed = ''.join(sorted(set(white_list) - set(significant)))
+    return re.compile(f'[{re.escape(significant)}]|[^{re.escape(allowed)}]')
+
+
+def validate(input_text: str, pattern: Pattern) -> Validation:
+    """Проверить допустимость символов, парность скобок и кавычек.
+
+    Порядок проблем повторяет порядок прежних отдельных проверок:
+    сначала недопустимые символы, затем скобки, затем кавычки.
+    """
+    result = Validation()
+    forbidden: Dict[str, int] = {}
+    brackets: List[Problem] = []
+    stack: List[Tuple[str, int]] = []
+    quotes_amount = dict.fromkeys(QUOTES, 0)
+    quotes_last_seen = dict.fromkeys(QUOTES, 0)
+
+    for match in pattern.finditer(input_text):
+        symbol = match.group()
+        index = match.start()
+
+        if symbol in BRACKETS:
+            stack.append((symbol, index))
+
+        elif symbol in CLOSING:
+            if stack and stack[-1][0] == CLOSING[symbol]:
+                result.pairs[stack.pop()[1]] = index
+            else:
+                brackets.append(Problem(
+                    index, f'символ "{symbol}" (№{index + 1}) не имеет пары.'
+                ))
+
+        elif symbol in QUOTES:
+            quotes_amount[symbol] += 1
+            quotes_last_seen[symbol] = index
+
+        else:
+            forbidden.setdefault(symbol, index)
+
+    if forbidden:
+        result.problems.append(Problem(
+            min(forbidden.values()),
+            'в скрипте нельзя использовать символы {}'.format(
+                ''.join(repr(x) for x in sorted(forbidden))
+            )
+        ))
+
+    brackets.extend(
+        Problem(index, f'символ "{symbol}" (№{index + 1}) не имеет пары.')
+        for symbol, index in stack
+    )
+    brackets.sort(key=lambda problem: problem.index)
+    result.problems.extend(brackets)
+
+    for symbol, name in QUOTES.items():
+        if quotes_amount[symbol] % 2:
+            index = quotes_last_seen[symbol]
+            result.problems.append(Problem(
+                index,
+                f'нечётное число {name} кавычек. '
+                f'Последняя из них символ №{index + 1}'
+            ))
+
+    return result
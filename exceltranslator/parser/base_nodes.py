@@ -11,7 +11,10 @@ from exceltranslator.helpers.namespace_wrapper import NamespaceWrapper
 from exceltranslator.helpers.stack_wrapper import StackWrapper
 from exceltranslator.helpers.watcher import Watcher
 from exceltranslator.lexer.base_tokens import BinaryToken
-from exceltranslator.utils import AsIsMixin
+from exceltranslator.utils import AsIsMixin, trampoline
+
+# что возвращает шаг исполнения: генератор или сразу готовое значение
+StepResult = Union[Generator[Any, Any, Any], Any]
 
 __all__ = [
     'BaseNode',
@@ -65,9 +68,12 @@ class BaseNode(Informer, AsIsMixin, ABC):
             -> Generator[Tuple['BaseNode', dict], None, None]:
         """Итерироваться по всем потомкам.
         """
-        yield self, depth
-        for i, child in enumerate(self.sub_nodes, start=1):
-            yield from child.iter_recursively(depth + 1)
+        pending = [(self, depth)]
+        while pending:
+            node, node_depth = pending.pop()
+            yield node, node_depth
+            pending.extend((child, node_depth + 1)
+                           for child in reversed(node.sub_nodes))
 
     def evaluate(self, namespace: NamespaceWrapper = None,
                  stack: StackWrapper = None) -> Any:
@@ -84,11 +90,22 @@ class BaseNode(Informer, AsIsMixin, ABC):
         return None
 
     def eval(self, namespace: NamespaceWrapper,
-             stack: StackWrapper, depth: int = 0) -> None:
+             stack: StackWrapper, depth: int = 0) -> Any:
         """Исполнить код в узле и всех потомках.
+
+        Обход выполняется без рекурсии, через trampoline.
+        """
+        return trampoline(self.walk(namespace, stack, depth))
+
+    def walk(self, namespace: NamespaceWrapper,
+             stack: StackWrapper, depth: int = 0) -> StepResult:
+        """Один шаг исполнения.
+
+        Вместо рекурсивного вызова потомки отдаются через yield.
+        Узлы без потомков могут исполняться сразу и ничего не отдавать.
         """
         for node in self.sub_nodes:
-            node.eval(namespace, stack, depth=depth + 1)
+            yield node.walk(namespace, stack, depth=depth + 1)
 
 
 class BaseBinaryNode(BaseNode, ABC):
@@ -165,7 +182,7 @@ class BaseCondition(BaseNode):
              stack: StackWrapper, depth: int):
         """Проверка истинности.
         """
-        return self.eval(namespace, stack, depth)
+        return (yield self.walk(namespace, stack, depth))
 
     @property
     def predicate(self) -> BaseNode:
@@ -179,11 +196,11 @@ class BaseCondition(BaseNode):
         """
         return self.sub_nodes[1]
 
-    def eval(self, namespace: NamespaceWrapper,
+    def walk(self, namespace: NamespaceWrapper,
              stack: StackWrapper, depth: int = 0):
         """Проверить условие.
         """
-        self.predicate.eval(namespace, stack, depth=depth + 1)
+        yield self.predicate.walk(namespace, stack, depth=depth + 1)
         result = stack.pop(self)
         return result
 
@@ -247,10 +264,10 @@ class ElseNode(BaseCondition):
         """
         return super().__repr__() + f' (else)'
 
-    def eval(self, namespace: NamespaceWrapper,
+    def walk(self, namespace: NamespaceWrapper,
              stack: StackWrapper, depth: int = 0):
         """Исполнить наследников.
         """
-        self.sub_scope.eval(namespace, stack, depth=depth + 1)
+        yield self.sub_scope.walk(namespace, stack, depth=depth + 1)
         result = stack.pop(self)
         return result
@@ -2,15 +2,16 @@
 
 """Звенья абстрактного синтаксического дерева.
 """
-from typing import Callable, List, cast, Union
+from typing import Any, Callable, List, cast, Union
 
-from exceltranslator.defined_names import FuncWrapper
+from exceltranslator.defined_names import FuncWrapper, LAZY_FUNCTIONS
 from exceltranslator.exceptions import CustomSemanticError
 from exceltranslator.helpers.namespace_wrapper import NamespaceWrapper
 from exceltranslator.helpers.stack_wrapper import StackWrapper
 from exceltranslator.lexer.base_tokens import *
 from exceltranslator.lexer.tokens import *
 from exceltranslator.parser.base_nodes import *
+from exceltranslator.parser.base_nodes import StepResult
 from exceltranslator.settings import DEFAULT_PRECISION
 
 __all__ = [
@@ -23,44 +24,65 @@ __all__ = [
     'CallNode',
     'AssigmentNode',
     'VarNode',
+    'ConstantNode',
+    'UNDECODED',
 ]
 
 from exceltranslator.utils import math_round, AsIsMixin
 
+# значение VarNode, токен которого не является литералом
+UNDECODED = object()
+
 
 class BinaryNode(BaseBinaryNode):
     """Узел для бинарных операторов.
+
+    Функция оператора выбирается при создании узла.
     """
 
-    def eval(self, namespace: NamespaceWrapper,
-             stack: StackWrapper, depth: int = 0) -> None:
+    def __init__(self, left_operand: Union[BaseNode, BaseBinaryNode],
+                 operator: BinaryToken,
+                 right_operand: Union[BaseNode, BaseBinaryNode]) -> None:
+        """Инициализировать экземпляр.
+        """
+        super().__init__(left_operand, operator, right_operand)
+        self.function = operator.callable \
+            if isinstance(operator, BinaryToken) else None
+        self.divides = type(operator) is Divide
+
+    def walk(self, namespace: NamespaceWrapper,
+             stack: StackWrapper, depth: int = 0) -> StepResult:
         """Исполнить код в узле и всех потомках.
         """
-        self.left_operand.eval(namespace, stack, depth=depth + 1)
+        yield self.left_operand.walk(namespace, stack, depth=depth + 1)
         left = stack.pop(self)
 
-        self.right_operand.eval(namespace, stack, depth=depth + 1)
+        yield self.right_operand.walk(namespace, stack, depth=depth + 1)
         right = stack.pop(self)
 
-        if self.operator.figure == '/' and right == 0:
-            self.propagate(
-                'zero_division',
-                location=f'{self}._evaluate',
-                operation=f'{self.left_operand} / {self.right_operand}'
-            )
+        if self.divides and right == 0:
+            watcher = self.listener('zero_division')
+            if watcher is not None:
+                watcher.inform(
+                    'zero_division',
+                    location=f'{self}._evaluate',
+                    operation=f'{self.left_operand} / {self.right_operand}'
+                )
             result = float('inf')
 
         else:
-            self.propagate('operator_use', location=f'{self}._evaluate',
-                           operator=self.operator.figure,
-                           operation=f'{self.left_operand} '
-                                     f'{self.operator.figure} '
-                                     f'{self.right_operand}')
+            watcher = self.listener('operator_use')
+            if watcher is not None:
+                watcher.inform('operator_use', location=f'{self}._evaluate',
+                               operator=self.operator.figure,
+                               operation=f'{self.left_operand} '
+                                         f'{self.operator.figure} '
+                                         f'{self.right_operand}')
 
             if (isinstance(left, (int, float)) and isinstance(right,
                                                               (int, float))) \
                     or (type(left) == str and type(right) == str):
-                result = self.operator.callable(left, right)
+                result = self.function(left, right)
 
             else:
                 raise CustomSemanticError(
@@ -80,27 +102,53 @@ class LogicalNode(BinaryNode):
     Аналогично бинарным, но возвращает 0 и 1.
     """
 
-    def eval(self, namespace: NamespaceWrapper, stack: StackWrapper,
-             depth: int = 0) -> None:
+    def __init__(self, left_operand: Union[BaseNode, BaseBinaryNode],
+                 operator: BinaryToken,
+                 right_operand: Union[BaseNode, BaseBinaryNode]) -> None:
+        """Инициализировать экземпляр.
+        """
+        super().__init__(left_operand, operator, right_operand)
+        # для И и ИЛИ - значение левого операнда, при котором правый
+        # не вычисляется, для остальных операторов None
+        self.stop_on = {AndToken: False, OrToken: True}.get(type(operator))
+
+    def walk(self, namespace: NamespaceWrapper, stack: StackWrapper,
+             depth: int = 0) -> StepResult:
         """Исполнить код в узле и всех потомках.
+
+        И и ИЛИ вычисляют правый операнд, только если результат
+        не известен по левому.
         """
-        self.left_operand.eval(namespace, stack, depth=depth + 1)
+        yield self.left_operand.walk(namespace, stack, depth=depth + 1)
         left = stack.pop(self)
 
-        self.right_operand.eval(namespace, stack, depth=depth + 1)
-        right = stack.pop(self)
+        stop_on = self.stop_on
+        if stop_on is None:
+            decided = False
+        else:
+            left = bool(left)
+            decided = left is stop_on
 
-        self.propagate('operator_use', location=f'{self}._evaluate',
-                       operator=self.operator.figure,
-                       operation=f'{self.left_operand} '
-                                 f'{self.operator.figure} '
-                                 f'{self.right_operand}')
+        if decided:
+            right = None
+        else:
+            yield self.right_operand.walk(namespace, stack, depth=depth + 1)
+            right = stack.pop(self)
 
-        if type(self.operator) in (AndToken, OrToken):
-            left = bool(left)
-            right = bool(right)
+        watcher = self.listener('operator_use')
+        if watcher is not None:
+            watcher.inform('operator_use', location=f'{self}._evaluate',
+                           operator=self.operator.figure,
+                           operation=f'{self.left_operand} '
+                                     f'{self.operator.figure} '
+                                     f'{self.right_operand}')
 
-        result = int(self.operator.callable(left, right))
+        if decided:
+            result = int(left)
+        else:
+            if stop_on is not None:
+                right = bool(right)
+            result = int(self.function(left, right))
 
         stack.append(self, result)
 
@@ -109,30 +157,34 @@ class ConditionNode(BaseNode, AsIsMixin):
     """Условие.
     """
 
-    def eval(self, namespace: NamespaceWrapper, stack: StackWrapper,
-             depth: int = 0) -> None:
+    def walk(self, namespace: NamespaceWrapper, stack: StackWrapper,
+             depth: int = 0) -> StepResult:
         """Проверить условие.
         """
-        self.sub_nodes = cast(List[BaseCondition], self.sub_nodes)
-        if_node = self.sub_nodes[0]
+        sub_nodes = cast(List[BaseCondition], self.sub_nodes)
+        if_node = sub_nodes[0]
 
-        if if_node.bool(namespace, stack, depth=depth + 1):
-            if_node.sub_scope.eval(namespace, stack, depth=depth + 1)
+        if (yield if_node.bool(namespace, stack, depth=depth + 1)):
+            yield if_node.sub_scope.walk(namespace, stack, depth=depth + 1)
             return
 
-        for child in self.sub_nodes[1:]:
+        for child in sub_nodes[1:]:
             if type(child) == ElifNode:
 
-                if child.bool(namespace, stack, depth=depth + 1):
-                    child.sub_scope.eval(namespace, stack, depth=depth + 1)
+                if (yield child.bool(namespace, stack, depth=depth + 1)):
+                    yield child.sub_scope.walk(namespace, stack,
+                                               depth=depth + 1)
                     return
             else:
-                child.sub_scope.eval(namespace, stack, depth=depth + 1)
+                yield child.sub_scope.walk(namespace, stack, depth=depth + 1)
                 return
 
 
 class VarNode(BaseNode):
     """Узел для объектов, которые могут быть вызваны на месте операторов.
+
+    Литерал раскодируется при создании узла и при смене знака,
+    а не при каждом исполнении.
     """
 
     def __init__(self, value: BaseToken) -> None:
@@ -142,6 +194,31 @@ class VarNode(BaseNode):
         self.value = value
         self.prefix = ''
 
+    @property
+    def prefix(self) -> str:
+        """Знак перед литералом.
+        """
+        return self._prefix
+
+    @prefix.setter
+    def prefix(self, new_prefix: str) -> None:
+        """Установить знак и заново раскодировать литерал.
+        """
+        self._prefix = new_prefix
+        self.decoded = self.decode()
+
+    def decode(self) -> Any:
+        """Значение литерала или UNDECODED, если это не литерал.
+        """
+        if type(self.value) in (IntegerToken, FloatToken):
+            return math_round(float(self.prefix + self.value.source_code),
+                              DEFAULT_PRECISION)
+
+        if type(self.value) == StringToken:
+            return self.value.source_code.lstrip('"' + "'").rstrip("'" + '"')
+
+        return UNDECODED
+
     def __repr__(self):
         """Вернуть текстовое представление.
         """
@@ -157,41 +234,41 @@ class VarNode(BaseNode):
         """
         return f'{self.prefix}{self.value}'
 
-    def eval(self, namespace: NamespaceWrapper, stack: StackWrapper,
-             depth: int = 0) -> None:
+    def walk(self, namespace: NamespaceWrapper, stack: StackWrapper,
+             depth: int = 0) -> StepResult:
         """Исполнить код в узле и всех потомках.
         """
-        if type(self.value) in (IntegerToken, FloatToken):
-            new_value = math_round(float(self.prefix + self.value.source_code),
-                                   DEFAULT_PRECISION)
-
-        elif type(self.value) == StringToken:
-            new_value = self.value.source_code.lstrip('"' + "'").rstrip(
-                "'" + '"')
+        value = self.decoded
 
-        else:
+        if value is UNDECODED:
             raise CustomSemanticError(
                 f'Неизвестный тип переменной: {self.value}, {type(self.value)}'
             )
 
-        stack.append(self, new_value)
+        stack.append(self, value)
 
 
 class NameNode(VarNode):
     """Ссылка на имя.
     """
 
+    def __init__(self, value: BaseToken) -> None:
+        """Инициализировать экземпляр.
+        """
+        super().__init__(value)
+        self.name = value.source_code
+
     @property
     def short_name(self) -> str:
         """Короткое название (для целей распечатки).
         """
         return f'Имя({self.value.source_code})'
 
-    def eval(self, namespace: NamespaceWrapper, stack: StackWrapper,
-             depth: int = 0) -> None:
+    def walk(self, namespace: NamespaceWrapper, stack: StackWrapper,
+             depth: int = 0) -> StepResult:
         """Исполнить код в узле и всех потомках.
         """
-        name = self.value.source_code
+        name = self.name
         variable = namespace.get(self, name)
 
         if variable is None:
@@ -204,6 +281,39 @@ class NameNode(VarNode):
         stack.append(self, variable)
 
 
+class ConstantNode(VarNode):
+    """Значение, вычисленное заранее (см. parser.optimizer).
+
+    Заменяет постоянное поддерево original. Токен - самый левый токен
+    этого поддерева, по нему определяется место в исходном тексте.
+    """
+
+    def __init__(self, constant: Any, original: BaseNode,
+                 value: BaseToken) -> None:
+        """Инициализировать экземпляр.
+        """
+        super().__init__(value)
+        self.constant = constant
+        self.original = original
+
+    def __repr__(self):
+        """Вернуть текстовое представление.
+        """
+        return type(self).__name__ + f' (value={self.constant!r})'
+
+    @property
+    def short_name(self) -> str:
+        """Короткое название (для целей распечатки).
+        """
+        return f'Константа({self.constant!r})'
+
+    def walk(self, namespace: NamespaceWrapper, stack: StackWrapper,
+             depth: int = 0) -> StepResult:
+        """Исполнить код в узле и всех потомках.
+        """
+        stack.append(self, self.constant)
+
+
 class UnaryMinusNode(BaseNode, AsIsMixin):
     """Унарный минус.
     """
@@ -233,11 +343,11 @@ class UnaryNotNode(BaseNode):
         """
         return super().__repr__() + f' (Not)'
 
-    def eval(self, namespace: NamespaceWrapper, stack: StackWrapper,
-             depth: int = 0) -> None:
+    def walk(self, namespace: NamespaceWrapper, stack: StackWrapper,
+             depth: int = 0) -> StepResult:
         """Исполнить код в узле и всех потомках.
         """
-        self.sub_nodes[0].eval(namespace, stack, depth=depth + 1)
+        yield self.sub_nodes[0].walk(namespace, stack, depth=depth + 1)
         value = stack.pop(self)
         result = int(not value)
         stack.append(self, result)
@@ -253,6 +363,8 @@ class AssigmentNode(BinaryNode):
         """
         operator = cast(BinaryToken, operator)
         super().__init__(left_operand, operator, right_operand)
+        self.target = left_operand.value.source_code \
+            if isinstance(left_operand, VarNode) else None
 
     @property
     def left_operand(self) -> VarNode:
@@ -260,13 +372,16 @@ class AssigmentNode(BinaryNode):
         """
         return cast(VarNode, self.sub_nodes[0])
 
-    def eval(self, namespace: NamespaceWrapper, stack: StackWrapper,
-             depth: int = 0) -> None:
+    def walk(self, namespace: NamespaceWrapper, stack: StackWrapper,
+             depth: int = 0) -> StepResult:
         """Исполнить код в узле и всех потомках.
         """
-        name = self.left_operand.value.source_code
+        name = self.target
+        if name is None:
+            # слева не имя: ошибка та же, что и без предварительного разбора
+            name = self.left_operand.value.source_code
 
-        self.right_operand.eval(namespace, stack, depth=depth + 1)
+        yield self.right_operand.walk(namespace, stack, depth=depth + 1)
         value = stack.pop(self)
 
         existing = namespace.get(self, name)
@@ -297,20 +412,34 @@ class CallNode(BaseNode):
         """Инициализировать экземпляр.
         """
         self.name = name
+        self.function_name = name.value.source_code
+        self.lazy_name = self.function_name in LAZY_FUNCTIONS
         super().__init__(name, *args)
 
-    def eval(self, namespace: NamespaceWrapper, stack: StackWrapper,
-             depth: int = 0) -> None:
+    def walk(self, namespace: NamespaceWrapper, stack: StackWrapper,
+             depth: int = 0) -> StepResult:
         """Исполнить код в узле и всех потомках.
         """
-        name = self.name.value.source_code
+        name = self.function_name
+
+        # ленивую функцию нужно найти заранее, чтобы знать, когда остановиться
+        lazy_name = self.lazy_name
+        function: FuncWrapper = namespace.get(self, name) if lazy_name \
+            else None
+        lazy = getattr(function, 'lazy', None)
+        decided = False
 
         operands = []
         for child in self.sub_nodes[1:]:  # первый потомок это имя
-            child.eval(namespace, stack, depth=depth + 1)
+            yield child.walk(namespace, stack, depth=depth + 1)
             operands.append(stack.pop(self))
 
-        function: FuncWrapper = namespace.get(self, name)
+            if lazy is not None and bool(operands[-1]) is lazy[0]:
+                decided = True
+                break
+
+        if not lazy_name:
+            function = namespace.get(self, name)
 
         if function is None:
             raise CustomSemanticError(
@@ -320,8 +449,10 @@ class CallNode(BaseNode):
             raise CustomSemanticError(
                 f'Объект с названием "{name}" не является вызываемым.')
 
-        self.propagate('call', name=name, location=f'{self}._evaluate',
-                       operand=[str(x) for x in operands])
+        watcher = self.listener('call')
+        if watcher is not None:
+            watcher.inform('call', name=name, location=f'{self}._evaluate',
+                           operand=[str(x) for x in operands])
 
-        result = function(*operands)
+        result = lazy[1] if decided else function(*operands)
         stack.append(self, result)
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+
+"""Оптимизация синтаксического дерева после разбора.
+
+Свёртка констант: постоянные поддеревья (2 * 3.5, ИСТИНА И ЛОЖЬ,
+ABS(-6)) вычисляются один раз обходом дерева, с тем же округлением,
+что и при исполнении, и заменяются на ConstantNode.
+
+Удаление недостижимых веток: ветки условий с постоянно ложным
+условием выбрасываются, ветка с постоянно истинным условием становится
+последней, а если она первая - условие заменяется её содержимым.
+
+Постоянными считаются литералы, имена из DEFAULT_NAMES и вызовы
+стандартных функций, кроме IMPURE_FUNCTIONS, если скрипт эти имена
+не переприсваивает. Считается, что стандартные имена в пространстве
+имён не подменены: с подменёнными функциями оптимизацию не включают.
+Свёрнутые узлы не отправляют событий наблюдателю.
+"""
+import math
+from typing import FrozenSet, List, Optional, Set
+
+from exceltranslator.defined_names import (
+    DEFAULT_FUNCTIONS,
+    DEFAULT_NAMES,
+    IMPURE_FUNCTIONS,
+    get_default_layer,
+)
+from exceltranslator.helpers.namespace_wrapper import NamespaceWrapper
+from exceltranslator.lexer.base_tokens import BaseToken
+from exceltranslator.parser.base_nodes import *
+from exceltranslator.parser.nodes import *
+
+__all__ = [
+    'optimize',
+    'fold_constants',
+    'prune_branches',
+    'PURE_FUNCTIONS',
+]
+
+PURE_FUNCTIONS = frozenset(DEFAULT_FUNCTIONS) - IMPURE_FUNCTIONS
+
+# узлы, которые сами по себе ничего не вычисляют:
+# сворачивать поддерево только из них и литералов бессмысленно
+_WRAPPERS = (ParNode, UnaryMinusNode)
+
+# значения, которые можно подставить в любой способ исполнения
+_CONSTANT_TYPES = (bool, int, float, str)
+
+
+def optimize(root: BaseNode) -> BaseNode:
+    """Свернуть константы и удалить недостижимые ветки.
+
+    Дерево изменяется на месте.
+    """
+    fold_constants(root)
+    prune_branches(root)
+    return root
+
+
+# Свёртка констант -------------------------
+
+
+def fold_constants(root: BaseNode) -> BaseNode:
+    """Заменить постоянные поддеревья на ConstantNode.
+
+    Дерево изменяется на месте. Выражения, которые при вычислении
+    выдают ошибку или не конечное число, остаются как есть, чтобы
+    ошибка (или её отсутствие в неисполняемой ветке) была такой же,
+    как без оптимизации.
+    """
+    writes = _written_names(root)
+    constant = _constant_nodes(root, writes)
+    names = get_default_layer()
+
+    pending = [root]
+    while pending:
+        node = pending.pop()
+
+        children = node.sub_nodes
+        if isinstance(node, (AssigmentNode, CallNode)):
+            # имя слева от присваивания и имя функции не вычисляются
+            children = children[1:]
+
+        for child in list(children):
+            if id(child) in constant and _worth_folding(child):
+                folded = _fold(child, names)
+                if folded is not None:
+                    _replace(child, folded)
+                    continue
+            pending.append(child)
+
+    return root
+
+
+def _written_names(root: BaseNode) -> FrozenSet[str]:
+    """Имена, которым скрипт присваивает значения.
+    """
+    return frozenset(
+        node.left_operand.value.source_code
+        for node, _ in root.iter_recursively()
+        if isinstance(node, AssigmentNode)
+        and isinstance(node.left_operand, VarNode)
+    )
+
+
+def _constant_nodes(root: BaseNode, writes: FrozenSet[str]) -> Set[int]:
+    """id всех узлов, значение которых известно без исполнения.
+    """
+    constant: Set[int] = set()
+
+    # в прямом обходе потомки идут после родителя,
+    # в обратном - родитель проверяется после всех потомков
+    for node, _ in reversed(list(root.iter_recursively())):
+        node_type = type(node)
+
+        if node_type in (VarNode, ConstantNode):
+            is_constant = True
+
+        elif node_type is NameNode:
+            name = node.value.source_code
+            is_constant = name in DEFAULT_NAMES and name not in writes
+
+        elif node_type is CallNode:
+            name = node.name.value.source_code
+            is_constant = name in PURE_FUNCTIONS and name not in writes \
+                and all(id(x) in constant for x in node.sub_nodes[1:])
+
+        elif node_type in (ParNode, UnaryMinusNode, UnaryNotNode,
+                           BinaryNode, LogicalNode):
+            is_constant = all(id(x) in constant for x in node.sub_nodes)
+
+        else:
+            is_constant = False
+
+        if is_constant:
+            constant.add(id(node))
+
+    return constant
+
+
+def _worth_folding(node: BaseNode) -> bool:
+    """Стоит ли сворачивать постоянное поддерево.
+
+    Условия ветвлений сворачиваются всегда, чтобы по ним можно было
+    удалить ветки, остальное - только если в поддереве что-то вычисляется.
+    """
+    if isinstance(node.parent, BaseCondition) \
+            and node is node.parent.predicate:
+        return type(node) is not ConstantNode
+
+    while isinstance(node, _WRAPPERS) and len(node.sub_nodes) == 1:
+        node = node.sub_nodes[0]
+    return type(node) not in (VarNode, ConstantNode)
+
+
+def _fold(node: BaseNode, names: dict) -> Optional[ConstantNode]:
+    """Вычислить поддерево обходом и собрать из результата ConstantNode.
+    """
+    try:
+        value = node.evaluate(NamespaceWrapper(dict(names)))
+    except Exception:
+        return None
+
+    if type(value) not in _CONSTANT_TYPES:
+        return None
+
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+
+    return ConstantNode(value, node, _first_token(node))
+
+
+def _first_token(node: BaseNode) -> Optional[BaseToken]:
+    """Самый левый токен поддерева.
+    """
+    while not isinstance(node, VarNode):
+        node = node.sub_nodes[0]
+    return node.value
+
+
+def _replace(node: BaseNode, new_node: BaseNode) -> None:
+    """Поставить new_node на место node у его родителя.
+    """
+    parent = node.parent
+    position = parent.sub_nodes.index(node)
+    parent.sub_nodes[position] = new_node
+    new_node.parent = parent
+    new_node.number = node.number
+
+
+# Удаление недостижимых веток -------------------------
+
+
+def prune_branches(root: BaseNode) -> BaseNode:
+    """Удалить ветки условий, которые никогда не исполняются.
+
+    Учитываются только условия, уже свёрнутые в ConstantNode
+    (см. fold_constants). Дерево изменяется на месте. Если после
+    удаления в области видимости не осталось бы ни одной инструкции,
+    условие остаётся как есть: пустые фигурные скобки недопустимы.
+    """
+    conditions = [node for node, _ in root.iter_recursively()
+                  if isinstance(node, ConditionNode)]
+
+    # сначала вложенные, чтобы их содержимое уже было очищено
+    for condition in reversed(conditions):
+        if isinstance(condition.parent, InstructionNode):
+            _prune(condition)
+
+    return root
+
+
+def _prune(condition: ConditionNode) -> None:
+    """Удалить недостижимые ветки одного условия.
+    """
+    branches: List[tuple] = []  # (условие или None, область видимости)
+    changed = False
+
+    for child in condition.sub_nodes:
+        predicate = child.predicate
+
+        if isinstance(predicate, ConstantNode):
+            changed = True
+            if not predicate.constant:
+                continue
+            predicate = None
+
+        branches.append((predicate, child.sub_scope))
+        if predicate is None:
+            break
+
+    if not changed:
+        return
+
+    parent = condition.parent
+    position = parent.sub_nodes.index(condition)
+
+    if not branches:
+        if len(parent.sub_nodes) > 1:
+            _set_children(parent, parent.sub_nodes[:position]
+                          + parent.sub_nodes[position + 1:])
+        return
+
+    first_predicate, first_scope = branches[0]
+    if first_predicate is None:
+        _set_children(parent, parent.sub_nodes[:position]
+                      + first_scope.sub_nodes[0].sub_nodes
+                      + parent.sub_nodes[position + 1:])
+        return
+
+    children = [IfNode(first_predicate, first_scope)]
+    for predicate, scope in branches[1:]:
+        if predicate is None:
+            children.append(ElseNode(scope))
+        else:
+            children.append(ElifNode(predicate, scope))
+    _set_children(condition, children)
+
+
+def _set_children(node: BaseNode, children: List[BaseNode]) -> None:
+    """Заменить всех потомков узла.
+    """
+    node.sub_nodes = []
+    node.add_nodes(*children)
@@ -2,14 +2,35 @@
 
 """Парсер синтаксического дерева.
 """
-from typing import Type, List
+from typing import Type, List, Dict, Callable
 
 from exceltranslator.exceptions import CustomSyntaxError
-from exceltranslator.lexer.base_tokens import LiteralToken, NumberToken
+from exceltranslator.lexer.base_tokens import (
+    BaseToken, LiteralToken, NumberToken,
+)
 from exceltranslator.lexer.lexer import Lexer
 from exceltranslator.lexer.tokens import *
 from exceltranslator.parser.base_nodes import *
 from exceltranslator.parser.nodes import *
+from exceltranslator.utils import trampoline
+
+# узлы, которые создают бинарные операторы
+INFIX_NODES: Dict[Type[BaseToken], Type[BaseBinaryNode]] = {
+    Assignment: AssigmentNode,
+    AndToken: LogicalNode,
+    OrToken: LogicalNode,
+    EqualToken: LogicalNode,
+    NotEqualToken: LogicalNode,
+    GT: LogicalNode,
+    LT: LogicalNode,
+    LE: LogicalNode,
+    GE: LogicalNode,
+    Plus: BinaryNode,
+    Minus: BinaryNode,
+    Multiply: BinaryNode,
+    Divide: BinaryNode,
+    PowerToken: BinaryNode,
+}
 
 
 class Parser:
@@ -20,11 +41,25 @@ class Parser:
         """Инициализировать экземпляр.
         """
         self.lexer = lexer
+        self.prefix_handlers: Dict[Type[BaseToken], Callable] = {
+            token_type: self.literal_handler
+            for token_type in known_tokens
+            if issubclass(token_type, LiteralToken)
+        }
+        self.prefix_handlers.update({
+            Semicolon: self.stop_handler,
+            RightPar: self.stop_handler,
+            LeftPar: self.par_handler,
+            Minus: self.minus_handler,
+            NameToken: self.name_handler,
+            NotToken: self.not_handler,
+            IfToken: self.if_token_handler,
+        })
 
     def parse(self):
         """Собрать синтаксическое дерево из кода.
         """
-        root = self.tier_8(depth=0)
+        root = trampoline(self.tier_8(depth=0))
         return root
 
     def tier_8(self, depth: int) -> BaseNode:
@@ -32,8 +67,8 @@ class Parser:
         """
         head = InstructionNode()
 
-        while self.lexer.tokens_left:
-            new_node = self.tier_7(depth=depth + 1)
+        while self.lexer.has_more():
+            new_node = yield self.tier_expression(depth=depth + 1)
 
             if type(new_node) != StopNode:
                 head.add_nodes(new_node)
@@ -43,140 +78,107 @@ class Parser:
 
         return head
 
-    def tier_7(self, depth: int) -> BaseNode:
-        """Приоритет 7. Присваивание.
-        """
-        head = self.tier_6(depth=depth + 1)
-
-        while self.lexer.next_in(Assignment) and not type(head) == StopNode:
-            head = AssigmentNode(left_operand=head,
-                                 operator=self.lexer.cut_next(),
-                                 right_operand=self.tier_6(depth=depth + 1))
-        return head
+    def tier_expression(self, depth: int, min_power: int = 1) -> BaseNode:
+        """Приоритеты 7-1. Выражения с бинарными операторами.
 
-    def tier_6(self, depth: int) -> BaseNode:
-        """Приоритет 6. Логические операции.
+        Разбор по силе связывания: оператор забирается в текущее
+        выражение, только если связывает не слабее min_power. Все
+        операторы левоассоциативны, поэтому правый операнд разбирается
+        с силой на единицу больше.
         """
-        head = self.tier_5(depth=depth + 1)
+        head = yield self.tier_0(depth=depth + 1)
 
-        while self.lexer.next_in(AndToken, OrToken) \
-                and not type(head) == StopNode:
-            head = LogicalNode(left_operand=head,
-                               operator=self.lexer.cut_next(),
-                               right_operand=self.tier_5(depth=depth + 1))
-        return head
-
-    def tier_5(self, depth: int) -> BaseNode:
-        """Приоритет 5. Равно и не равно.
-        """
-        head = self.tier_4(depth=depth + 1)
+        while type(head) != StopNode:
+            token_type = self.lexer.next_type()
+            power = getattr(token_type, 'binding_power', 0)
 
-        while self.lexer.next_in(EqualToken, NotEqualToken) \
-                and not type(head) == StopNode:
-            head = LogicalNode(left_operand=head,
-                               operator=self.lexer.cut_next(),
-                               right_operand=self.tier_4(depth=depth + 1))
-        return head
-
-    def tier_4(self, depth: int) -> BaseNode:
-        """Приоритет 4. Больше, меньше.
-        """
-        head = self.tier_3(depth=depth + 1)
-
-        while self.lexer.next_in(GT, LT, LE, GE) \
-                and not type(head) == StopNode:
-            head = LogicalNode(left_operand=head,
-                               operator=self.lexer.cut_next(),
-                               right_operand=self.tier_3(depth=depth + 1))
-        return head
-
-    def tier_3(self, depth: int) -> BaseNode:
-        """Приоритет 3. Сложение и вычитание.
-        """
-        head = self.tier_2(depth=depth + 1)
-
-        while self.lexer.next_in(Plus, Minus) and not type(head) == StopNode:
-            head = BinaryNode(left_operand=head,
-                              operator=self.lexer.cut_next(),
-                              right_operand=self.tier_2(depth=depth + 1))
-        return head
-
-    def tier_2(self, depth: int) -> BaseNode:
-        """Приоритет 2. Умножение и деление.
-        """
-        head = self.tier_1(depth=depth + 1)
-
-        while self.lexer.next_in(Multiply, Divide) \
-                and not type(head) == StopNode:
-            head = BinaryNode(left_operand=head,
-                              operator=self.lexer.cut_next(),
-                              right_operand=self.tier_1(depth=depth + 1))
-        return head
-
-    def tier_1(self, depth: int) -> BaseNode:
-        """Приоритет 1. Возведение в степень.
-        """
-        head = self.tier_0(depth=depth + 1)
+            if not power or power < min_power:
+                break
 
-        while self.lexer.next_in(PowerToken) and not type(head) == StopNode:
-            head = BinaryNode(left_operand=head,
-                              operator=self.lexer.cut_next(),
-                              right_operand=self.tier_0(depth=depth + 1))
+            operator = self.lexer.cut_next()
+            right_operand = yield self.tier_expression(depth=depth + 1,
+                                                       min_power=power + 1)
+            head = INFIX_NODES[token_type](left_operand=head,
+                                           operator=operator,
+                                           right_operand=right_operand)
         return head
 
     def tier_0(self, depth: int) -> BaseNode:
         """Приоритет 0. Унарный минус и скобки.
         """
         current = self.lexer.cut_next()
+        handler = self.prefix_handlers.get(type(current))
 
-        if type(current) == Semicolon:
-            return StopNode()
-
-        if isinstance(current, LiteralToken):
-            new_node = VarNode(value=current)
-
-        elif type(current) == LeftPar:
-            new_node = ParNode(self.tier_7(depth=depth + 1))
-            self.lexer.dispose_next(RightPar)
-
-        elif type(current) == Minus \
-                and isinstance(self.lexer.show_next(), NumberToken):
-            value = VarNode(value=self.lexer.cut_next())
-            new_node = UnaryMinusNode(value)
+        if handler is None:
+            raise CustomSyntaxError(
+                f'Не удалось обработать токен: {current}, {type(current)}'
+                + self.lexer.locate(current)
+            )
 
-        elif type(current) == NameToken:
-            new_node = NameNode(value=current)
-            if self.lexer.next_in(LeftPar):
-                new_node = self.call_handler(new_node, depth=depth + 1)
+        return (yield handler(current, depth))
 
-        elif type(current) == NotToken:
-            new_node = UnaryNotNode(self.tier_1(depth=depth + 1))
+    def stop_handler(self, current: BaseToken, depth: int) -> BaseNode:
+        """Конец инструкции или закрывающая скобка.
+        """
+        return StopNode()
 
-        elif type(current) == IfToken:
-            new_node = self.if_handler(depth=depth + 1)
+    def literal_handler(self, current: BaseToken, depth: int) -> BaseNode:
+        """Фактическое значение.
+        """
+        return VarNode(value=current)
 
-        elif type(current) == RightPar:
-            new_node = StopNode()
+    def par_handler(self, current: BaseToken, depth: int) -> BaseNode:
+        """Выражение в круглых скобках.
+        """
+        new_node = ParNode((yield self.tier_expression(depth=depth + 1)))
+        self.lexer.dispose_next(RightPar)
+        return new_node
 
-        else:
+    def minus_handler(self, current: BaseToken, depth: int) -> BaseNode:
+        """Унарный минус (допустим только перед числом).
+        """
+        if not isinstance(self.lexer.show_next(), NumberToken):
             raise CustomSyntaxError(
                 f'Не удалось обработать токен: {current}, {type(current)}'
+                + self.lexer.locate(current)
             )
 
+        value = VarNode(value=self.lexer.cut_next())
+        return UnaryMinusNode(value)
+
+    def name_handler(self, current: BaseToken, depth: int) -> BaseNode:
+        """Имя переменной или вызов функции.
+        """
+        new_node = NameNode(value=current)
+        if self.lexer.next_in(LeftPar):
+            new_node = yield self.call_handler(new_node, depth=depth + 1)
         return new_node
 
+    def not_handler(self, current: BaseToken, depth: int) -> BaseNode:
+        """Логическое отрицание.
+        """
+        operand = yield self.tier_expression(
+            depth=depth + 1, min_power=PowerToken.binding_power
+        )
+        return UnaryNotNode(operand)
+
+    def if_token_handler(self, current: BaseToken, depth: int) -> BaseNode:
+        """Начало условия.
+        """
+        return (yield self.if_handler(depth=depth + 1))
+
     def call_handler(self, name: NameNode, depth: int) -> BaseNode:
         """Функция для обработки аргументов вызова.
         """
         new_node = CallNode(name)
 
         pars = 0
-        while self.lexer.tokens_left:
+        while self.lexer.has_more():
             if self.lexer.next_in(LeftPar):
                 self.lexer.dispose_next(LeftPar)
                 pars += 1
 
-            new_argument = self.tier_7(depth=depth + 1)
+            new_argument = yield self.tier_expression(depth=depth + 1)
 
             if type(new_argument) == StopNode:
                 break
@@ -203,24 +205,26 @@ class Parser:
         cond_if = IfNode()
         node.add_nodes(cond_if)
 
-        self.cut_and_append(cond_if, depth, dispose_types=[LeftPar,
-                                                           RightPar])
-        self.cut_and_append(cond_if, depth, node_type=ScopeNode)
+        yield self.cut_and_append(cond_if, depth,
+                                  dispose_types=[LeftPar, RightPar])
+        yield self.cut_and_append(cond_if, depth, node_type=ScopeNode)
 
         while self.lexer.next_in(ElifToken):
             self.lexer.dispose_next(ElifToken)
             cond_elif = ElifNode()
 
-            self.cut_and_append(cond_elif, depth, dispose_types=[LeftPar,
-                                                                 RightPar])
-            self.cut_and_append(cond_elif, depth, node_type=ScopeNode)
+            yield self.cut_and_append(cond_elif, depth,
+                                      dispose_types=[LeftPar, RightPar])
+            yield self.cut_and_append(cond_elif, depth,
+                                      node_type=ScopeNode)
             node.add_nodes(cond_elif)
 
         if self.lexer.next_in(ElseToken):
             self.lexer.dispose_next(ElseToken)
             cond_else = ElseNode()
 
-            self.cut_and_append(cond_else, depth, node_type=ScopeNode)
+            yield self.cut_and_append(cond_else, depth,
+                                      node_type=ScopeNode)
             node.add_nodes(cond_else)
 
         return node
@@ -236,9 +240,9 @@ class Parser:
         self.lexer.dispose_next(dispose_types.pop(0))
 
         if node_type is None:
-            child = self.tier_7(depth=depth + 1)
+            child = yield self.tier_expression(depth=depth + 1)
         else:
-            child = node_type(self.tier_8(depth=depth + 1))
+            child = node_type((yield self.tier_8(depth=depth + 1)))
 
         head.add_nodes(child)
 
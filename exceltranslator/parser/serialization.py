@@ -99,6 +99,13 @@ def _serialize_to_text_variable(node: VarNode, prefix: str = '') -> str:
     return prefix + text
 
 
+@_serialize_to_text.register
+def _serialize_to_text_constant(node: ConstantNode, prefix: str = '') -> str:
+    """Вычисленное заранее значение, в тексте остаётся исходное выражение.
+    """
+    return prefix + _serialize_to_text(node.original)
+
+
 @_serialize_to_text.register
 def _serialize_to_text_unary_minus(node: UnaryMinusNode,
                                    prefix: str = '') -> str:
@@ -237,6 +244,14 @@ def _serialize_to_python_variable(node: VarNode, prefix: str = '') -> str:
     return prefix + text
 
 
+@_serialize_to_python.register
+def _serialize_to_python_constant(node: ConstantNode,
+                                  prefix: str = '') -> str:
+    """Вычисленное заранее значение.
+    """
+    return prefix + repr(node.constant)
+
+
 @_serialize_to_python.register
 def _serialize_to_python_unary_minus(node: UnaryMinusNode,
                                      prefix: str = '') -> str:
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+"""Скомпилированная программа.
+
+Разбор кода выполняется один раз, после чего программу можно
+исполнять сколько угодно раз, в том числе из разных потоков.
+"""
+from typing import (
+    Any, Iterable, List, FrozenSet, Optional, Union, Tuple, Callable, Dict,
+)
+
+from exceltranslator.cache import ProgramCache, default_cache
+from exceltranslator.compiler.bytecode import compile_bytecode
+from exceltranslator.compiler.closures import compile_closures
+from exceltranslator.exceptions import CustomCompilationError
+from exceltranslator.helpers.namespace_wrapper import (
+    NamespaceWrapper,
+    Namespace,
+)
+from exceltranslator.lexer.lexer import Lexer
+from exceltranslator.parser.base_nodes import BaseNode
+from exceltranslator.parser import optimizer
+from exceltranslator.parser.nodes import AssigmentNode, CallNode, NameNode
+from exceltranslator.parser.parser import Parser
+
+__all__ = [
+    'Program',
+    'compile',
+    'parse',
+    'ENGINES',
+    'DEFAULT_ENGINE',
+]
+
+# исполнитель: функция от пространства имён, возвращающая результат
+Runner = Callable[[NamespaceWrapper], Any]
+
+
+def parse(source: str, optimize: bool = False) -> BaseNode:
+    """Разобрать код в синтаксическое дерево.
+
+    С optimize дерево проходит parser.optimizer: константы
+    сворачиваются, недостижимые ветки условий удаляются.
+    """
+    lexer = Lexer()
+    parser = Parser(lexer)
+    lexer.analyze(source)
+    root = parser.parse()
+
+    if optimize:
+        root = optimizer.optimize(root)
+    return root
+
+
+def interpret(root: BaseNode, source: str = '') -> Runner:
+    """Исполнение обходом синтаксического дерева.
+
+    Исходный текст не используется.
+    """
+    return root.evaluate
+
+
+# способы исполнения: название -> функция, готовящая исполнителя
+# по дереву и исходному тексту
+ENGINES: Dict[str, Callable[[BaseNode, str], Runner]] = {
+    'tree': interpret,
+    'closures': compile_closures,
+    'bytecode': compile_bytecode,
+}
+DEFAULT_ENGINE = 'tree'
+
+
+class Program:
+    """Скомпилированная программа.
+
+    Неизменяема: дерево и сведения о нём заполняются при создании,
+    а каждое исполнение работает со своим стеком и пространством имён.
+
+    Если дерево нельзя перевести в выбранный способ исполнения,
+    программа исполняется обходом дерева (engine будет 'tree').
+    """
+    __slots__ = ('source', 'root', 'reads', 'writes', 'calls',
+                 'engine', '_runner')
+
+    def __init__(self, source: str, root: BaseNode,
+                 engine: str = DEFAULT_ENGINE) -> None:
+        """Инициализировать экземпляр.
+        """
+        reads, writes, calls = self.inspect(root)
+
+        try:
+            runner = ENGINES[engine](root, source)
+        except CustomCompilationError:
+            engine = 'tree'
+            runner = interpret(root, source)
+
+        set_attribute = super().__setattr__
+        set_attribute('source', source)
+        set_attribute('root', root)
+        set_attribute('reads', reads)
+        set_attribute('writes', writes)
+        set_attribute('calls', calls)
+        set_attribute('engine', engine)
+        set_attribute('_runner', runner)
+
+    def __reduce__(self) -> tuple:
+        """Сохранять только исходные данные, исполнитель собирается заново.
+        """
+        return type(self), (self.source, self.root, self.engine)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        """Запретить изменение атрибутов.
+        """
+        raise AttributeError(f'{type(self).__name__} нельзя изменять')
+
+    def __delattr__(self, key: str) -> None:
+        """Запретить удаление атрибутов.
+        """
+        raise AttributeError(f'{type(self).__name__} нельзя изменять')
+
+    def __repr__(self) -> str:
+        """Вернуть текстовое представление.
+        """
+        source = self.source if len(self.source) <= 30 \
+            else self.source[:27] + '...'
+        return type(self).__name__ + f'({source!r})'
+
+    @staticmethod
+    def inspect(root: BaseNode) \
+            -> Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]:
+        """Собрать имена читаемых и записываемых переменных и функций.
+        """
+        reads = set()
+        writes = set()
+        calls = set()
+        skip = set()
+
+        for node, _ in root.iter_recursively():
+            if isinstance(node, AssigmentNode) \
+                    and isinstance(node.left_operand, NameNode):
+                writes.add(node.left_operand.value.source_code)
+                skip.add(id(node.left_operand))
+
+            elif isinstance(node, CallNode):
+                calls.add(node.name.value.source_code)
+                skip.add(id(node.name))
+
+            elif isinstance(node, NameNode) and id(node) not in skip:
+                reads.add(node.value.source_code)
+
+        return frozenset(reads), frozenset(writes), frozenset(calls)
+
+    def run(self, namespace: Union[NamespaceWrapper, dict, None] = None) \
+            -> Any:
+        """Исполнить программу и вернуть результат.
+
+        Словарь превращается в пространство имён со стандартными функциями.
+        """
+        if namespace is None:
+            namespace = Namespace()
+        elif isinstance(namespace, dict):
+            namespace = Namespace(namespace)
+        return self._runner(namespace)
+
+    def run_many(self,
+                 namespaces: Iterable[Union[NamespaceWrapper, dict, None]]) \
+            -> List[Any]:
+        """Исполнить программу для каждого пространства имён.
+        """
+        return [self.run(namespace) for namespace in namespaces]
+
+
+def compile(source: str,
+            cache: Optional[ProgramCache] = default_cache,
+            engine: str = DEFAULT_ENGINE,
+            optimize: bool = False) -> Program:
+    """Скомпилировать код в программу.
+
+    Готовая программа берётся из кэша, если он передан.
+    С optimize дерево оптимизируется (см. parse).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f'Неизвестный способ исполнения: {engine!r}, '
+                         f'доступны: {", ".join(ENGINES)}')
+
+    def factory(text: str) -> Program:
+        """Собрать программу с нуля.
+        """
+        return Program(text, parse(text, optimize), engine)
+
+    if cache is None:
+        return factory(source)
+
+    variant = f'{engine}|optimized' if optimize else engine
+    return cache.get_or_compile(source, factory, variant=variant)
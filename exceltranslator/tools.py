@@ -3,33 +3,33 @@
 """Готовые инструменты.
 """
 import time
-from typing import Any
+from typing import Any, Optional
 
+from exceltranslator.cache import ProgramCache, default_cache
 from exceltranslator.helpers.namespace_wrapper import (
     NamespaceWrapper,
     Namespace,
 )
 from exceltranslator.helpers.node_creation_printer import NodeCreationPrinter
 from exceltranslator.helpers.node_tree_printer import NodeTreePrinter
+from exceltranslator.helpers.profiler import Profiler
 from exceltranslator.helpers.stack_wrapper import StackWrapper
 from exceltranslator.helpers.watcher import Watcher
 from exceltranslator.lexer.lexer import Lexer
 from exceltranslator.parser.parser import Parser
+from exceltranslator.program import compile
 
 
-def custom_eval(input_text: str, namespace: NamespaceWrapper = None) -> Any:
+def custom_eval(input_text: str, namespace: NamespaceWrapper = None,
+                cache: Optional[ProgramCache] = default_cache) -> Any:
     """Исполнить код и вернуть результат.
-    """
-    lexer = Lexer()
-    parser = Parser(lexer)
-    lexer.analyze(input_text)
-    root = parser.parse()
 
+    Разобранное дерево берётся из кэша, если он передан.
+    """
     if namespace is None:
         namespace = Namespace()
 
-    result = root.evaluate(namespace)
-    return result
+    return compile(input_text, cache).run(namespace)
 
 
 def verbose_eval(input_text: str, colored: bool = True,
@@ -48,7 +48,7 @@ def verbose_eval(input_text: str, colored: bool = True,
     report['lexical_analysis'] = time.perf_counter() - start
     # -----
 
-    watcher = Watcher()
+    watcher = Watcher(history_size=0)  # нужен только отчёт
     node_tree_printer = NodeTreePrinter(colored=colored)
     # -----
     start = time.perf_counter()
@@ -74,3 +74,22 @@ def verbose_eval(input_text: str, colored: bool = True,
     report['stats'] = watcher.make_report()
 
     return result, report
+
+
+def profile_eval(input_text: str, namespace: NamespaceWrapper = None,
+                 runs: int = 1, sample_every: int = 1):
+    """Исполнить код несколько раз под профилировщиком.
+
+    Дерево разбирается заново, чтобы не трогать общее из кэша.
+    Возвращает результат последнего исполнения и профилировщик
+    (profiler.top() - таблица самых горячих узлов).
+    """
+    root = compile(input_text, cache=None).root
+    profiler = Profiler(root, input_text, sample_every)
+
+    result = None
+    for _ in range(runs):
+        result = profiler.evaluate(
+            namespace if namespace is not None else Namespace())
+
+    return result, profiler
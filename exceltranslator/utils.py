@@ -5,6 +5,12 @@
 """
 import math
 from functools import cached_property
+from types import GeneratorType, MappingProxyType
+from typing import Any, Iterator, Mapping
+
+
+# ключа нет в словаре
+_ABSENT = object()
 
 
 def math_round(number: float, decimals: int = 0) -> float:
@@ -28,6 +34,48 @@ def math_round(number: float, decimals: int = 0) -> float:
     return math.ceil(exp) / 10 ** decimals
 
 
+def trampoline(step: Any) -> Any:
+    """Выполнить вложенные генераторы без рекурсии.
+
+    Генератор вместо рекурсивного вызова отдаёт через yield вложенный
+    генератор, а обратно получает результат его работы. Отданное готовое
+    значение (не генератор) возвращается сразу. Глубина вложенности
+    ограничена только памятью, а не стеком вызовов.
+    """
+    if not isinstance(step, GeneratorType):
+        return step
+
+    stack = [step]
+    value = None
+    error = None
+
+    while stack:
+        try:
+            if error is None:
+                step = stack[-1].send(value)
+            else:
+                step = stack[-1].throw(error)
+                error = None
+        except StopIteration as exc:
+            stack.pop()
+            value = exc.value
+            continue
+        except Exception as exc:
+            stack.pop()
+            if not stack:
+                raise
+            error = exc
+            continue
+
+        if isinstance(step, GeneratorType):
+            stack.append(step)
+            value = None
+        else:
+            value = step
+
+    return value
+
+
 class AsIsMixin:
     """Миксин для формирования коротких имён из докстригов.
     """
@@ -37,3 +85,101 @@ class AsIsMixin:
         """Динамически конструирует имя.
         """
         return self.__doc__.strip().rstrip('.')
+
+
+class LayeredDict(dict):
+    """Словарь поверх общего неизменяемого слоя base.
+
+    Сам словарь хранит только свои значения, а чего в нём нет, ищется
+    в base. Чтение, перебор и сравнение видят оба слоя, как ChainMap,
+    запись и удаление касаются только своих значений. Нижний слой
+    задаётся в наследнике, поэтому создание экземпляра не дороже,
+    чем создание обычного словаря.
+    """
+    __slots__ = ()
+
+    base: Mapping = MappingProxyType({})
+
+    def __missing__(self, key: Any) -> Any:
+        """Найти значение в нижнем слое.
+        """
+        return self.base[key]
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Получить значение по ключу из любого слоя.
+        """
+        value = dict.get(self, key, _ABSENT)
+        if value is _ABSENT:
+            return self.base.get(key, default)
+        return value
+
+    def __contains__(self, key: Any) -> bool:
+        """Есть ли ключ в любом слое.
+        """
+        return dict.__contains__(self, key) or key in self.base
+
+    def __iter__(self) -> Iterator:
+        """Перебрать ключи нижнего слоя, затем новые свои.
+        """
+        yield from self.base
+        for key in dict.__iter__(self):
+            if key not in self.base:
+                yield key
+
+    def __len__(self) -> int:
+        """Количество ключей в обоих слоях.
+        """
+        return len(self.base) + sum(1 for key in dict.__iter__(self)
+                                    if key not in self.base)
+
+    def keys(self):
+        """Ключи обоих слоёв.
+        """
+        return dict.fromkeys(self).keys()
+
+    def items(self):
+        """Пары ключ-значение обоих слоёв.
+        """
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        """Значения обоих слоёв.
+        """
+        return [self[key] for key in self]
+
+    def own(self) -> dict:
+        """Только свои значения, без нижнего слоя.
+        """
+        return dict(dict.items(self))
+
+    def copy(self) -> 'LayeredDict':
+        """Копия своих значений поверх того же нижнего слоя.
+        """
+        return type(self)(dict.items(self))
+
+    def __eq__(self, other: Any) -> bool:
+        """Сравнить с любым словарём по содержимому обоих слоёв.
+        """
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+
+    def __ne__(self, other: Any) -> bool:
+        """Обратное к __eq__.
+        """
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        """Вернуть текстовое представление.
+        """
+        return repr(dict(self.items()))
+
+    def __reduce__(self) -> tuple:
+        """Сохранять только свои значения.
+        """
+        return type(self), (self.own(),)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""Тесты кэша разобранных программ.
+"""
+from unittest import mock
+
+import pytest
+
+from exceltranslator import settings
+from exceltranslator.cache import ProgramCache, DiskCache, make_key
+from exceltranslator.helpers.namespace_wrapper import Namespace
+from exceltranslator.parser.serialization import serialize_to_text
+from exceltranslator.program import compile, parse
+from exceltranslator.tools import custom_eval
+
+
+@pytest.fixture()
+def cache():
+    return ProgramCache(max_entries=2)
+
+
+def test_cache_hit_skips_parsing(cache):
+    assert custom_eval('x * 3', Namespace({'x': 2}), cache=cache) == 6
+    assert 'x * 3' in cache
+
+    with mock.patch('exceltranslator.program.Lexer') as lexer:
+        assert custom_eval('x * 3', Namespace({'x': 3}), cache=cache) == 9
+        assert custom_eval('x * 3', Namespace({'x': 4}), cache=cache) == 12
+        assert not lexer.called
+
+    assert cache.stats() == {
+        'entries': 1,
+        'bytes': cache.bytes,
+        'hits': 2,
+        'misses': 1,
+        'evictions': 0,
+    }
+    assert cache.bytes > 0
+
+
+def test_cache_lru_eviction(cache):
+    for source in ['1', '2', '1', '3']:
+        cache.get_or_compile(source, parse)
+
+    assert '1' in cache
+    assert '2' not in cache
+    assert '3' in cache
+    assert cache.evictions == 1
+
+
+def test_cache_contains_variant(cache):
+    compile('1 + 2', cache=cache)
+    compile('1 + 2', cache=cache, engine='closures', optimize=True)
+    assert len(cache) == 2
+    assert '1 + 2' in cache
+    assert '1 + 3' not in cache
+    assert cache.contains('1 + 2', 'tree')
+    assert cache.contains('1 + 2', 'closures|optimized')
+    assert not cache.contains('1 + 2', 'closures')
+    assert not cache.contains('1 + 2')
+
+    cache.put('1 + 2', parse('1 + 2'), 'tree')
+    cache.max_entries = 1
+    cache.put('1 + 3', parse('1 + 3'))
+    assert '1 + 2' not in cache
+    assert '1 + 3' in cache
+
+    cache.clear()
+    assert '1 + 3' not in cache
+
+
+def test_cache_byte_limit():
+    cache = ProgramCache(max_bytes=1)
+    cache.get_or_compile('1 + 1', parse)
+    assert len(cache) == 0
+    assert cache.bytes == 0
+
+
+def test_cache_key_depends_on_settings():
+    key = make_key('1 / 3')
+    with mock.patch.object(settings, 'DEFAULT_PRECISION', 2):
+        assert make_key('1 / 3') != key
+    assert make_key('1 / 3') == key
+
+
+def test_disk_cache(tmp_path):
+    disk = DiskCache(tmp_path)
+    program = disk.get_or_compile('x + 1', parse)
+    assert disk.misses == 1
+    assert disk.path('x + 1').exists()
+
+    loaded = DiskCache(tmp_path).get('x + 1')
+    assert serialize_to_text(loaded) == serialize_to_text(program)
+    assert custom_eval('x + 1', Namespace({'x': 2}),
+                       cache=ProgramCache(disk=DiskCache(tmp_path))) == 3
+
+
+def test_disk_cache_invalidation(tmp_path):
+    DiskCache(tmp_path, fingerprint='old').put('1', parse('1'))
+    disk = DiskCache(tmp_path, fingerprint='new')
+    assert disk.get('1') is None
+    assert disk.prune() == 1
+    assert [x.name for x in tmp_path.iterdir()] == []
+
+
+def test_disk_cache_corrupted(tmp_path):
+    disk = DiskCache(tmp_path)
+    disk.put('1', parse('1'))
+    disk.path('1').write_bytes(b'garbage')
+    assert disk.get('1') is None
+    assert disk.errors == 1
+    assert not disk.path('1').exists()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""Тесты патологически глубокой вложенности.
+
+Глубина заметно превышает ограничение рекурсии интерпретатора.
+"""
+import sys
+
+import pytest
+
+from exceltranslator.helpers.namespace_wrapper import Namespace
+from exceltranslator.helpers.watcher import Watcher
+from exceltranslator.program import compile
+
+DEPTH = 20_000
+
+
+@pytest.fixture(autouse=True)
+def low_recursion_limit():
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(1000)
+    yield
+    sys.setrecursionlimit(limit)
+
+
+def run(source: str, namespace: dict = None):
+    return compile(source, cache=None).run(namespace or {})
+
+
+def test_deep_parenthesis():
+    assert run('(' * DEPTH + '7' + ')' * DEPTH) == 7
+
+
+def test_long_operator_chain():
+    depth = DEPTH // 4
+    assert run(' + '.join(['1'] * depth)) == depth
+
+
+def test_deep_right_operands():
+    depth = DEPTH // 4
+    source = '1 - (' * depth + '1' + ')' * depth
+    assert run(source) == 1
+
+
+def test_deep_calls():
+    source = 'ABS(' * (DEPTH // 4) + '-5' + ')' * (DEPTH // 4)
+    assert run(source) == 5
+
+
+def test_deep_not():
+    assert run('НЕ ' * DEPTH + '1') == 1
+
+
+def test_deep_conditions():
+    depth = DEPTH // 4
+    source = 'x = 0; ' + 'ЕСЛИ (1) {' * depth + 'x = 5;' \
+             + '};' * depth + ' x'
+    assert run(source) == 5
+
+
+def test_deep_tree_introspection():
+    source = '(' * DEPTH + 'a + b' + ')' * DEPTH
+    program = compile(source, cache=None)
+    assert program.reads == {'a', 'b'}
+    assert sum(1 for _ in program.root.iter_recursively()) == DEPTH + 4
+
+
+def test_deep_propagation():
+    watcher = Watcher()
+    program = compile('(' * DEPTH + 'x + 1' + ')' * DEPTH, cache=None)
+    program.root.watcher = watcher
+    try:
+        assert program.run(Namespace({'x': 3})) == 4
+    finally:
+        program.root.watcher = None
+
+    headers = [header for header, _ in watcher.history]
+    assert headers == ['operator_use']
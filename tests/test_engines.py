@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+"""Сверка способов исполнения с обходом дерева.
+"""
+import ast
+import inspect
+import traceback
+
+import pytest
+
+from exceltranslator import exceptions
+from exceltranslator.compiler.runtime import make_globals
+from exceltranslator.helpers.namespace_wrapper import Namespace
+from exceltranslator.helpers.watcher import Watcher
+from exceltranslator.parser.serialization import NAME_REPLACEMENTS
+from exceltranslator.program import ENGINES, compile
+from tests import test_basic, test_complex, test_logical, test_nesting
+from tests.test_basic import input_data_basic, input_data_division
+
+# модули, скрипты из тестов которых исполняются всеми движками;
+# test_nodes_granular собирает узлы вручную и скриптов не исполняет
+SOURCE_MODULES = (test_basic, test_complex, test_logical, test_nesting)
+# параметры тестов, в которых передаётся скрипт
+SCRIPT_ARGUMENTS = {'text_in', 'source', 'source_code'}
+# функции, первым аргументом которых передаётся скрипт
+SCRIPT_CALLS = {'custom_eval', 'compile'}
+# переменная, которой в теле теста присваивается скрипт
+SCRIPT_VARIABLE = 'source_code'
+
+
+def fixed_random() -> float:
+    """Замена СЛЧИС, чтобы все движки получали одно и то же число.
+    """
+    return 0.55
+
+
+def counter() -> int:
+    """Замена СЧЁТ из test_logical.
+    """
+    return 1
+
+
+# начальные значения для собранных скриптов: одни тесты исполняют
+# скрипт в пустом пространстве имён, другие задают x = 0
+INPUTS = [
+    {'СЛЧИС': fixed_random, 'СЧЁТ': counter},
+    {'СЛЧИС': fixed_random, 'СЧЁТ': counter, 'x': 0},
+]
+
+
+def harvest(*modules) -> list:
+    """Собрать скрипты существующих тестов.
+
+    Из pytest.mark.parametrize берутся значения параметров из
+    SCRIPT_ARGUMENTS, из тел тестов - строки, присвоенные SCRIPT_VARIABLE
+    или переданные первым аргументом в функции из SCRIPT_CALLS.
+    Скрипты из фикстур test_basic проверяются отдельно
+    (test_engine_matches_tree_on_fixtures).
+    """
+    output = []
+    for module in modules:
+        for name, test in vars(module).items():
+            if name.startswith('test_'):
+                output.extend(_parametrized(test))
+        output.extend(_literals(module))
+    return list(dict.fromkeys(output))
+
+
+def _parametrized(test) -> list:
+    """Скрипты из параметров теста.
+    """
+    output = []
+    for mark in getattr(test, 'pytestmark', ()):
+        if mark.name != 'parametrize':
+            continue
+
+        names = [x.strip() for x in mark.args[0].split(',')]
+        for index, name in enumerate(names):
+            if name not in SCRIPT_ARGUMENTS:
+                continue
+            for parameters in mark.args[1]:
+                output.append(parameters[index] if len(names) > 1
+                              else parameters)
+    return output
+
+
+def _literals(module) -> list:
+    """Скрипты, записанные строками в телах тестов.
+    """
+    output = []
+    for node in ast.walk(ast.parse(inspect.getsource(module))):
+        if isinstance(node, ast.Assign):
+            targets = [x.id for x in node.targets if isinstance(x, ast.Name)]
+            if SCRIPT_VARIABLE in targets:
+                output.append(node.value)
+
+        elif isinstance(node, ast.Call) and node.args:
+            function = getattr(node.func, 'id', None) \
+                       or getattr(node.func, 'attr', None)
+            if function in SCRIPT_CALLS:
+                output.append(node.args[0])
+
+    return [x.value for x in output
+            if isinstance(x, ast.Constant) and isinstance(x.value, str)]
+
+
+SCRIPTS = harvest(*SOURCE_MODULES) + [
+    '1 + 2 * 3 - 4 / 5',
+    '-1.5 + 2 ** 3 ** 2',
+    '9 / 0',
+    '"текст" + "другой"',
+    '1 < 2 И 3 >= 3 ИЛИ НЕ 0',
+    'x = 1; y = x * 2.5; y',
+    'СУММ(1, 2, 3) + ОКРУГЛ(2 / 3, 2)',
+    'ABS(-4) + МАКС(1, 7, 3)',
+    'ЕСЛИ (2 > 1) {x = 1;} ИНАЧЕ {x = 2;}; x',
+    'ЕСЛИ (0) {x = 1;} ИНАЧЕ_ЕСЛИ (1) {x = 5; x * 2} ИНАЧЕ {x = 3;}',
+    'ЕСЛИ (0) {1}',
+    'a = "Строка"; ПРОПИСН(a) + СЦЕПИТЬ(a, 1)',
+    'НЕ (1 + 2) == 0',
+    '1;;;; 2',
+]
+
+FAILING = [
+    ('x = 1; x = "текст"', exceptions.CustomSemanticError),
+    ('1 + "текст"', exceptions.CustomSemanticError),
+    ('неизвестная + 1', exceptions.CustomSemanticError),
+    ('НЕТ_ТАКОЙ(1)', exceptions.CustomSemanticError),
+]
+
+ENGINE_NAMES = [name for name in ENGINES if name != 'tree']
+
+
+def outcome(source: str, inputs: dict, engine: str) -> tuple:
+    """Результат (или ошибка) исполнения и итоговое пространство имён.
+    """
+    namespace = Namespace(inputs)
+    program = compile(source, cache=None, engine=engine)
+    assert program.engine == engine
+    try:
+        result = program.run(namespace)
+    except exceptions.CustomSemanticError as exc:
+        result = type(exc), str(exc)
+    return result, namespace.dict()
+
+
+@pytest.mark.parametrize('engine', ENGINE_NAMES)
+@pytest.mark.parametrize('inputs', INPUTS)
+@pytest.mark.parametrize('source', SCRIPTS)
+def test_engine_matches_tree(engine, inputs, source):
+    assert outcome(source, inputs, engine) \
+           == outcome(source, inputs, 'tree')
+
+
+@pytest.mark.parametrize('engine', ENGINE_NAMES)
+def test_engine_matches_tree_on_fixtures(engine, input_data_basic,
+                                         input_data_division):
+    for source in [*input_data_basic, *input_data_division]:
+        reference = compile(source, cache=None).run()
+        program = compile(source, cache=None, engine=engine)
+        assert program.engine == engine
+        assert program.run() == reference, source
+
+
+@pytest.mark.parametrize('engine', ENGINE_NAMES)
+@pytest.mark.parametrize('source, error', FAILING)
+def test_engine_errors(engine, source, error):
+    with pytest.raises(error) as reference:
+        compile(source, cache=None).run()
+
+    with pytest.raises(error) as result:
+        compile(source, cache=None, engine=engine).run()
+
+    assert str(result.value) == str(reference.value)
+
+
+@pytest.mark.parametrize('engine', ENGINE_NAMES)
+def test_engine_fallback(engine):
+    program = compile('x = (y = 1)', cache=None, engine=engine)
+    assert program.engine == 'tree'
+
+
+@pytest.mark.parametrize('engine', ENGINE_NAMES)
+def test_engine_keeps_writes_before_error(engine):
+    source = 'x = 1; y = x * 2; z = y + "текст"; w = 1'
+    reference_namespace = Namespace({'y': 0})
+    with pytest.raises(exceptions.CustomSemanticError):
+        compile(source, cache=None).run(reference_namespace)
+
+    namespace = Namespace({'y': 0})
+    with pytest.raises(exceptions.CustomSemanticError):
+        compile(source, cache=None, engine=engine).run(namespace)
+
+    assert namespace.dict() == reference_namespace.dict()
+    assert 'z' not in namespace.dict()
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_engine_fork_changes(engine):
+    base = Namespace({'x': 5, 'y': 1}).snapshot()
+    program = compile('ЕСЛИ (y > 10) { x = 1; z = 2; }; y',
+                      cache=None, engine=engine)
+    fork = base.fork()
+    assert program.run(fork) == 1
+    assert fork.changes() == {}
+
+    fork = base.fork({'y': 20})
+    assert program.run(fork) == 20
+    assert fork.changes() == {'y': 20, 'x': 1, 'z': 2}
+
+
+@pytest.mark.parametrize('engine', ENGINE_NAMES)
+def test_engine_watched_namespace(engine):
+    source = 'x = y; y = x + 1; x = СУММ(x, y); x'
+
+    def events(engine_name: str) -> tuple:
+        watcher = Watcher(events={'namespace_get', 'namespace_assign',
+                                  'namespace_overwrite'})
+        namespace = Namespace({'y': 1}, watcher=watcher)
+        result = compile(source, cache=None,
+                         engine=engine_name).run(namespace)
+        return result, namespace.dict(), \
+            [(header, body['key']) for header, body in watcher.history]
+
+    reference_result, reference_names, reference_events = events('tree')
+    result, names, received = events(engine)
+    assert (result, names) == (reference_result, reference_names)
+    assert {x for x in received if x[0] != 'namespace_get'} \
+           == {x for x in reference_events if x[0] != 'namespace_get'}
+    assert {x for x in received if x[0] == 'namespace_get'} \
+           <= {x for x in reference_events if x[0] == 'namespace_get'}
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('source, expected', [
+    ('ТОЧКА(1)', 42),
+    ('ABS(-1) + 1', 43),
+    ('ВСЕ_ИЗ(1, 0)', 42),
+    ('ОДИН_ИЗ(0, 1)', 42),
+])
+def test_engine_overridden_builtins(engine, source, expected):
+    replacements = {name: lambda *_: 42
+                    for name in ('ТОЧКА', 'ABS', 'ВСЕ_ИЗ', 'ОДИН_ИЗ')}
+    program = compile(source, cache=None, engine=engine)
+    assert program.engine == engine
+    assert program.run(Namespace(replacements)) == expected
+
+
+def test_runtime_provides_all_names():
+    scope = make_globals()
+    for python_name in NAME_REPLACEMENTS.values():
+        assert callable(eval(python_name, scope)), python_name
+
+
+def test_bytecode_line_numbers():
+    source = 'x = 1;\ny = 2;\n\nz = x + "текст";'
+    program = compile(source, cache=None, engine='bytecode')
+
+    with pytest.raises(exceptions.CustomSemanticError) as error:
+        program.run()
+
+    frames = traceback.extract_tb(error.value.__traceback__)
+    generated = [x for x in frames if x.filename == '<exceltranslator>']
+    assert [x.lineno for x in generated] == [4]
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError, match='Неизвестный способ'):
+        compile('1', cache=None, engine='нет')
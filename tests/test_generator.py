@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""Тесты генератора синтетических скриптов.
+"""
+import builtins
+
+import pytest
+
+from exceltranslator.defined_names import DEFAULT_FUNCTIONS
+from exceltranslator.generator import ScriptGenerator, generate
+from exceltranslator.lexer.lexer import Lexer
+from exceltranslator.lexer.tokens import *
+from exceltranslator.parser.nodes import ConditionNode
+from exceltranslator.parser.serialization import serialize_to_python
+from exceltranslator.program import ENGINES, compile, parse
+from exceltranslator.settings import DEFAULT_INDENT
+
+OPERATORS = {PowerToken, Multiply, Divide, Plus, Minus, LT, GT, LE, GE,
+             EqualToken, NotEqualToken, AndToken, OrToken, NotToken,
+             IfToken, ElifToken, ElseToken}
+
+
+def tokens_of(source: str) -> list:
+    """Токены скрипта.
+    """
+    return Lexer().tokenize(source)
+
+
+def test_generator_is_reproducible():
+    assert generate(seed=5) == generate(seed=5)
+    assert generate(seed=5)[0] != generate(seed=6)[0]
+
+    generator = ScriptGenerator(seed=5)
+    assert generator.namespace(1) == generator.namespace(1)
+    assert generator.namespace(1) != generator.namespace(2)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_generated_scripts_run_on_all_engines(seed):
+    generator = ScriptGenerator(seed=seed, tokens=400, depth=3)
+    source = generator.script()
+
+    for namespace_seed in range(3):
+        namespace = generator.namespace(namespace_seed)
+        results = {engine: compile(source, cache=None, engine=engine)
+                   .run(dict(namespace)) for engine in ENGINES}
+        assert len(set(results.values())) == 1, results
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_generated_scripts_serialize(seed):
+    source, _ = generate(seed=seed, tokens=400)
+    python_source = serialize_to_python(parse(source))
+    builtins.compile(python_source, '<generated>', 'exec')
+
+
+def test_generator_size_knobs():
+    generator = ScriptGenerator(seed=3, tokens=1_000, depth=2, variables=5,
+                                branches=2, inputs=2)
+    source = generator.script()
+    stream = tokens_of(source)
+    assert len(stream) >= 1_000
+
+    assigned = {token.source_code for token in stream
+                if isinstance(token, NameToken)
+                and token.source_code[0] in 'xs'}
+    assert len(assigned) <= 5
+    assert set(generator.namespace()) == {'a0', 'a1'}
+
+    for node, _ in parse(source).iter_recursively():
+        if isinstance(node, ConditionNode):
+            assert len(node.sub_nodes) <= 2 + 1
+
+    assert max(len(line) - len(line.lstrip())
+               for line in source.splitlines()) <= 2 * len(DEFAULT_INDENT)
+
+
+def test_generator_covers_grammar():
+    source, _ = generate(seed=0, tokens=5_000, depth=3, branches=4)
+    stream = tokens_of(source)
+
+    assert OPERATORS <= {type(token) for token in stream}
+    names = {token.source_code for token in stream}
+    assert set(DEFAULT_FUNCTIONS) <= names
@@ -6,6 +6,8 @@ import pytest
 
 from exceltranslator.exceptions import CustomSyntaxError
 from exceltranslator.lexer.lexer import Lexer
+from exceltranslator.lexer.positions import LineIndex
+from exceltranslator.lexer.tokens import NameToken, RightPar
 
 
 @pytest.fixture()
@@ -101,3 +103,80 @@ def test_incorrect_parenthesis_bad(instance, text_in, index):
     with pytest.raises(CustomSyntaxError) as error:
         instance.check_parenthesis(text_in)
     assert error.value.args[0] == syntax_error(index)
+
+
+def test_token_stream(instance):
+    instance.analyze('x = 1 + y;')
+    stream = instance.stream
+    assert len(stream) == 6
+    assert stream.has_more()
+    assert str(stream.peek()) == 'x'
+    assert str(stream.peek(2)) == '1'
+    assert stream.peek(100) is None
+
+    mark = stream.mark()
+    assert [str(stream.advance()) for _ in range(3)] == ['x', '=', '1']
+    assert len(stream) == 3
+    assert instance.tokens_left == ['+', 'y', ';']
+
+    stream.reset(mark)
+    assert str(instance.show_next()) == 'x'
+    assert instance.next_in(NameToken)
+
+    while instance.has_more():
+        instance.cut_next()
+    assert instance.cut_next() is None
+    assert instance.show_next() is None
+
+    with pytest.raises(IndexError):
+        stream.reset(100)
+
+
+def test_token_store(instance):
+    text = 'ЕСЛИ (x >= 10 И y)  { z = "a b"; }'
+    store = instance.store(text)
+    assert len(store) == len(instance.tokenize(text)) == 14
+    assert store.kind(2) is NameToken
+    assert [text[slice(*x.span)] for x in store] == [
+        'ЕСЛИ', '(', 'x', '>=', '10', 'И', 'y', ')',
+        '{', 'z', '=', '"a b"', ';', '}',
+    ]
+    assert store[0] is store[0]
+    assert [str(x) for x in store[-2:]] == [';', '}']
+    assert store.nbytes() == 14 * 10
+
+
+def test_token_location(instance):
+    instance.analyze('a = (1; 2)')
+    for _ in range(4):
+        instance.cut_next()
+
+    with pytest.raises(CustomSyntaxError, match=r'Символ №7: a = \(1 --> ;'):
+        instance.dispose_next(RightPar)
+
+
+def test_validate_pairs(instance):
+    validation = instance.validate('a = (b[1] + {c});')
+    assert validation
+    assert validation.pairs == {4: 15, 6: 8, 12: 14}
+
+
+def test_validate_all_problems(instance):
+    validation = instance.validate('a = (1] + "x; $ = {2')
+    assert not validation
+    assert [x.index for x in validation.problems] == [14, 4, 6, 18, 10]
+    assert validation.problems[0].description \
+           == "в скрипте нельзя использовать символы '$'"
+
+    with pytest.raises(CustomSyntaxError, match='найдено проблем: 5'):
+        instance.preprocess('a = (1] + "x; $ = {2')
+
+
+def test_line_index():
+    locate = LineIndex('a = 1;\nb = 2;\n\nc')
+    assert locate(0) == (1, 0)
+    assert locate(6) == (1, 6)
+    assert locate(7) == (2, 0)
+    assert locate(11) == (2, 4)
+    assert locate(15) == (4, 0)
+    assert LineIndex()(3) == (1, 3)
@@ -5,6 +5,7 @@
 import pytest
 
 from exceltranslator.helpers.namespace_wrapper import NamespaceWrapper
+from exceltranslator.program import ENGINES, compile
 from exceltranslator.tools import custom_eval
 
 
@@ -56,3 +57,37 @@ def test_if(text_in, ref):
     namespace = NamespaceWrapper({'x': 0})
     custom_eval(text_in, namespace)
     assert namespace['x'] == ref
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('text_in, ref, calls', [
+    ('0 И СЧЁТ()', 0, 0),
+    ('1 ИЛИ СЧЁТ()', 1, 0),
+    ('1 И СЧЁТ()', 1, 1),
+    ('0 ИЛИ СЧЁТ()', 1, 1),
+    ('ВСЕ_ИЗ(1, 0, СЧЁТ())', False, 0),
+    ('ВСЕ_ИЗ(1, СЧЁТ(), 2)', True, 1),
+    ('ОДИН_ИЗ(0, "а", СЧЁТ())', True, 0),
+    ('ОДИН_ИЗ(0, СЧЁТ())', True, 1),
+    ('НИ_ОДИН_ИЗ(0, 2, СЧЁТ())', False, 0),
+    ('НИ_ОДИН_ИЗ(0, 0)', True, 0),
+    ('ВСЕ_ИЗ()', False, 0),
+    ('0 И неизвестная', 0, 0),
+])
+def test_short_circuit(engine, text_in, ref, calls):
+    counter = []
+    program = compile(text_in, cache=None, engine=engine)
+    result = program.run({'СЧЁТ': lambda: counter.append(1) or 1})
+    assert result == ref
+    assert type(result) is type(ref)
+    assert len(counter) == calls
+
+
+@pytest.mark.parametrize('engine', ['tree', 'closures'])
+def test_overridden_lazy_function_gets_all_arguments(engine):
+    counter = []
+    program = compile('ВСЕ_ИЗ(0, СЧЁТ())', cache=None, engine=engine)
+    result = program.run({'СЧЁТ': lambda: counter.append(1) or 1,
+                          'ВСЕ_ИЗ': lambda *args: len(args)})
+    assert result == 2
+    assert len(counter) == 1
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+"""Тесты пространства имён со слоем стандартных имён.
+"""
+import pickle
+
+import pytest
+
+from exceltranslator import exceptions
+from exceltranslator.defined_names import (
+    DEFAULT_FUNCTIONS,
+    DEFAULT_NAMES,
+    get_default_layer,
+    get_default_names,
+    non_standard,
+)
+from exceltranslator.helpers.namespace_wrapper import (
+    DefaultNames,
+    Namespace,
+)
+from exceltranslator.helpers.watcher import Watcher
+from exceltranslator.program import ENGINES, compile
+
+
+def test_default_layer_is_shared():
+    first = Namespace({'x': 1})
+    second = Namespace()
+    assert first.contents.own() == {'x': 1}
+    assert second.contents.own() == {}
+    assert first.contents.base is second.contents.base
+
+    with pytest.raises(TypeError):
+        get_default_layer()['ABS'] = 1
+
+
+def test_layers_read_and_write():
+    names = DefaultNames({'x': 1, 'ABS': 2})
+    assert names['x'] == 1
+    assert names['ABS'] == 2
+    assert names['ИСТИНА'] == 1
+    assert names.get('МАКС') is get_default_names()['МАКС']
+    assert names.get('нет', 5) == 5
+    assert 'СУММ' in names and 'нет' not in names
+
+    with pytest.raises(KeyError):
+        names['нет']
+
+    full = {**get_default_names(), 'x': 1, 'ABS': 2}
+    assert len(names) == len(full)
+    assert names == full
+    assert dict(names) == full
+    assert list(names)[-1] == 'x'
+
+    names['y'] = 3
+    del names['ABS']
+    assert names.own() == {'x': 1, 'y': 3}
+    assert names['ABS'] is get_default_names()['ABS']
+
+
+def test_dict_keeps_builtins():
+    namespace = Namespace({'x': 1})
+    copy = namespace.dict()
+    copy['y'] = 2
+    assert 'y' not in namespace.contents
+    assert namespace.dict() == {**get_default_names(), 'x': 1}
+
+
+def test_public_copies_are_mutable():
+    names = get_default_names()
+    assert type(names) is dict
+    assert names is not get_default_names()
+    assert names == get_default_layer()
+    names['ABS'] = 1
+    assert get_default_names()['ABS'] is get_default_layer()['ABS']
+
+
+class StrictNames(DefaultNames):
+    """Стандартные имена, которые нельзя перебирать целиком.
+    """
+
+    def __iter__(self):
+        """Запретить перебор нижнего слоя.
+        """
+        raise AssertionError('перебор нижнего слоя')
+
+    items = keys = values = __len__ = __iter__
+
+
+def test_dict_does_not_copy_builtins():
+    namespace = Namespace()
+    namespace._dict = StrictNames({'x': 1, 'ABS': 2})
+    copy = namespace.dict()
+    assert type(copy) is StrictNames
+    assert copy.base is get_default_layer()
+    assert copy.own() == {'x': 1, 'ABS': 2}
+
+    copy['y'] = 3
+    assert copy.pop('x') == 1
+    assert namespace.contents.own() == {'x': 1, 'ABS': 2}
+    assert non_standard(namespace.contents) == {**DEFAULT_NAMES, 'x': 1}
+
+
+def test_non_standard():
+    namespace = Namespace({'x': 1, 'ABS': 2})
+    assert non_standard(namespace.dict()) == {**DEFAULT_NAMES, 'x': 1}
+    assert not set(non_standard(namespace.dict())) & set(DEFAULT_FUNCTIONS)
+
+    fork = Namespace({'x': 1, 'ИСТИНА': 5}).fork({'y': 2, 'ABS': 3})
+    assert non_standard(fork.dict()) == non_standard(dict(fork.dict()))
+    assert list(non_standard(fork.dict())) == ['ЛОЖЬ', 'ИСТИНА', 'x', 'y']
+
+
+def test_pickle():
+    names = DefaultNames({'x': 1})
+    restored = pickle.loads(pickle.dumps(names))
+    assert type(restored) is DefaultNames
+    assert restored.own() == {'x': 1}
+    assert restored == names
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_run_does_not_touch_caller_dict(engine):
+    inputs = {'y': 1}
+    program = compile('x = y + ABS(-1); x', cache=None, engine=engine)
+    namespace = Namespace(inputs)
+    assert program.run(namespace) == 2
+    assert inputs == {'y': 1}
+    assert namespace.contents.own() == {'y': 1, 'x': 2}
+
+
+def test_snapshot_is_frozen():
+    namespace = Namespace({'x': 1})
+    snapshot = namespace.snapshot()
+    namespace.set(None, 'x', 2)
+
+    assert snapshot['x'] == 1
+    assert snapshot['ABS'] is get_default_names()['ABS']
+    assert snapshot.base is namespace.contents.base
+    with pytest.raises(TypeError):
+        snapshot['x'] = 3
+    with pytest.raises(TypeError):
+        snapshot.update(x=3)
+
+
+def test_fork_copy_on_write():
+    base = Namespace({'x': 1, 'y': 2}).snapshot()
+    first = base.fork({'y': 5})
+    second = base.fork()
+
+    first.set(None, 'z', 3)
+    assert first.changes() == {'y': 5, 'z': 3}
+    assert second.changes() == {}
+    assert second['y'] == 2 and second['z'] is None
+    assert first.dict() == {**get_default_names(), 'x': 1, 'y': 5, 'z': 3}
+    assert base.own() == {'x': 1, 'y': 2}
+
+    nested = first.fork()
+    nested.set(None, 'x', 10)
+    assert nested.changes() == {'x': 10}
+    assert nested['y'] == 5 and first['x'] == 1
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_run_forks(engine):
+    program = compile('ЕСЛИ (a > 1) {b = a * k;} ИНАЧЕ {b = k;}; b',
+                      cache=None, engine=engine)
+    base = Namespace({'a': 1, 'k': 10}).snapshot()
+    forks = [base.fork({'a': a}) for a in (0, 2, 3)]
+
+    assert program.run_many(forks) == [10, 20, 30]
+    assert [x.changes() for x in forks] == [
+        {'a': 0, 'b': 10}, {'a': 2, 'b': 20}, {'a': 3, 'b': 30}]
+    assert base.own() == {'a': 1, 'k': 10}
+
+    with pytest.raises(exceptions.CustomSemanticError):
+        program.run(base.fork({'k': 'текст', 'a': 2}))
+    with pytest.raises(exceptions.CustomSemanticError,
+                       match='изменения типа'):
+        compile('k = "текст"', cache=None, engine=engine).run(base.fork())
+
+
+def test_fork_keeps_watcher_and_pickles():
+    watcher = Watcher(events={'namespace_assign'})
+    namespace = Namespace({'x': 1}, watcher=watcher)
+    fork = namespace.fork({'y': 2})
+    compile('z = x + y', cache=None).run(fork)
+    assert [body['key'] for _, body in watcher.history] == ['z']
+
+    restored = pickle.loads(pickle.dumps(fork.contents))
+    assert restored == fork.contents
+    assert restored.own() == {'y': 2, 'z': 3}
+    assert restored.base.own() == {'x': 1}
+    assert restored.base.base is get_default_layer()
@@ -2,6 +2,8 @@
 
 """Тесты нод по кусочку.
 """
+import pickle
+
 import pytest
 
 from exceltranslator import exceptions
@@ -154,6 +156,25 @@ def test_unary_minus():
     assert serialize_to_python(node) == 'math_round(-123.031213120121, 5)'
 
 
+def test_variable_decoded():
+    node = VarNode(FloatToken('1.123456'))
+    assert node.decoded == 1.12346
+    node.prefix = '-'
+    assert node.decoded == -1.12346
+
+    assert VarNode(StringToken("'abc'")).decoded == 'abc'
+    assert VarNode(NotToken('')).decoded is UNDECODED
+
+
+def test_pickled_decoded():
+    node = BinaryNode(VarNode(IntegerToken('6')), Divide('/'),
+                      UnaryMinusNode(VarNode(IntegerToken('3'))))
+    copy = pickle.loads(pickle.dumps(node))
+    assert copy.divides
+    assert copy.right_operand.sub_nodes[0].decoded == -3.0
+    assert copy.evaluate(NamespaceWrapper()) == -2.0
+
+
 def test_name():
     node = NameNode(NameToken('test'))
     assert str(node) == 'NameNode (value="test")'
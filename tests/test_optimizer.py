@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""Тесты оптимизации синтаксического дерева.
+"""
+import builtins
+
+import pytest
+
+from exceltranslator.generator import ScriptGenerator
+from exceltranslator.parser.nodes import CallNode, ConditionNode, ConstantNode
+from exceltranslator.parser.serialization import (
+    serialize_to_python,
+    serialize_to_text,
+)
+from exceltranslator.program import ENGINES, compile, parse
+
+
+def constants(root) -> list:
+    """Значения всех свёрнутых узлов.
+    """
+    return [node.constant for node, _ in root.iter_recursively()
+            if isinstance(node, ConstantNode)]
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('2 * 3.5', [7.0]),
+    ('ИСТИНА И ЛОЖЬ', [0]),
+    ('ABS(-6)', [6.0]),
+    ('x = 1 / 3 + y', [0.33333]),
+    ('ТЕКСТ(1 > 0)', ['1']),
+    ('СЦЕПИТЬ("a", ПРОПИСН("b"))', ['aB']),
+    ('x = (2 + 3) * y', [5.0]),
+])
+def test_fold_constants(source, expected):
+    root = parse(source, optimize=True)
+    assert constants(root) == expected
+    assert type(constants(root)[0]) is type(expected[0])
+
+
+@pytest.mark.parametrize('source', [
+    'СЛЧИС() + 1',
+    'СЛУЧМЕЖДУ(1, 5)',
+    'ТОЧКА("a", "b")',
+    'ABS(y) + 1',
+    'ИСТИНА = 5;\nИСТИНА + 1',
+    'ABS = 5;\nABS(-1)',
+    'КОРЕНЬ(-1)',
+    '1 / 0',
+    '"a" + 1',
+])
+def test_not_folded(source):
+    assert constants(parse(source, optimize=True)) == []
+
+
+def test_impure_calls_stay():
+    root = parse('x = СЛЧИС() * (2 + 3);', optimize=True)
+    names = [node.name.value.source_code
+             for node, _ in root.iter_recursively()
+             if isinstance(node, CallNode)]
+    assert names == ['СЛЧИС']
+    assert constants(root) == [5.0]
+
+
+@pytest.mark.parametrize('source, text', [
+    ('ЕСЛИ (1 > 0) {x = 1;} ИНАЧЕ {x = 2;};\nx', 'x = 1;\nx'),
+    ('ЕСЛИ (0) {x = 1;} ИНАЧЕ {x = 2;};\nx', 'x = 2;\nx'),
+    ('x = 0;\nЕСЛИ (ЛОЖЬ) {x = 1;};\nx', 'x = 0;\nx'),
+    ('ЕСЛИ (y) {x = 1;} ИНАЧЕ_ЕСЛИ (ИСТИНА) {x = 2;} '
+     'ИНАЧЕ_ЕСЛИ (y) {x = 3;};\nx',
+     'ЕСЛИ (y)\n{\n    x = 1;\n}\nИНАЧЕ\n{\n    x = 2;\n};\nx'),
+    ('ЕСЛИ (0) {x = 1;} ИНАЧЕ_ЕСЛИ (y) {x = 2;};\nx',
+     'ЕСЛИ (y)\n{\n    x = 2;\n};\nx'),
+])
+def test_prune_branches(source, text):
+    assert serialize_to_text(parse(source, optimize=True)) == text
+
+
+def test_prune_keeps_scope_non_empty():
+    root = parse('ЕСЛИ (y) {ЕСЛИ (0) {x = 1;};};', optimize=True)
+    conditions = [node for node, _ in root.iter_recursively()
+                  if isinstance(node, ConditionNode)]
+    assert len(conditions) == 2
+    builtins.compile(serialize_to_python(root), '<script>', 'exec')
+
+
+def test_serialize_folded():
+    source = 'x = 1 > 2;\nz = 2 * 3.5 + y;\ns = ТЕКСТ(1 > 0);'
+    root = parse(source, optimize=True)
+    assert serialize_to_python(root) == "x = 0\nz = 7.0 + y\ns = '1'"
+    assert serialize_to_text(root) == source
+
+
+def test_compile_optimized_is_cached_separately():
+    source = 'x = 2 * 3;\nx + y'
+    plain = compile(source)
+    optimized = compile(source, optimize=True)
+    assert optimized is not plain
+    assert optimized is compile(source, optimize=True)
+    assert constants(optimized.root) == [6.0]
+    assert constants(plain.root) == []
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_optimized_scripts_match(seed):
+    generator = ScriptGenerator(seed=seed, tokens=400, depth=3)
+    source = generator.script()
+    root = parse(source, optimize=True)
+    builtins.compile(serialize_to_python(root), '<script>', 'exec')
+
+    for namespace_seed in (None, 1):
+        namespace = generator.namespace(namespace_seed)
+        expected = compile(source, cache=None).run(dict(namespace))
+
+        for engine in ENGINES:
+            program = compile(source, cache=None, engine=engine,
+                              optimize=True)
+            result = program.run(dict(namespace))
+            assert program.engine == engine
+            assert result == expected
+            assert type(result) is type(expected)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+"""Тесты профилировщика.
+"""
+import json
+
+from exceltranslator.helpers.namespace_wrapper import Namespace
+from exceltranslator.helpers.profiler import Profiler
+from exceltranslator.program import compile
+from exceltranslator.tools import profile_eval
+
+SOURCE = 'x = ABS(-2) + y;\nЕСЛИ (x > 3) {z = СУММ(x, 1);};\nx * 2'
+
+
+def test_profiler_counts_and_times():
+    result, profiler = profile_eval(SOURCE, Namespace({'y': 5}), runs=4)
+    assert result == 14
+    assert profiler.samples == 4
+
+    root_timing = profiler.nodes[profiler.root]
+    assert root_timing.calls == 4
+    assert root_timing.inclusive >= sum(
+        timing.exclusive for timing in profiler.nodes.values()) * 0.999
+
+    assert profiler.functions['ABS'].calls == 4
+    assert profiler.functions['СУММ'].calls == 4
+    assert profiler.functions['ОКРУГЛ'].calls == 0
+
+    table = profiler.top(3)
+    assert len(table.splitlines()) == 2 + 3 + 1 + 2
+    assert 'СУММ' in table
+
+
+def test_profiler_restores_tree_and_namespace():
+    program = compile(SOURCE, cache=None)
+    namespace = Namespace({'y': -5})
+    abs_function = namespace['ABS']
+
+    profiler = Profiler(program.root, SOURCE)
+    assert profiler.evaluate(namespace) == -6
+    assert namespace['ABS'] is abs_function
+    assert namespace.changes() == {'y': -5, 'x': -3}
+    assert all('walk' not in node.__dict__ for node in profiler.nodes)
+
+    overridden = Namespace({'y': -5, 'ABS': abs_function})
+    profiler.evaluate(overridden)
+    assert overridden.changes() == {'y': -5, 'x': -3, 'ABS': abs_function}
+    assert program.run({'y': 1}) == 6
+
+
+def test_profiler_sampling():
+    program = compile(SOURCE, cache=None)
+    profiler = Profiler(program.root, sample_every=3)
+    for i in range(7):
+        assert profiler.evaluate(Namespace({'y': i})) == (i + 2) * 2
+
+    assert (profiler.runs, profiler.samples) == (7, 3)
+    assert profiler.nodes[program.root].calls == 3
+
+
+def test_profiler_export():
+    _, profiler = profile_eval(SOURCE, Namespace({'y': 5}))
+
+    labels = [line.rsplit(' ', 1)[0]
+              for line in profiler.to_collapsed().splitlines()]
+    assert 'Инструкция @1:1;Присваивание @1:3;Плюс @1:13;Вызов @1:5;ABS' \
+           in labels
+
+    speedscope = json.loads(json.dumps(profiler.to_speedscope()))
+    frames = speedscope['shared']['frames']
+    profile = speedscope['profiles'][0]
+    assert len(profile['samples']) == len(profile['weights']) == len(labels)
+    assert all(0 <= x < len(frames)
+               for sample in profile['samples'] for x in sample)
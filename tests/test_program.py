@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""Тесты скомпилированных программ.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from exceltranslator.helpers.namespace_wrapper import Namespace
+from exceltranslator.program import Program, compile
+
+SOURCE = '''
+итог = 2 * СУММ(a, b);
+ЕСЛИ (итог > 10) {
+    флаг = 1;
+} ИНАЧЕ {
+    флаг = ОКРУГЛ(a / 3, 2);
+};
+итог + флаг
+'''
+
+
+@pytest.fixture()
+def program():
+    return compile(SOURCE, cache=None)
+
+
+def test_program_introspection(program):
+    assert program.reads == {'a', 'b', 'итог', 'флаг'}
+    assert program.writes == {'итог', 'флаг'}
+    assert program.calls == {'СУММ', 'ОКРУГЛ'}
+
+
+def test_program_is_immutable(program):
+    with pytest.raises(AttributeError):
+        program.root = None
+
+    with pytest.raises(AttributeError):
+        del program.source
+
+
+def test_program_run(program):
+    assert program.run({'a': 1, 'b': 2}) == 6.33
+    assert program.run(Namespace({'a': 5, 'b': 6})) == 23
+    assert program.run_many([{'a': 1, 'b': 1}, {'a': 3, 'b': 3}]) \
+           == [4.33, 13]
+
+
+def test_program_threads(program):
+    namespaces = [{'a': i, 'b': i} for i in range(200)]
+    expected = program.run_many(namespaces)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(program.run, namespaces))
+
+    assert results == expected
+
+
+def test_compile_uses_cache():
+    first = compile('1 + 2')
+    second = compile('1 + 2')
+    assert isinstance(first, Program)
+    assert first.root is second.root
@@ -6,6 +6,7 @@ import pytest
 
 from exceltranslator.lexer.lexer import Lexer
 from exceltranslator.lexer.tokens import *
+from exceltranslator.parser.parser import INFIX_NODES
 
 
 @pytest.fixture()
@@ -69,7 +70,14 @@ def test_creation(token_type, text_left, text_right):
       NameToken("m")]),
     ('>= > <= <', [GE(">="), GT(">"), LE("<="), LT("<")]),
     ('10 / p', [IntegerToken("10"), Divide("/"), NameToken("p")]),
-
+    ('2**3*4', [IntegerToken("2"), PowerToken("**"), IntegerToken("3"),
+                Multiply("*"), IntegerToken("4")]),
+    ('a<=b<c', [NameToken("a"), LE("<="), NameToken("b"), LT("<"),
+                NameToken("c")]),
+    ('ЕСЛИ ИНАЧЕ_ЕСЛИ ИНАЧЕ ЕСЛИx',
+     [IfToken("ЕСЛИ"), ElifToken("ИНАЧЕ_ЕСЛИ"), ElseToken("ИНАЧЕ"),
+      IfToken("ЕСЛИ"), NameToken("x")]),
+    ('else3.5', [ElseToken("else"), FloatToken("3.5")]),
 ])
 def test_tokenize(instance, text_in, tokens_out):
     assert instance.tokenize(text_in) == tokens_out
@@ -84,3 +92,30 @@ def test_recognition(token_type, variants):
     for variant in variants:
         token, end = token_type.try_making(variant)
         assert type(token) == token_type, variant
+
+
+def test_scan_offsets(instance):
+    text = ' x  = "a b" И 2.5\n'
+    found = [(token_type, text[start:end])
+             for token_type, start, end in instance.scan(text)]
+    assert found == [
+        (NameToken, 'x'),
+        (Assignment, '='),
+        (StringToken, '"a b"'),
+        (AndToken, 'И '),
+        (FloatToken, '2.5'),
+    ]
+
+
+def test_scan_unknown_symbol(instance):
+    with pytest.raises(ValueError, match="Не удалось распознать символ: '.'"):
+        instance.tokenize('x = .')
+
+
+def test_binding_powers():
+    operators = {x for x in known_tokens if x.binding_power}
+    assert operators == set(INFIX_NODES)
+    assert PowerToken.binding_power > Multiply.binding_power \
+           > Plus.binding_power > LT.binding_power \
+           > EqualToken.binding_power > AndToken.binding_power \
+           > Assignment.binding_power
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+"""Тесты наблюдателя и оповещений.
+"""
+import json
+
+from exceltranslator.helpers.informer import Informer
+from exceltranslator.helpers.namespace_wrapper import Namespace
+from exceltranslator.helpers.sinks import BinarySink, JsonLinesSink, \
+    MemorySink, binary_report, read_binary
+from exceltranslator.helpers.stack_wrapper import StackWrapper
+from exceltranslator.helpers.watcher import Watcher
+from exceltranslator.program import compile
+
+SOURCE = 'x = 2; y = СУММ(x, 3) / 0; x * y'
+
+
+class Explosive:
+    """Объект, который нельзя превращать в строку.
+    """
+
+    def __str__(self):
+        raise AssertionError('данные события собираются без наблюдателя')
+
+
+def run(watcher: Watcher) -> list:
+    """Исполнить SOURCE и вернуть заголовки событий.
+    """
+    root = compile(SOURCE, cache=None).root
+    root.watcher = watcher
+    root.evaluate(Namespace(watcher=watcher), StackWrapper(watcher=watcher))
+    return [header for header, _ in watcher.history]
+
+
+def test_watcher_receives_everything():
+    headers = run(Watcher())
+    assert {'call', 'zero_division', 'operator_use', 'stack_append',
+            'stack_pop', 'namespace_get', 'namespace_assign'} \
+           == set(headers)
+
+
+def test_watcher_subscription():
+    headers = run(Watcher(events={'call', 'zero_division'}))
+    assert headers == ['call', 'zero_division']
+    assert run(Watcher(events=())) == []
+
+
+def test_no_payload_without_watcher():
+    stack = StackWrapper()
+    stack.append(Explosive(), 1)
+    assert stack.pop(Explosive()) == 1
+
+    stack = StackWrapper(watcher=Watcher(events={'stack_pop'}))
+    stack.append(Explosive(), 1)
+
+
+def test_watcher_attach_and_detach():
+    program = compile('(((x + 1)))', cache=None)
+    deepest = next(node for node, _ in program.root.iter_recursively()
+                   if type(node).__name__ == 'BinaryNode')
+    assert deepest.listener('operator_use') is None
+
+    watcher = Watcher()
+    program.root.watcher = watcher
+    assert deepest.listener('operator_use') is watcher
+
+    program.root.watcher = None
+    assert deepest.listener('operator_use') is None
+
+
+def test_watcher_follows_new_parent():
+    first = StackWrapper(watcher=Watcher())
+    second = StackWrapper(watcher=Watcher())
+    child = StackWrapper(parent=first)
+    assert child.resolve() is first.watcher
+
+    child.parent = second
+    assert child.resolve() is second.watcher
+
+
+def test_building_trees_keeps_resolved_watchers():
+    program = compile('(((x + 1)))', cache=None)
+    program.root.watcher = watcher = Watcher()
+    deepest = next(node for node, _ in program.root.iter_recursively()
+                   if type(node).__name__ == 'BinaryNode')
+    assert deepest.listener('operator_use') is watcher
+
+    epoch = Informer.epoch
+    compile('ЕСЛИ (x > 1) {y = 2;} ИНАЧЕ {y = 3;}; y * 2',
+            cache=None, optimize=True)
+    assert Informer.epoch == epoch
+
+    other = StackWrapper(watcher=Watcher())
+    deepest.parent.parent = other
+    assert Informer.epoch != epoch
+    assert deepest.listener('operator_use') is other.watcher
+
+
+def test_resolved_watcher_is_not_pickled():
+    program = compile('x + 1', cache=None)
+    program.root.watcher = Watcher()
+    node = program.root.sub_nodes[0]
+    assert node.resolve() is program.root.watcher
+
+    state = node.__getstate__()
+    assert state['_resolved'] is None
+    assert state['_resolved_epoch'] == -1
+
+
+def test_report_from_aggregates():
+    watcher = Watcher(history_size=0)
+    run(watcher)
+    report = watcher.make_report()
+
+    assert not watcher.history
+    assert report['stack']['append'] == report['stack']['pop'] > 0
+    assert report['stack']['max_size'] == 1
+    assert report['namespace']['assign'] == 2
+    assert report['namespace']['names'] == ['x', 'y', 'СУММ']
+    assert report['namespace']['names_assign'] == {'x', 'y'}
+
+
+def test_history_ring_buffer_and_sampling():
+    full = Watcher()
+    headers = run(full)
+
+    ring = Watcher(history_size=3)
+    assert run(ring) == headers[-3:]
+
+    sampled = Watcher(sample_every=4)
+    assert run(sampled) == headers[::4]
+    assert sampled.make_report() == full.make_report()
+
+
+def test_sinks_receive_every_event(tmp_path):
+    memory = MemorySink()
+    text = JsonLinesSink(tmp_path / 'trace.jsonl', buffer_size=2)
+    binary = BinarySink(tmp_path / 'trace.bin', buffer_size=16)
+    watcher = Watcher(history_size=0, sinks=(memory, text, binary))
+    run(watcher)
+    watcher.close()
+
+    report = watcher.make_report()
+    assert memory.make_report() == report
+    assert binary_report(tmp_path / 'trace.bin') == report
+
+    with open(tmp_path / 'trace.jsonl', encoding='utf-8') as file:
+        lines = [json.loads(line) for line in file]
+    events = list(read_binary(tmp_path / 'trace.bin'))
+    assert len(lines) == len(events) == watcher.total
+    assert [x['event'] for x in lines] == [header for header, _ in events]
+
+
+def test_binary_values(tmp_path):
+    payload = {'none': None, 'flag': True, 'int': -2 ** 40, 'big': 2 ** 70,
+               'float': -0.5, 'text': 'строка', 'list': ['a', (1, 2.0)],
+               'long': 'ю' * 100, 'object': complex(1, 2)}
+    with BinarySink(tmp_path / 'trace.bin') as sink:
+        sink.write('values', payload)
+        sink.write('values', {})
+        sink.write('values', payload)
+
+    expected = ('values', {**payload, 'big': str(2 ** 70),
+                           'list': ['a', [1, 2.0]], 'object': '(1+2j)'})
+    assert list(read_binary(tmp_path / 'trace.bin')) \
+           == [expected, ('values', {}), expected]